@@ -0,0 +1,201 @@
+"""
+Benchmark of serial, threaded and asyncio MAC address table collectors
+
+Every collector runs in its own process against the fake device farm (see fake_device_farm.py),
+so peak RSS of one collector is not affected by another one.
+Reports throughput, p50/p99 per-device latency and peak RSS.
+
+Usage:
+    python benchmark_collectors.py
+    python benchmark_collectors.py --sizes 10 100 --collectors threading async --latency 0.2
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_device_farm import FARM_PORT, DEFAULT_LATENCY, DEFAULT_MAC_ENTRIES, get_devices_addresses, raise_open_files_limit
+from instrumentation import percentile
+
+
+DEFAULT_SIZES = [10, 100, 1000]
+COLLECTORS = {
+    'serial': 'collection_serial',
+    'threading': 'collection_threading',
+    'async': 'collection_async',
+}
+THREADING_MAX_WORKERS = 4
+
+
+def timed_call(func, host):
+    """
+    Returns:
+        tuple: latency of the call and None, or None and repr of the exception if it failed
+    """
+    start_time = time.perf_counter()
+    try:
+        func(host)
+    except Exception as e:
+        return None, repr(e)
+    return time.perf_counter() - start_time, None
+
+
+async def timed_coroutine(coroutine_func, host):
+    start_time = time.perf_counter()
+    try:
+        await coroutine_func(host)
+    except Exception as e:
+        return None, repr(e)
+    return time.perf_counter() - start_time, None
+
+
+def run_serial(collector, hosts, max_workers):
+    return [timed_call(collector.get_mac_address_table, host) for host in hosts]
+
+
+def run_threading(collector, hosts, max_workers):
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda host: timed_call(collector.get_mac_address_table, host), hosts))
+
+
+def run_async(collector, hosts, max_workers):
+    loop = asyncio.get_event_loop()
+    tasks = [timed_coroutine(collector.get_mac_address_table, host) for host in hosts]
+    return loop.run_until_complete(asyncio.gather(*tasks))
+
+
+RUNNERS = {
+    'serial': run_serial,
+    'threading': run_threading,
+    'async': run_async,
+}
+
+
+def run_worker(collector_name, num_devices, port, max_workers):
+    """
+    Runs one collector against the farm in the current process and prints the result as JSON
+    """
+    os.environ.setdefault('USERNAME', 'benchmark')
+    os.environ.setdefault('PASSWORD', 'benchmark')
+    raise_open_files_limit()
+    collector = importlib.import_module(COLLECTORS[collector_name])
+    collector.GLOBAL_DEVICE_PARAMS['port'] = port
+    hosts = get_devices_addresses(num_devices)
+
+    start_time = time.perf_counter()
+    results = RUNNERS[collector_name](collector, hosts, max_workers)
+    total_time = time.perf_counter() - start_time
+
+    result = {
+        'total_time': total_time,
+        'latencies': [latency for latency, _ in results if latency is not None],
+        'errors': {host: error for host, (_, error) in zip(hosts, results) if error is not None},
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    print(json.dumps(result))
+
+
+def start_farm_process(num_devices, port, latency, num_mac_entries):
+    farm = subprocess.Popen(
+        [
+            sys.executable, 'fake_device_farm.py',
+            '--devices', str(num_devices),
+            '--port', str(port),
+            '--latency', str(latency),
+            '--mac-entries', str(num_mac_entries),
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    line = farm.stdout.readline()
+    if not line.startswith('Fake device farm is ready'):
+        farm.kill()
+        raise RuntimeError('Fake device farm did not start: {!r}'.format(line))
+    return farm
+
+
+def run_collector_process(collector_name, num_devices, port, max_workers):
+    output = subprocess.check_output(
+        [
+            sys.executable, __file__,
+            '--worker', collector_name,
+            '--sizes', str(num_devices),
+            '--port', str(port),
+            '--threads', str(max_workers),
+        ],
+        universal_newlines=True,
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report_row(collector_name, num_devices, result):
+    latencies = sorted(result['latencies'])
+    succeeded = len(latencies)
+    print('{:<10}{:>8}{:>8}{:>10.2f}{:>14.2f}{:>10.3f}{:>10.3f}{:>14.1f}'.format(
+        collector_name,
+        num_devices,
+        len(result['errors']),
+        result['total_time'],
+        succeeded / result['total_time'],
+        percentile(latencies, 50),
+        percentile(latencies, 99),
+        result['peak_rss_kb'] / 1024,
+    ))
+    print_errors(result['errors'])
+
+
+def print_errors(errors):
+    """Prints every distinct error under the report row with the number of hosts and the first host"""
+    hosts_by_error = defaultdict(list)
+    for host, error in errors.items():
+        hosts_by_error[error].append(host)
+    for error, hosts in sorted(hosts_by_error.items(), key=lambda item: -len(item[1])):
+        print('{:>10}{:>8} failed, e.g. {}: {}'.format('', len(hosts), hosts[0], error))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark of MAC address table collectors')
+    parser.add_argument('-s', '--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='numbers of devices in the farm')
+    parser.add_argument('-c', '--collectors', nargs='+', choices=list(COLLECTORS), default=list(COLLECTORS),
+                        help='collectors to benchmark')
+    parser.add_argument('-l', '--latency', type=float, default=DEFAULT_LATENCY,
+                        help='delay in seconds before every command output')
+    parser.add_argument('-m', '--mac-entries', type=int, default=DEFAULT_MAC_ENTRIES,
+                        help='number of entries in MAC address table of every device')
+    parser.add_argument('-p', '--port', type=int, default=FARM_PORT, help='SSH port of the fake devices')
+    parser.add_argument('-t', '--threads', type=int, default=THREADING_MAX_WORKERS,
+                        help='number of threads for threading collector')
+    parser.add_argument('--worker', choices=list(COLLECTORS), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.worker:
+        run_worker(args.worker, args.sizes[0], args.port, args.threads)
+        return
+
+    print('{:<10}{:>8}{:>8}{:>10}{:>14}{:>10}{:>10}{:>14}'.format(
+        'collector', 'devices', 'failed', 'time, s', 'devices/s', 'p50, s', 'p99, s', 'peak RSS, MiB'
+    ))
+    for num_devices in args.sizes:
+        farm = start_farm_process(num_devices, args.port, args.latency, args.mac_entries)
+        try:
+            for collector_name in args.collectors:
+                result = run_collector_process(collector_name, num_devices, args.port, args.threads)
+                print_report_row(collector_name, num_devices, result)
+        finally:
+            farm.terminate()
+            farm.wait()
+
+
+if __name__ == '__main__':
+    main()
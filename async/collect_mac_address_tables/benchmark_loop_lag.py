@@ -0,0 +1,66 @@
+"""
+Event loop lag while MAC address tables of many switches are parsed,
+parsing on the event loop vs parsing in the process pool
+
+Sessions are simulated with random delays, so only parsing competes for the event loop.
+
+Usage:
+    python benchmark_loop_lag.py [number of switches] [MAC addresses per switch]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('USERNAME', 'benchmark')
+os.environ.setdefault('PASSWORD', 'benchmark')
+
+from canned_outputs import generate_device_outputs  # noqa: E402
+from collection_async import COMMANDS, parse_show_outputs  # noqa: E402
+from loop_lag import LoopLagMonitor  # noqa: E402
+
+
+NUM_SWITCHES = 50
+NUM_MAC_ENTRIES = 30000
+MAX_SESSION_TIME = 2
+
+
+async def simulate_switch(outputs, parse_executor):
+    await asyncio.sleep(random.uniform(0, MAX_SESSION_TIME))
+    return await parse_show_outputs(outputs, parse_executor)
+
+
+async def run(all_outputs, parse_executor):
+    monitor = LoopLagMonitor()
+    monitor.start()
+    await asyncio.gather(*[simulate_switch(outputs, parse_executor) for outputs in all_outputs])
+    monitor.stop()
+    return monitor.summary()
+
+
+def main():
+    num_switches = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_SWITCHES
+    num_mac_entries = int(sys.argv[2]) if len(sys.argv) > 2 else NUM_MAC_ENTRIES
+    all_outputs = []
+    for device_num in range(num_switches):
+        hostname = 'SW-{:04d}'.format(device_num)
+        outputs = generate_device_outputs(hostname, device_num, num_mac_entries)
+        all_outputs.append([outputs[command] for command in COMMANDS])
+
+    print('{} switches, {} MAC addresses each'.format(num_switches, num_mac_entries))
+    print('{:<14}{:>10}{:>12}{:>12}{:>12}'.format('parsing', 'time, s', 'lag p50, ms', 'lag p99, ms', 'lag max, ms'))
+    loop = asyncio.get_event_loop()
+    with ProcessPoolExecutor() as parse_executor:
+        for name, executor in (('event loop', None), ('process pool', parse_executor)):
+            random.seed(42)
+            start_time = time.perf_counter()
+            lag = loop.run_until_complete(run(all_outputs, executor))
+            print('{:<14}{:>10.2f}{:>12.1f}{:>12.1f}{:>12.1f}'.format(
+                name, time.perf_counter() - start_time, lag['p50'] * 1000, lag['p99'] * 1000, lag['max'] * 1000
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import os
+import sys
+import timeit
+import tracemalloc
+
+os.environ.setdefault('USERNAME', 'benchmark')
+os.environ.setdefault('PASSWORD', 'benchmark')
+
+from canned_outputs import generate_show_mac_address_table  # noqa: E402
+from collection_async import parse_show_mac_address_table, parse_show_mac_address_table_columnar  # noqa: E402
+
+
+NUM_ENTRIES = 60000
+NUM_REPEATS = 5
+
+
+def dict_based(cli_output):
+    return parse_show_mac_address_table(cli_output, {})['mac_address_table']
+
+
+def columnar(cli_output):
+    return parse_show_mac_address_table_columnar(cli_output).render()
+
+
+def columnar_without_rendering(cli_output):
+    return parse_show_mac_address_table_columnar(cli_output)
+
+
+def measure_peak_memory(func, cli_output):
+    tracemalloc.start()
+    result = func(cli_output)  # noqa: F841
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    num_entries = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_ENTRIES
+    cli_output = generate_show_mac_address_table(num_entries)
+    print('Parsing "show mac address-table" with {} entries, best of {} runs'.format(num_entries, NUM_REPEATS))
+    print('{:<30}{:>12}{:>16}'.format('parser', 'time, ms', 'peak mem, MiB'))
+    for func in (dict_based, columnar, columnar_without_rendering):
+        best_time = min(timeit.repeat(lambda: func(cli_output), number=1, repeat=NUM_REPEATS))
+        peak_memory = measure_peak_memory(func, cli_output)
+        print('{:<30}{:>12.1f}{:>16.1f}'.format(func.__name__, best_time * 1000, peak_memory / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import random
+
+
+NUM_VLANS = 200
+UPLINK_INTERFACES = ['Gi1/1/1', 'Gi1/1/2']
+# uplinks are bundled, CDP/LLDP neighbors are on the members and MAC addresses on the Port-channel
+UPLINK_PORT_CHANNEL = 'Po1'
+
+SHOW_VERSION_TEMPLATE = '''Cisco IOS Software, C3750E Software (C3750E-UNIVERSALK9-M), Version 15.2(4)E8, RELEASE SOFTWARE (fc1)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2019 by Cisco Systems, Inc.
+
+ROM: Bootstrap program is C3750E boot loader
+BOOTLDR: C3750E Boot Loader (C3750X-HBOOT-M) Version 12.2(58r)SE, RELEASE SOFTWARE (fc1)
+
+{hostname} uptime is 2 years, 12 weeks, 3 days, 1 hour, 4 minutes
+System returned to ROM by power-on
+System image file is "flash:/c3750e-universalk9-mz.152-4.E8.bin"
+
+cisco WS-C3750X-48P (PowerPC405) processor (revision W0) with 262144K bytes of memory.
+Processor board ID FDO1234X00Z
+Base ethernet MAC Address       : 00:11:22:33:44:55
+'''
+
+SHOW_MAC_ADDR_TABLE_HEADER = '''          Mac Address Table
+-------------------------------------------
+
+Vlan    Mac Address       Type        Ports
+----    -----------       --------    -----
+'''
+
+CDP_NEIGHBOR_TEMPLATE = '''-------------------------
+Device ID: {remote_hostname}.example.com
+Entry address(es):
+  IP address: 10.0.0.{num}
+Platform: cisco WS-C3850-48P,  Capabilities: Switch IGMP
+Interface: {local_interface},  Port ID (outgoing port): {remote_interface}
+Holdtime : 150 sec
+
+Version :
+Cisco IOS Software [Fuji], Catalyst L3 Switch Software (CAT3K_CAA-UNIVERSALK9-M), Version 16.9.4
+
+advertisement version: 2
+Native VLAN: 1
+Duplex: full
+'''
+
+LLDP_NEIGHBOR_TEMPLATE = '''------------------------------------------------
+Local Intf: {local_interface}
+Chassis id: 0011.2233.44{num:02x}
+Port id: {remote_interface}
+Port Description: {remote_interface}
+System Name: {remote_hostname}
+
+System Description:
+Cisco IOS Software [Fuji], Catalyst L3 Switch Software (CAT3K_CAA-UNIVERSALK9-M), Version 16.9.4
+
+Time remaining: 105 seconds
+System Capabilities: B,R
+Enabled Capabilities: B,R
+'''
+
+SHOW_ETHERCHANNEL_SUMMARY_HEADER = '''Flags:  D - down        P - bundled in port-channel
+        I - stand-alone s - suspended
+        H - Hot-standby (LACP only)
+        R - Layer3      S - Layer2
+        U - in use      f - failed to allocate aggregator
+
+Number of channel-groups in use: {num_groups}
+Number of aggregators:           {num_groups}
+
+Group  Port-channel  Protocol    Ports
+------+-------------+-----------+-----------------------------------------------
+'''
+
+LONG_INTERFACE_NAMES = {'Gi': 'GigabitEthernet', 'Te': 'TenGigabitEthernet'}
+
+
+def get_access_interfaces(stack_members=9):
+    interfaces = ['Gi{}/0/{}'.format(member, port) for member in range(1, stack_members + 1) for port in range(1, 49)]
+    interfaces += ['Te{}/1/{}'.format(member, port) for member in range(1, stack_members + 1) for port in range(1, 5)]
+    interfaces += ['Po{}'.format(num) for num in range(1, 9)]
+    return interfaces
+
+
+def expand_interface_name(interface_name):
+    return LONG_INTERFACE_NAMES.get(interface_name[:2], interface_name[:2]) + interface_name[2:]
+
+
+def generate_show_version(hostname):
+    return SHOW_VERSION_TEMPLATE.format(hostname=hostname)
+
+
+def generate_show_mac_address_table(num_entries, seed=42, interfaces=None):
+    """
+    Generates output of "show mac address-table" of a stack of access switches
+
+    Args:
+        num_entries (int): number of MAC addresses in the table
+        seed (int): seed for random generator, the same seed produces the same output
+        interfaces (list): interface names to spread MAC addresses over
+
+    Returns:
+        str: output of the command
+    """
+    rnd = random.Random(seed)
+    interfaces = interfaces or get_access_interfaces()
+    rows = []
+    for _ in range(num_entries):
+        mac = '{:012x}'.format(rnd.getrandbits(48))
+        rows.append('{:>4}    {}.{}.{}    DYNAMIC     {}'.format(
+            rnd.randint(1, NUM_VLANS), mac[:4], mac[4:8], mac[8:], rnd.choice(interfaces)
+        ))
+    return '{}{}\nTotal Mac Addresses for this criterion: {}\n'.format(
+        SHOW_MAC_ADDR_TABLE_HEADER, '\n'.join(rows), num_entries
+    )
+
+
+def generate_show_etherchannel_summary(port_channels):
+    """
+    Args:
+        port_channels (dict): key is Port-channel short name, value is the list of member ports
+
+    Returns:
+        str: output of "show etherchannel summary", two member ports per line
+    """
+    rows = []
+    for group, (port_channel, members) in enumerate(port_channels.items(), 1):
+        ports = ['{}(P)'.format(member) for member in members]
+        rows.append('{:<7}{:<14}{:<12}{}'.format(group, port_channel + '(SU)', 'LACP', ' '.join(ports[:2])))
+        rows.extend('{:<33}{}'.format('', ' '.join(ports[i:i + 2])) for i in range(2, len(ports), 2))
+    return SHOW_ETHERCHANNEL_SUMMARY_HEADER.format(num_groups=len(port_channels)) + '\n'.join(rows) + '\n'
+
+
+def generate_show_cdp_neighbors_detail(neighbors):
+    """
+    Args:
+        neighbors (list): tuples (local_interface, remote_hostname, remote_interface)
+            with short interface names
+
+    Returns:
+        str: output of "show cdp neighbors detail"
+    """
+    entries = [
+        CDP_NEIGHBOR_TEMPLATE.format(
+            num=num,
+            local_interface=expand_interface_name(local_interface),
+            remote_hostname=remote_hostname,
+            remote_interface=expand_interface_name(remote_interface),
+        )
+        for num, (local_interface, remote_hostname, remote_interface) in enumerate(neighbors, 1)
+    ]
+    return '\n'.join(entries) + '\n\nTotal cdp entries displayed : {}\n'.format(len(entries))
+
+
+def generate_show_lldp_neighbors_detail(neighbors):
+    """
+    Args:
+        neighbors (list): tuples (local_interface, remote_hostname, remote_interface)
+            with short interface names
+
+    Returns:
+        str: output of "show lldp neighbors detail"
+    """
+    entries = [
+        LLDP_NEIGHBOR_TEMPLATE.format(
+            num=num,
+            local_interface=local_interface,
+            remote_hostname=remote_hostname,
+            remote_interface=remote_interface,
+        )
+        for num, (local_interface, remote_hostname, remote_interface) in enumerate(neighbors, 1)
+    ]
+    return '\n'.join(entries) + '\n\nTotal entries displayed: {}\n'.format(len(entries))
+
+
+def generate_device_outputs(hostname, device_num, num_mac_entries):
+    """
+    Generates outputs of all show commands used by the collectors for one switch.
+    Every switch has CDP and LLDP neighbors on its uplinks.
+
+    Returns:
+        dict: key is the command, value is the output
+    """
+    neighbors = [
+        (local_interface, 'DIST-{:02d}'.format(uplink_num), 'Te1/0/{}'.format(device_num % 48 + 1))
+        for uplink_num, local_interface in enumerate(UPLINK_INTERFACES, 1)
+    ]
+    return {
+        'show version': generate_show_version(hostname),
+        'show etherchannel summary': generate_show_etherchannel_summary({UPLINK_PORT_CHANNEL: UPLINK_INTERFACES}),
+        'show lldp neighbors detail': generate_show_lldp_neighbors_detail(neighbors),
+        'show cdp neighbors detail': generate_show_cdp_neighbors_detail(neighbors),
+        'show mac address-table': generate_show_mac_address_table(num_mac_entries, seed=device_num),
+    }
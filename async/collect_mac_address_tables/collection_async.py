@@ -1,12 +1,23 @@
 import re
+import sys
 import time
 import asyncio
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 
 import netdev
 from decouple import config
 import yaml
 
+from instrumentation import call_with_spans, INSTRUMENTATION, current_device, timed
+from mac_locator import MacLocatorIndex
+from mac_snapshots import SnapshotStore, render_delta
+from mac_table import MacAddressTable
+from pipelining import send_commands
+from result_writer import ResultWriter
+from scheduler import Scheduler
+
 
 INVENTORY_FILE = 'mac_address_table_inventory.yml'
 
@@ -37,9 +48,52 @@ LLDP_NEIGHBOR_RE = re.compile(
     re.M | re.S
 )
 
+# group, Port-channel with flags, protocol and member ports, which may continue on the next lines
+ETHERCHANNEL_GROUP_RE = re.compile(r'^\d+\s+(?P<port_channel>Po\d+)\(\w+\)\s+\S+\s*(?P<ports>.*)$')
+ETHERCHANNEL_PORT_RE = re.compile(r'(\S+?)\(\w+\)')
+
 NEIGHBOR_SPLIT_RE = re.compile(r'\n\n-{6,}\n')
 INTERFACE_NAME_RE = re.compile(r'(?P<interface_type>[a-zA-Z\-]+)(?P<interface_number>[\d/.\-]+)')
 
+# netdev.DisconnectError is not retried because it is also raised when authentication fails
+TRANSIENT_EXCEPTIONS = (OSError, asyncio.TimeoutError, netdev.TimeoutError)
+
+COMMANDS = [
+    'show version',
+    'show etherchannel summary',
+    'show lldp neighbors detail',
+    'show cdp neighbors detail',
+    'show mac address-table',
+]
+
+# send all show commands at once instead of waiting for the prompt after every command
+PIPELINED_COMMANDS = True
+
+# parse MAC address tables into compact arrays instead of the list of dictionaries
+COLUMNAR_MAC_ADDR_TABLE = False
+
+# directory with MAC address table snapshots from the previous run,
+# when set, only added, removed and moved MAC addresses are printed
+MAC_TABLE_SNAPSHOTS_DIR = None
+
+# file with the index of MAC addresses on edge ports of all switches, see mac_locator.py
+MAC_LOCATOR_INDEX_FILE = None
+
+# write MAC address table entries to the file as soon as every switch is done
+# instead of printing all tables at the end, '-' means stdout
+STREAM_OUTPUT_FILE = None
+STREAM_OUTPUT_FORMAT = 'ndjson'
+STREAM_OUTPUT_FIELDS = ['host', 'hostname', 'vlan', 'mac_address', 'type', 'interface', 'neighbors']
+
+# parse big outputs in separate processes, so regular expressions do not block the event loop
+PARSE_IN_PROCESS_POOL = False
+PARSE_PROCESS_POOL_WORKERS = None
+# total size of CDP, LLDP and MAC address table outputs in characters
+PARSE_IN_PROCESS_POOL_THRESHOLD = 256 * 1024
+
+# record connect, command and parse times of every switch and save them to the JSON file
+INSTRUMENTATION_TRACE_FILE = None
+
 
 def read_inventory_yaml(file_name=INVENTORY_FILE):
     with open(file_name) as f:
@@ -51,15 +105,32 @@ def get_switches_ip_addresses():
     return read_inventory_yaml()['switches']
 
 
+def get_switches():
+    """
+    Returns list of tuples (host, site). In the inventory a switch is either an IP address
+    or a dictionary with "host" and optional "site" keys
+    """
+    result = []
+    for switch in get_switches_ip_addresses():
+        if isinstance(switch, dict):
+            result.append((switch['host'], switch.get('site')))
+        else:
+            result.append((switch, None))
+    return result
+
+
+# the same interface names repeat in every CDP output, so parsed names are cached
+@lru_cache(maxsize=4096)
 def shorten_interface_name(interface_name):
     match = INTERFACE_NAME_RE.match(interface_name)
     if match is not None:
         parsed_values = match.groupdict()
         parsed_values['interface_type'] = parsed_values['interface_type'][:2]
-        return '{interface_type}{interface_number}'.format(**parsed_values)
+        return sys.intern('{interface_type}{interface_number}'.format(**parsed_values))
     return interface_name
 
 
+@timed()
 def parse_show_version(cli_output):
     result = dict()
     for regexp in SHOW_VERSION_REGEXP_LIST:
@@ -67,6 +138,26 @@ def parse_show_version(cli_output):
     return result
 
 
+@timed()
+def parse_show_etherchannel_summary(cli_output):
+    """
+    Returns:
+        dict: key is Port-channel short name, value is the list of its member ports
+    """
+    result = {}
+    members = None
+    for line in cli_output.splitlines():
+        match = ETHERCHANNEL_GROUP_RE.match(line)
+        if match:
+            members = result.setdefault(match.group('port_channel'), [])
+            line = match.group('ports')
+        elif members is None or not line.startswith(' '):
+            continue
+        members.extend(ETHERCHANNEL_PORT_RE.findall(line))
+    return result
+
+
+@timed()
 def parse_show_mac_address_table(cli_output, neighbors):
     def get_interface_neighbors_string(interface_name):
         interface_neighbors = neighbors.get(interface_name)
@@ -97,6 +188,14 @@ def parse_show_mac_address_table(cli_output, neighbors):
     return result
 
 
+@timed()
+def parse_show_mac_address_table_columnar(cli_output):
+    mac_address_table = MacAddressTable.from_cli_output(cli_output)
+    mac_address_table.sort_by_interface()
+    return mac_address_table
+
+
+@timed()
 def parse_show_cdp_neighbors(cli_output, result):
     for neighbor_output in NEIGHBOR_SPLIT_RE.split(cli_output):
         match = CDP_NEIGHBOR_RE.search(neighbor_output)
@@ -108,6 +207,7 @@ def parse_show_cdp_neighbors(cli_output, result):
             result[short_local_interface_name].append(parsed_values)
 
 
+@timed()
 def parse_show_lldp_neighbors(cli_output, result):
     for neighbor_output in NEIGHBOR_SPLIT_RE.split(cli_output):
         match = LLDP_NEIGHBOR_RE.search(neighbor_output)
@@ -118,45 +218,197 @@ def parse_show_lldp_neighbors(cli_output, result):
             result[short_local_interface_name].append(parsed_values)
 
 
-async def get_mac_address_table(host):
+async def collect_show_outputs(host, pipelined=PIPELINED_COMMANDS):
+    # spans recorded by this task, including parsers, belong to the host
+    current_device.set(host)
     device_params = GLOBAL_DEVICE_PARAMS.copy()
     device_params['host'] = host
-    parsed_values = dict()
-    neighbors = defaultdict(list)
+    if not INSTRUMENTATION.enabled:
+        async with netdev.create(**device_params) as device_conn:
+            return await send_commands(device_conn, COMMANDS, device_params['device_type'], pipelined=pipelined)
+
+    ssh_tunnel = INSTRUMENTATION.get_ssh_tunnel(host)
+    device_conn = netdev.create(tunnel=ssh_tunnel, **device_params)
+    with INSTRUMENTATION.span('connect', 'session', host):
+        await device_conn.connect()
+        ssh_tunnel.session_ready()
+    try:
+        return await send_commands(
+            device_conn, COMMANDS, device_params['device_type'], pipelined=pipelined,
+            on_command_done=lambda command, duration: INSTRUMENTATION.record('command', command, duration, host),
+        )
+    finally:
+        await device_conn.disconnect()
+
 
-    async with netdev.create(**device_params) as device_conn:
-        show_version_output = await device_conn.send_command('show version')
-        parsed_values.update(parse_show_version(show_version_output))
+def parse_neighbors(show_lldp_neighbor_output, show_cdp_neighbor_output):
+    neighbors = defaultdict(list)
+    parse_show_lldp_neighbors(show_lldp_neighbor_output, neighbors)
+    parse_show_cdp_neighbors(show_cdp_neighbor_output, neighbors)
+    return neighbors
+
+
+def parse_neighbors_and_mac_address_table(show_lldp_neighbor_output, show_cdp_neighbor_output,
+                                          show_mac_address_table_output):
+    """
+    Parses the biggest outputs. Runs in the process pool, so the result is compact:
+    neighbors as a plain dictionary and MAC address table as arrays
+    """
+    neighbors = dict(parse_neighbors(show_lldp_neighbor_output, show_cdp_neighbor_output))
+    mac_address_table = parse_show_mac_address_table_columnar(show_mac_address_table_output)
+    return neighbors, mac_address_table
+
+
+async def parse_show_outputs(outputs, parse_executor=None):
+    """
+    Parses outputs of COMMANDS, CDP, LLDP and MAC address table outputs are parsed
+    in parse_executor if their total size is above PARSE_IN_PROCESS_POOL_THRESHOLD
+
+    Returns:
+        tuple: parsed "show version" dictionary with Port-channel members in "port_channels",
+            neighbors dictionary and MacAddressTable
+    """
+    show_version_output, show_etherchannel_summary_output, *big_outputs = outputs
+    parsed_values = parse_show_version(show_version_output)
+    parsed_values['port_channels'] = parse_show_etherchannel_summary(show_etherchannel_summary_output)
+    if parse_executor is not None and sum(map(len, big_outputs)) >= PARSE_IN_PROCESS_POOL_THRESHOLD:
+        loop = asyncio.get_event_loop()
+        if INSTRUMENTATION.enabled:
+            (neighbors, mac_address_table), spans = await loop.run_in_executor(
+                parse_executor, call_with_spans, parse_neighbors_and_mac_address_table, *big_outputs
+            )
+            INSTRUMENTATION.add_spans(spans)
+        else:
+            neighbors, mac_address_table = await loop.run_in_executor(
+                parse_executor, parse_neighbors_and_mac_address_table, *big_outputs
+            )
+    else:
+        neighbors, mac_address_table = parse_neighbors_and_mac_address_table(*big_outputs)
+    return parsed_values, neighbors, mac_address_table
+
+
+async def get_mac_address_table_records(host, pipelined=PIPELINED_COMMANDS, locator_index=None, parse_executor=None):
+    """
+    Collects MAC address table from the switch
+
+    Returns:
+        list: one dictionary per MAC address with STREAM_OUTPUT_FIELDS keys
+    """
+    outputs = await collect_show_outputs(host, pipelined)
+    parsed_values, neighbors, mac_address_table = await parse_show_outputs(outputs, parse_executor)
+    hostname = parsed_values['hostname']
+    if locator_index is not None:
+        locator_index.add_switch(hostname, mac_address_table, neighbors, parsed_values['port_channels'])
+    return [
+        {
+            'host': host,
+            'hostname': hostname,
+            'vlan': vlan,
+            'mac_address': mac_address,
+            'type': entry_type,
+            'interface': interface_name,
+            'neighbors': ', '.join(
+                '{remote_hostname} {remote_interface} {protocol}'.format(**neighbor)
+                for neighbor in neighbors.get(interface_name, [])
+            ),
+        }
+        for vlan, mac_address, entry_type, interface_name in mac_address_table
+    ]
 
-        show_lldp_neighbor_output = await device_conn.send_command('show lldp neighbors detail')
-        parse_show_lldp_neighbors(show_lldp_neighbor_output, neighbors)
 
-        show_cdp_neighbor_output = await device_conn.send_command('show cdp neighbors detail')
-        parse_show_cdp_neighbors(show_cdp_neighbor_output, neighbors)
+async def get_mac_address_table(host, columnar=COLUMNAR_MAC_ADDR_TABLE, pipelined=PIPELINED_COMMANDS,
+                                snapshot_store=None, locator_index=None, parse_executor=None):
+    outputs = await collect_show_outputs(host, pipelined)
 
-        show_mac_address_table_output = await device_conn.send_command('show mac address-table')
+    if not (columnar or snapshot_store is not None or locator_index is not None or parse_executor is not None):
+        (show_version_output, _, show_lldp_neighbor_output, show_cdp_neighbor_output,
+         show_mac_address_table_output) = outputs
+        parsed_values = parse_show_version(show_version_output)
+        neighbors = parse_neighbors(show_lldp_neighbor_output, show_cdp_neighbor_output)
         parsed_values.update(parse_show_mac_address_table(show_mac_address_table_output, neighbors))
-        result = '{hostname} MAC address table:\n{mac_address_table}\n'.format(**parsed_values)
-        return result
+    else:
+        parsed_values, neighbors, mac_address_table = await parse_show_outputs(outputs, parse_executor)
+        if locator_index is not None:
+            locator_index.add_switch(
+                parsed_values['hostname'], mac_address_table, neighbors, parsed_values['port_channels']
+            )
+        if snapshot_store is not None:
+            delta = snapshot_store.update(parsed_values['hostname'], mac_address_table)
+            return '{} MAC address table changes: {}\n'.format(parsed_values['hostname'], render_delta(delta))
+        parsed_values['mac_address_table'] = mac_address_table.render(neighbors)
+    result = '{hostname} MAC address table:\n{mac_address_table}\n'.format(**parsed_values)
+    return result
 
 
-def main():
-    start_time = time.time()
+async def stream_mac_address_tables(switches, scheduler, writer, locator_index=None, parse_executor=None):
+    collect = partial(get_mac_address_table_records, locator_index=locator_index, parse_executor=parse_executor)
+    async for host, records, failure in scheduler.iter_run(collect, switches):
+        if failure is None:
+            writer.device_done(records)
+        else:
+            writer.device_failed(host, failure.exception)
 
-    ip_list = get_switches_ip_addresses()
 
+def print_mac_address_tables(switches, scheduler, **collect_kwargs):
+    collect = partial(get_mac_address_table, **collect_kwargs)
     loop = asyncio.get_event_loop()
-    tasks = [
-        loop.create_task(get_mac_address_table(ip))
-        for ip in ip_list
-    ]
+    results, failures = loop.run_until_complete(scheduler.run(collect, switches))
 
-    loop.run_until_complete(asyncio.wait(tasks))
+    for host, _ in switches:
+        if host in results:
+            print(results[host])
 
-    for task in tasks:
-        print(task.result())
+    for failure in failures:
+        print('Failed to collect MAC address table from {host} (site: {site}) '
+              'after {attempts} attempt(s): {exception!r}'.format(**failure._asdict()))
+
+
+def main():
+    start_time = time.time()
 
-    print('It took {} seconds to run'.format(time.time() - start_time))
+    if STREAM_OUTPUT_FILE is not None and MAC_TABLE_SNAPSHOTS_DIR is not None:
+        sys.exit('MAC_TABLE_SNAPSHOTS_DIR can not be used with STREAM_OUTPUT_FILE: '
+                 'streamed records are complete MAC address tables, not changes')
+    # in streaming mode stdout may be the output file
+    report_file = sys.stderr if STREAM_OUTPUT_FILE is not None else sys.stdout
+
+    switches = get_switches()
+    if INSTRUMENTATION_TRACE_FILE is not None:
+        INSTRUMENTATION.enable()
+    scheduler = Scheduler(transient_exceptions=TRANSIENT_EXCEPTIONS)
+    collect_kwargs = {}
+    if MAC_TABLE_SNAPSHOTS_DIR is not None:
+        collect_kwargs['snapshot_store'] = SnapshotStore(MAC_TABLE_SNAPSHOTS_DIR)
+    if MAC_LOCATOR_INDEX_FILE is not None:
+        collect_kwargs['locator_index'] = MacLocatorIndex()
+    parse_executor = ProcessPoolExecutor(PARSE_PROCESS_POOL_WORKERS) if PARSE_IN_PROCESS_POOL else None
+    collect_kwargs['parse_executor'] = parse_executor
+
+    try:
+        if STREAM_OUTPUT_FILE is not None:
+            writer = ResultWriter(STREAM_OUTPUT_FILE, STREAM_OUTPUT_FORMAT, STREAM_OUTPUT_FIELDS, total=len(switches))
+            with writer:
+                loop = asyncio.get_event_loop()
+                loop.run_until_complete(stream_mac_address_tables(switches, scheduler, writer, **collect_kwargs))
+            # the progress line is finished when the writer is closed
+            for host, exception in writer.failures:
+                print('Failed to collect MAC address table from {}: {!r}'.format(host, exception), file=report_file)
+        else:
+            print_mac_address_tables(switches, scheduler, **collect_kwargs)
+    finally:
+        if parse_executor is not None:
+            parse_executor.shutdown()
+
+    if MAC_LOCATOR_INDEX_FILE is not None:
+        # switches which failed keep their entries from the previous runs
+        locator_index = MacLocatorIndex.load(MAC_LOCATOR_INDEX_FILE, missing_ok=True)
+        locator_index.update(collect_kwargs['locator_index'])
+        locator_index.save(MAC_LOCATOR_INDEX_FILE)
+    if INSTRUMENTATION_TRACE_FILE is not None:
+        INSTRUMENTATION.export_trace(INSTRUMENTATION_TRACE_FILE)
+        print(INSTRUMENTATION.format_summary(), file=report_file)
+
+    print('It took {} seconds to run'.format(time.time() - start_time), file=report_file)
 
 
 if __name__ == '__main__':
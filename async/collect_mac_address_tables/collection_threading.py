@@ -6,6 +6,8 @@ from netmiko import ConnectHandler
 from decouple import config
 import yaml
 
+from instrumentation import INSTRUMENTATION, timed
+
 
 INVENTORY_FILE = 'mac_address_table_inventory.yml'
 
@@ -26,6 +28,9 @@ SHOW_MAC_ADDR_TABLE_RE = re.compile(
     r'^\s*(?P<vlan_number>\d+)\s+(?P<mac_address>\S+)\s+(?P<type>\S+)\s+(?P<interface_name>\S+)', re.M
 )
 
+# record connect, command and parse times of every switch and save them to the JSON file
+INSTRUMENTATION_TRACE_FILE = None
+
 
 def read_inventory_yaml(file_name=INVENTORY_FILE):
     with open(file_name) as f:
@@ -37,6 +42,7 @@ def get_switches_ip_addresses():
     return read_inventory_yaml()['switches']
 
 
+@timed()
 def parse_show_version(cli_output):
     result = dict()
     for regexp in SHOW_VERSION_REGEXP_LIST:
@@ -44,6 +50,7 @@ def parse_show_version(cli_output):
     return result
 
 
+@timed()
 def parse_show_mac_address_table(cli_output):
     mac_address_table = [
         match.groupdict()
@@ -63,14 +70,22 @@ def parse_show_mac_address_table(cli_output):
     return result
 
 
+def send_command(device_conn, command):
+    with INSTRUMENTATION.span('command', command):
+        return device_conn.send_command(command)
+
+
 def get_mac_address_table(host):
     device_params = GLOBAL_DEVICE_PARAMS.copy()
     device_params['ip'] = host
-    device_conn = ConnectHandler(**device_params)
+    with INSTRUMENTATION.device(host):
+        # netmiko does not expose TCP connect and SSH authentication separately
+        with INSTRUMENTATION.span('connect', 'session'):
+            device_conn = ConnectHandler(**device_params)
 
-    parsed_values = dict()
-    parsed_values.update(parse_show_version(device_conn.send_command('show version')))
-    parsed_values.update(parse_show_mac_address_table(device_conn.send_command('show mac address-table')))
+        parsed_values = dict()
+        parsed_values.update(parse_show_version(send_command(device_conn, 'show version')))
+        parsed_values.update(parse_show_mac_address_table(send_command(device_conn, 'show mac address-table')))
 
     result = '{hostname} MAC address table:\n{mac_address_table}'.format(**parsed_values)
     device_conn.disconnect()
@@ -79,6 +94,8 @@ def get_mac_address_table(host):
 
 def main():
     start_time = time.time()
+    if INSTRUMENTATION_TRACE_FILE is not None:
+        INSTRUMENTATION.enable()
 
     ip_list = get_switches_ip_addresses()
 
@@ -88,6 +105,10 @@ def main():
     for result in results:
         print(result)
 
+    if INSTRUMENTATION_TRACE_FILE is not None:
+        INSTRUMENTATION.export_trace(INSTRUMENTATION_TRACE_FILE)
+        print(INSTRUMENTATION.format_summary())
+
     print('It took {} seconds to run'.format(time.time() - start_time))
 
 
@@ -0,0 +1,154 @@
+"""
+Farm of fake Cisco IOS switches serving canned outputs over SSH
+
+Every device listens on its own loopback address (127.1.x.y) on the same port,
+so the collectors can reach it without any changes, only the port has to be overridden.
+Any username and password are accepted.
+"""
+import argparse
+import asyncio
+import resource
+import sys
+
+import asyncssh
+
+from canned_outputs import generate_device_outputs
+
+
+FARM_PORT = 8022
+DEFAULT_NUM_DEVICES = 10
+DEFAULT_LATENCY = 0.05
+DEFAULT_MAC_ENTRIES = 1000
+
+
+def get_device_address(device_num):
+    """
+    Returns loopback address of the device, 250 devices per /24 starting from 127.1.0.1
+    """
+    return '127.1.{}.{}'.format(device_num // 250, device_num % 250 + 1)
+
+
+def get_devices_addresses(num_devices):
+    return [get_device_address(device_num) for device_num in range(num_devices)]
+
+
+def raise_open_files_limit():
+    """
+    Every SSH session needs a socket, so the default limit of 1024 open files
+    is not enough for 1,000 devices
+    """
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit != hard_limit:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+
+
+class FakeDevice:
+    def __init__(self, hostname, outputs, latency):
+        self.hostname = hostname
+        self.outputs = outputs
+        self.latency = latency
+
+    @property
+    def prompt(self):
+        return '{}#'.format(self.hostname)
+
+    def get_output(self, command):
+        """
+        Returns output of the command, configuration commands like
+        "terminal length 0" produce empty output
+        """
+        command = ' '.join(command.split())
+        return self.outputs.get(command, '')
+
+    async def handle_session(self, process):
+        process.stdout.write('\r\n' + self.prompt)
+        try:
+            while True:
+                line = await process.stdin.readline()
+                if not line:
+                    break
+                command = line.strip()
+                # like IOS, typed-ahead command is echoed only when it is read after the prompt
+                process.stdout.write(command + '\r\n')
+                if command in ('exit', 'logout'):
+                    break
+                if command:
+                    await asyncio.sleep(self.latency)
+                output = self.get_output(command)
+                if output:
+                    process.stdout.write(output.replace('\n', '\r\n') + '\r\n')
+                process.stdout.write(self.prompt)
+        except (asyncssh.BreakReceived, asyncssh.SignalReceived, asyncssh.TerminalSizeChanged, ConnectionError):
+            pass
+        process.exit(0)
+
+
+class FakeDeviceServer(asyncssh.SSHServer):
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        return True
+
+
+async def start_farm(num_devices, port=FARM_PORT, latency=DEFAULT_LATENCY, num_mac_entries=DEFAULT_MAC_ENTRIES):
+    """
+    Starts SSH servers for all fake devices
+
+    Args:
+        num_devices (int): number of devices in the farm
+        port (int): TCP port which every device listens on
+        latency (float): delay in seconds before the output of every command is sent
+        num_mac_entries (int): number of entries in MAC address table of every device
+
+    Returns:
+        list: asyncssh servers, one per device
+    """
+    host_key = asyncssh.generate_private_key('ssh-ed25519')
+    servers = []
+    for device_num in range(num_devices):
+        hostname = 'SW-{:04d}'.format(device_num)
+        device = FakeDevice(hostname, generate_device_outputs(hostname, device_num, num_mac_entries), latency)
+        server = await asyncssh.listen(
+            get_device_address(device_num),
+            port,
+            server_factory=FakeDeviceServer,
+            server_host_keys=[host_key],
+            process_factory=device.handle_session,
+            line_editor=False,
+        )
+        servers.append(server)
+    return servers
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Farm of fake Cisco IOS switches')
+    parser.add_argument('-n', '--devices', type=int, default=DEFAULT_NUM_DEVICES, help='number of devices')
+    parser.add_argument('-p', '--port', type=int, default=FARM_PORT, help='SSH port of every device')
+    parser.add_argument('-l', '--latency', type=float, default=DEFAULT_LATENCY,
+                        help='delay in seconds before every command output')
+    parser.add_argument('-m', '--mac-entries', type=int, default=DEFAULT_MAC_ENTRIES,
+                        help='number of entries in MAC address table of every device')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    raise_open_files_limit()
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(start_farm(args.devices, args.port, args.latency, args.mac_entries))
+    print('Fake device farm is ready: {} devices on {}-{} port {}'.format(
+        args.devices, get_device_address(0), get_device_address(args.devices - 1), args.port
+    ))
+    sys.stdout.flush()
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
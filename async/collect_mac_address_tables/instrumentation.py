@@ -0,0 +1,221 @@
+"""
+Latency instrumentation for the collectors
+
+Spans are recorded per device: connection (TCP connect and SSH login), every command and
+every parser. The result is exported as a histogram
+summary per span name and as a per-device JSON trace.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+
+# upper bounds of histogram buckets in seconds
+HISTOGRAM_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float('inf')]
+
+current_device = ContextVar('current_device', default=None)
+
+# spans recorded in worker processes are kept under this host until they are returned to the parent
+WORKER_HOST = '<worker>'
+
+
+def percentile(sorted_values, percent):
+    """
+    Returns the nearest-rank percentile of the sorted values, nan if there are no values
+    """
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+class Instrumentation:
+    """
+    Collects spans: kind (connect, command, parse), name and duration for every device.
+    Does nothing until enabled, so the hooks can stay in the code.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.device_spans = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def record(self, kind, name, duration, host=None, start_time=None):
+        if not self.enabled:
+            return
+        host = host or current_device.get() or 'unknown'
+        span = {'kind': kind, 'name': name, 'duration': duration}
+        if start_time is not None:
+            span['start'] = start_time
+        with self._lock:
+            self.device_spans[host].append(span)
+
+    def add_spans(self, spans, host=None):
+        """
+        Records spans returned by call_with_spans() from a worker process
+        """
+        host = host or current_device.get() or 'unknown'
+        with self._lock:
+            self.device_spans[host].extend(spans)
+
+    def pop_spans(self, host):
+        with self._lock:
+            return self.device_spans.pop(host, [])
+
+    @contextmanager
+    def span(self, kind, name, host=None):
+        start_time = time.time()
+        start_counter = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - start_counter, host, start_time)
+
+    @contextmanager
+    def device(self, host):
+        """
+        Marks everything recorded inside of the block, including parser spans, as spans of the host
+        """
+        token = current_device.set(host)
+        try:
+            yield
+        finally:
+            current_device.reset(token)
+
+    def timed(self, kind='parse'):
+        """
+        Decorator recording the duration of every call of the function
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(kind, func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def get_ssh_tunnel(self, host):
+        """
+        Returns asyncssh tunnel recording TCP connect time of the host, see TimingTunnel
+        """
+        return TimingTunnel(self, host)
+
+    def summary(self):
+        """
+        Returns:
+            dict: key is "kind name", value is dictionary with count, p50, p90, p99, max
+                and histogram - number of spans in every bucket of HISTOGRAM_BUCKETS
+        """
+        durations = defaultdict(list)
+        with self._lock:
+            for spans in self.device_spans.values():
+                for span in spans:
+                    durations['{} {}'.format(span['kind'], span['name'])].append(span['duration'])
+        result = {}
+        for span_name, values in sorted(durations.items()):
+            values.sort()
+            histogram = [0] * len(HISTOGRAM_BUCKETS)
+            bucket_num = 0
+            for value in values:
+                while value > HISTOGRAM_BUCKETS[bucket_num]:
+                    bucket_num += 1
+                histogram[bucket_num] += 1
+            result[span_name] = {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p90': percentile(values, 90),
+                'p99': percentile(values, 99),
+                'max': values[-1],
+                'histogram': histogram,
+            }
+        return result
+
+    def format_summary(self):
+        lines = ['{:<45}{:>7}{:>10}{:>10}{:>10}{:>10}'.format('span', 'count', 'p50, ms', 'p90, ms', 'p99, ms', 'max, ms')]
+        for span_name, stats in self.summary().items():
+            lines.append('{:<45}{:>7}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}'.format(
+                span_name, stats['count'],
+                stats['p50'] * 1000, stats['p90'] * 1000, stats['p99'] * 1000, stats['max'] * 1000,
+            ))
+        return '\n'.join(lines)
+
+    def get_slowest_devices(self, num_devices=10):
+        """
+        Returns list of tuples (host, total duration of all spans) sorted from the slowest
+        """
+        with self._lock:
+            totals = [(host, sum(span['duration'] for span in spans)) for host, spans in self.device_spans.items()]
+        return sorted(totals, key=lambda item: item[1], reverse=True)[:num_devices]
+
+    def export_trace(self, path):
+        """
+        Saves per-device spans and the histogram summary to JSON file
+        """
+        with self._lock:
+            trace = {
+                'buckets': [str(bucket) for bucket in HISTOGRAM_BUCKETS],
+                'summary': None,
+                'devices': dict(self.device_spans),
+            }
+        trace['summary'] = self.summary()
+        with open(path, 'w') as f:
+            json.dump(trace, f, indent=2)
+
+
+class TimingTunnel:
+    """
+    Opens a direct TCP connection for asyncssh and records how long it took.
+
+    asyncssh accepts any object with create_connection() as the tunnel argument, so the tunnel
+    is passed as a regular netdev/asyncssh connection parameter. Call session_ready() when the
+    session is set up to record the "connect login" span: SSH handshake, authentication, prompt
+    discovery and terminal setup. Authentication is not measured separately, netdev doesn't pass
+    client_factory to asyncssh, so its auth callbacks can't be hooked.
+    """
+
+    def __init__(self, instrumentation, host):
+        self.instrumentation = instrumentation
+        self.host = host
+        self._connected_counter = None
+
+    async def create_connection(self, session_factory, remote_host, remote_port):
+        loop = asyncio.get_event_loop()
+        start_time = time.time()
+        start_counter = time.perf_counter()
+        result = await loop.create_connection(session_factory, remote_host, remote_port)
+        self._connected_counter = time.perf_counter()
+        self.instrumentation.record('connect', 'tcp', self._connected_counter - start_counter, self.host, start_time)
+        return result
+
+    def session_ready(self):
+        if self._connected_counter is not None:
+            self.instrumentation.record('connect', 'login', time.perf_counter() - self._connected_counter, self.host)
+
+
+INSTRUMENTATION = Instrumentation()
+timed = INSTRUMENTATION.timed
+
+
+def call_with_spans(func, *args):
+    """
+    Runs func in a worker process with instrumentation enabled.
+    Spans recorded in the worker are not seen by the parent process, so they are returned
+    with the result and the parent records them with INSTRUMENTATION.add_spans()
+
+    Returns:
+        tuple: result of func and the list of spans recorded by it
+    """
+    INSTRUMENTATION.enable()
+    with INSTRUMENTATION.device(WORKER_HOST):
+        result = func(*args)
+    return result, INSTRUMENTATION.pop_spans(WORKER_HOST)
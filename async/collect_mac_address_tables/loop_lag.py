@@ -0,0 +1,46 @@
+import asyncio
+
+from instrumentation import percentile
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a coroutine sleeping for `interval` seconds.
+    Lag close to zero means nothing blocks the loop, lag of 0.3 means some callback
+    was running for 300 ms without giving control back to the loop.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _measure(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            start_time = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0, loop.time() - start_time - self.interval))
+
+    def start(self):
+        self.lags = []
+        self._task = asyncio.ensure_future(self._measure())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def summary(self):
+        """
+        Returns:
+            dict: p50, p99 and max lag in seconds
+        """
+        lags = sorted(self.lags)
+        if not lags:
+            return {'p50': 0, 'p99': 0, 'max': 0}
+        return {
+            'p50': percentile(lags, 50),
+            'p99': percentile(lags, 99),
+            'max': lags[-1],
+        }
@@ -0,0 +1,326 @@
+"""
+Fleet-wide index answering "which access port is this MAC address on"
+
+Only edge ports are indexed: interfaces with CDP or LLDP neighbors and Port-channels
+with such member ports are uplinks, MAC addresses learned on them are skipped.
+
+Index file format (little-endian):
+    header: magic b'MACL', format version (uint16), number of entries (uint32),
+        length of locations block (uint32)
+    locations: UTF-8 "switch interface" strings separated by newline
+    macs: uint64 per entry, sorted
+    location ids: uint32 per entry, index into locations
+    vlans: uint16 per entry
+
+Usage:
+    python mac_locator.py mac_locator.idx aabb.cc00.0100
+    python mac_locator.py mac_locator.idx aabb.cc --prefix
+    python mac_locator.py mac_locator.idx 00:50:56 00:50:5f --oui-range
+"""
+import argparse
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from pathlib import Path
+
+from mac_table import int_to_mac, mac_to_int
+
+
+INDEX_MAGIC = b'MACL'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sHII')
+
+MAC_HEX_DIGITS = 12
+OUI_HEX_DIGITS = 6
+
+MacLocation = namedtuple('MacLocation', ['mac', 'vlan', 'switch', 'interface'])
+
+
+def parse_mac_prefix(prefix):
+    """
+    Converts MAC address prefix into the range of 48-bit integers
+
+    Args:
+        prefix (str): beginning of MAC address in any notation, e.g. aabb.cc or aa:bb:c
+
+    Returns:
+        tuple: (first, last + 1) MAC address integers matching the prefix
+    """
+    prefix_hex = prefix.replace('.', '').replace(':', '').replace('-', '')
+    if len(prefix_hex) > MAC_HEX_DIGITS:
+        raise ValueError('{!r} is longer than MAC address'.format(prefix))
+    if not prefix_hex:
+        return 0, 1 << 48
+    shift = (MAC_HEX_DIGITS - len(prefix_hex)) * 4
+    value = int(prefix_hex, 16)
+    return value << shift, (value + 1) << shift
+
+
+def parse_oui(oui):
+    oui_hex = oui.replace('.', '').replace(':', '').replace('-', '')
+    if len(oui_hex) != OUI_HEX_DIGITS:
+        raise ValueError('{!r} is not an OUI, expected {} hex digits'.format(oui, OUI_HEX_DIGITS))
+    return int(oui_hex, 16)
+
+
+class MacLocatorIndex:
+    """
+    MAC addresses of all edge ports in the fleet
+
+    MAC addresses are kept in a sorted array, so prefix and OUI range lookups are two binary searches.
+    Exact lookups use a dictionary from MAC address to its first position in the array,
+    which is built on the first lookup.
+    The index of the previous run is updated with update(), entries of switches
+    which were not collected in this run are kept.
+    """
+
+    def __init__(self):
+        self.macs = array('Q')
+        self.location_ids = array('I')
+        self.vlans = array('H')
+        self.locations = []
+        self.switches = set()
+        self._location_to_id = {}
+        self._mac_to_position = None
+        self._is_sorted = True
+
+    def __len__(self):
+        return len(self.macs)
+
+    def __repr__(self):
+        return '{}(entries={}, locations={})'.format(
+            self.__class__.__qualname__, len(self), len(self.locations)
+        )
+
+    def add_switch(self, switch, mac_address_table, neighbors, port_channels=None):
+        """
+        Adds MAC addresses of the switch learned on interfaces without CDP/LLDP neighbors
+
+        CDP and LLDP neighbors are seen on member ports of a Port-channel,
+        while MAC addresses are learned on the Port-channel itself.
+
+        Args:
+            switch (str): switch name
+            mac_address_table (MacAddressTable): parsed MAC address table
+            neighbors (dict): key is short interface name, value is the list of neighbors
+            port_channels (dict): key is short Port-channel name, value is the list of its member ports
+        """
+        uplinks = {interface_name for interface_name, interface_neighbors in neighbors.items() if interface_neighbors}
+        uplinks.update(
+            port_channel for port_channel, members in (port_channels or {}).items()
+            if not uplinks.isdisjoint(members)
+        )
+        if switch in self.switches:
+            self._remove_switches({switch})
+        self.switches.add(switch)
+        edge_location_ids = []
+        for interface_name in mac_address_table.interfaces:
+            if interface_name in uplinks:
+                edge_location_ids.append(None)
+                continue
+            location = '{} {}'.format(switch, interface_name)
+            location_id = self._location_to_id.get(location)
+            if location_id is None:
+                location_id = len(self.locations)
+                self._location_to_id[location] = location_id
+                self.locations.append(location)
+            edge_location_ids.append(location_id)
+
+        for mac, vlan, interface_id in zip(mac_address_table.macs, mac_address_table.vlans,
+                                           mac_address_table.interface_ids):
+            location_id = edge_location_ids[interface_id]
+            if location_id is not None:
+                self.macs.append(mac)
+                self.vlans.append(vlan)
+                self.location_ids.append(location_id)
+        self._is_sorted = False
+        self._mac_to_position = None
+
+    def _remove_switches(self, switches):
+        old_to_new_location_id = []
+        locations = []
+        for location in self.locations:
+            if location.split(' ', 1)[0] in switches:
+                old_to_new_location_id.append(None)
+            else:
+                old_to_new_location_id.append(len(locations))
+                locations.append(location)
+        macs = array('Q')
+        vlans = array('H')
+        location_ids = array('I')
+        for mac, vlan, location_id in zip(self.macs, self.vlans, self.location_ids):
+            new_location_id = old_to_new_location_id[location_id]
+            if new_location_id is not None:
+                macs.append(mac)
+                vlans.append(vlan)
+                location_ids.append(new_location_id)
+        self.macs, self.vlans, self.location_ids = macs, vlans, location_ids
+        self.locations = locations
+        self._location_to_id = {location: location_id for location_id, location in enumerate(locations)}
+        self.switches -= switches
+        self._mac_to_position = None
+
+    def update(self, other):
+        """
+        Replaces entries of the switches which were added to the other index,
+        entries of all other switches are kept
+
+        Args:
+            other (MacLocatorIndex): index of the switches collected in this run
+        """
+        self._remove_switches(other.switches)
+        location_id_offset = len(self.locations)
+        self.locations.extend(other.locations)
+        self._location_to_id.update(
+            (location, location_id_offset + location_id) for location_id, location in enumerate(other.locations)
+        )
+        self.macs.extend(other.macs)
+        self.vlans.extend(other.vlans)
+        self.location_ids.extend(location_id_offset + location_id for location_id in other.location_ids)
+        self.switches |= other.switches
+        self._is_sorted = False
+        self._mac_to_position = None
+
+    def _sort(self):
+        if self._is_sorted:
+            return
+        order = sorted(range(len(self.macs)), key=self.macs.__getitem__)
+        self.macs = array('Q', [self.macs[i] for i in order])
+        self.vlans = array('H', [self.vlans[i] for i in order])
+        self.location_ids = array('I', [self.location_ids[i] for i in order])
+        self._is_sorted = True
+
+    def _get_location(self, position):
+        switch, interface_name = self.locations[self.location_ids[position]].split(' ', 1)
+        return MacLocation(int_to_mac(self.macs[position]), self.vlans[position], switch, interface_name)
+
+    def _get_range(self, start, end):
+        self._sort()
+        first = bisect_left(self.macs, start)
+        last = bisect_left(self.macs, end, lo=first)
+        return [self._get_location(position) for position in range(first, last)]
+
+    def lookup(self, mac_address):
+        """
+        Returns the list of edge ports where the MAC address was learned, usually one
+
+        Args:
+            mac_address (str): MAC address in any notation
+
+        Returns:
+            list: MacLocation tuples
+        """
+        self._sort()
+        if self._mac_to_position is None:
+            mac_to_position = {}
+            for position, mac in enumerate(self.macs):
+                mac_to_position.setdefault(mac, position)
+            self._mac_to_position = mac_to_position
+        mac = mac_to_int(mac_address)
+        position = self._mac_to_position.get(mac)
+        if position is None:
+            return []
+        result = []
+        while position < len(self.macs) and self.macs[position] == mac:
+            result.append(self._get_location(position))
+            position += 1
+        return result
+
+    def lookup_prefix(self, prefix):
+        """
+        Returns MacLocation for every MAC address starting with the prefix, e.g. aabb.cc
+        """
+        return self._get_range(*parse_mac_prefix(prefix))
+
+    def lookup_oui_range(self, first_oui, last_oui):
+        """
+        Returns MacLocation for every MAC address with OUI between first_oui and last_oui inclusive
+        """
+        shift = (MAC_HEX_DIGITS - OUI_HEX_DIGITS) * 4
+        return self._get_range(parse_oui(first_oui) << shift, (parse_oui(last_oui) + 1) << shift)
+
+    def to_bytes(self):
+        self._sort()
+        locations_block = '\n'.join(self.locations).encode()
+        arrays = [self.macs, self.location_ids, self.vlans]
+        if sys.byteorder == 'big':
+            arrays = [array(values.typecode, values) for values in arrays]
+            for values in arrays:
+                values.byteswap()
+        return b''.join(
+            [INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(self.macs), len(locations_block)), locations_block]
+            + [values.tobytes() for values in arrays]
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, num_entries, locations_length = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC:
+            raise ValueError('Not a MAC locator index')
+        if version != INDEX_VERSION:
+            raise ValueError('Unsupported index version {}'.format(version))
+        index = cls()
+        offset = INDEX_HEADER.size
+        locations_block = bytes(data[offset:offset + locations_length]).decode()
+        index.locations = locations_block.split('\n') if locations_block else []
+        index._location_to_id = {location: location_id for location_id, location in enumerate(index.locations)}
+        # switches without edge MAC addresses are not in the file
+        index.switches = {location.split(' ', 1)[0] for location in index.locations}
+        offset += locations_length
+        for values in (index.macs, index.location_ids, index.vlans):
+            size = num_entries * values.itemsize
+            values.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            offset += size
+        return index
+
+    def save(self, path):
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        tmp_path.write_bytes(self.to_bytes())
+        os.replace(str(tmp_path), str(path))
+
+    @classmethod
+    def load(cls, path, missing_ok=False):
+        """
+        Loads the index from the file, if missing_ok is True and the file doesn't exist, returns an empty index
+        """
+        path = Path(path)
+        if missing_ok and not path.is_file():
+            return cls()
+        return cls.from_bytes(path.read_bytes())
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Find edge ports of MAC addresses')
+    parser.add_argument('index_file', help='index file saved by the collector')
+    parser.add_argument('mac_addresses', nargs='+', help='MAC address, prefix or two OUIs')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--prefix', action='store_true', help='look up MAC addresses by prefix')
+    group.add_argument('--oui-range', action='store_true', help='look up MAC addresses with OUI in the range')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    index = MacLocatorIndex.load(args.index_file)
+    if args.oui_range:
+        if len(args.mac_addresses) != 2:
+            sys.exit('--oui-range requires the first and the last OUI')
+        locations = index.lookup_oui_range(*args.mac_addresses)
+    elif args.prefix:
+        locations = [location for prefix in args.mac_addresses for location in index.lookup_prefix(prefix)]
+    else:
+        locations = [location for mac_address in args.mac_addresses for location in index.lookup(mac_address)]
+    for location in locations:
+        print('{mac:>16}{vlan:>6}  {switch} {interface}'.format(**location._asdict()))
+    if not locations:
+        print('Not found')
+
+
+if __name__ == '__main__':
+    main()
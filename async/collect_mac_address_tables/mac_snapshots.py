@@ -0,0 +1,225 @@
+"""
+Per-switch snapshots of MAC address tables and deltas between collection runs
+
+Snapshot file format (little-endian):
+    header: magic b'MACS', format version (uint16), number of entries (uint32),
+        length of interface names block (uint32)
+    interface names: UTF-8, separated by newline
+    keys: uint64 per entry, (vlan << 48) | mac, sorted
+    interface ids: uint32 per entry (uint16 in version 1), index into interface names
+"""
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from pathlib import Path
+
+from mac_table import int_to_mac
+
+
+SNAPSHOT_MAGIC = b'MACS'
+SNAPSHOT_VERSION = 2
+# typecode of interface ids in the supported format versions
+INTERFACE_ID_TYPECODES = {1: 'H', 2: 'I'}
+SNAPSHOT_HEADER = struct.Struct('<4sHII')
+SNAPSHOT_FILE_EXTENSION = '.macs'
+
+MAC_BITS = 48
+MAC_MASK = (1 << MAC_BITS) - 1
+
+MacTableDelta = namedtuple('MacTableDelta', ['added', 'removed', 'moved'])
+
+
+def _to_little_endian(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def split_key(key):
+    """
+    Returns tuple (vlan, mac) from the snapshot key
+    """
+    return key >> MAC_BITS, key & MAC_MASK
+
+
+class MacTableSnapshot:
+    """
+    MAC address table of one switch reduced to what is needed to compute deltas:
+    sorted (vlan, mac) keys and the interface of every key
+    """
+    __slots__ = ('keys', 'interface_ids', 'interfaces')
+
+    def __init__(self, keys=None, interface_ids=None, interfaces=None):
+        self.keys = keys if keys is not None else array('Q')
+        self.interface_ids = interface_ids if interface_ids is not None else array('I')
+        self.interfaces = interfaces if interfaces is not None else []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        return '{}(entries={}, interfaces={})'.format(
+            self.__class__.__qualname__, len(self), len(self.interfaces)
+        )
+
+    @classmethod
+    def from_table(cls, mac_address_table):
+        """
+        Args:
+            mac_address_table (MacAddressTable): parsed MAC address table
+
+        Returns:
+            MacTableSnapshot: snapshot sorted by (vlan, mac)
+        """
+        keys = [(vlan << MAC_BITS) | mac for vlan, mac in zip(mac_address_table.vlans, mac_address_table.macs)]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        interface_ids = mac_address_table.interface_ids
+        return cls(
+            array('Q', [keys[i] for i in order]),
+            array('I', [interface_ids[i] for i in order]),
+            list(mac_address_table.interfaces),
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, num_entries, names_length = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError('Not a MAC address table snapshot')
+        if version not in INTERFACE_ID_TYPECODES:
+            raise ValueError('Unsupported snapshot version {}'.format(version))
+        offset = SNAPSHOT_HEADER.size
+        names_block = bytes(data[offset:offset + names_length]).decode()
+        interfaces = names_block.split('\n') if names_block else []
+        offset += names_length
+
+        keys = array('Q')
+        keys.frombytes(data[offset:offset + num_entries * keys.itemsize])
+        offset += num_entries * keys.itemsize
+        interface_ids = array(INTERFACE_ID_TYPECODES[version])
+        interface_ids.frombytes(data[offset:offset + num_entries * interface_ids.itemsize])
+        if sys.byteorder == 'big':
+            keys.byteswap()
+            interface_ids.byteswap()
+        return cls(keys, interface_ids, interfaces)
+
+    def to_bytes(self):
+        names_block = '\n'.join(self.interfaces).encode()
+        return b''.join([
+            SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(self.keys), len(names_block)),
+            names_block,
+            _to_little_endian(self.keys).tobytes(),
+            _to_little_endian(self.interface_ids).tobytes(),
+        ])
+
+
+def diff_snapshots(old, new):
+    """
+    Computes changes between two snapshots of the same switch with hash joins on (vlan, mac) keys
+
+    Args:
+        old (MacTableSnapshot): previous snapshot, None if there is no previous snapshot
+        new (MacTableSnapshot): current snapshot
+
+    Returns:
+        MacTableDelta: added and removed are sorted lists of tuples (vlan, mac, interface),
+            moved is sorted list of tuples (vlan, mac, old_interface, new_interface),
+            mac is a 48-bit integer
+    """
+    if old is None:
+        old = MacTableSnapshot()
+    old_entries = dict(zip(old.keys, old.interface_ids))
+    new_entries = dict(zip(new.keys, new.interface_ids))
+
+    # interface ids are local to a snapshot, so old ids are translated into the new id space once
+    new_interface_to_id = {interface_name: interface_id for interface_id, interface_name in enumerate(new.interfaces)}
+    old_to_new_interface_id = [new_interface_to_id.get(interface_name, -1) for interface_name in old.interfaces]
+
+    added = [
+        (*split_key(key), new.interfaces[new_entries[key]])
+        for key in sorted(new_entries.keys() - old_entries.keys())
+    ]
+    removed = [
+        (*split_key(key), old.interfaces[old_entries[key]])
+        for key in sorted(old_entries.keys() - new_entries.keys())
+    ]
+    moved_keys = [
+        key
+        for key in new_entries.keys() & old_entries.keys()
+        if old_to_new_interface_id[old_entries[key]] != new_entries[key]
+    ]
+    moved = [
+        (*split_key(key), old.interfaces[old_entries[key]], new.interfaces[new_entries[key]])
+        for key in sorted(moved_keys)
+    ]
+    return MacTableDelta(added, removed, moved)
+
+
+def render_delta(delta):
+    """
+    Renders delta as text, one line per change: + added, - removed, ~ moved
+    """
+    lines = ['{} added, {} removed, {} moved'.format(len(delta.added), len(delta.removed), len(delta.moved))]
+    lines.extend(
+        '+ {:>4}{:>18}{:>10}'.format(vlan, int_to_mac(mac), interface_name)
+        for vlan, mac, interface_name in delta.added
+    )
+    lines.extend(
+        '- {:>4}{:>18}{:>10}'.format(vlan, int_to_mac(mac), interface_name)
+        for vlan, mac, interface_name in delta.removed
+    )
+    lines.extend(
+        '~ {:>4}{:>18}{:>10} -> {}'.format(vlan, int_to_mac(mac), old_interface_name, new_interface_name)
+        for vlan, mac, old_interface_name, new_interface_name in delta.moved
+    )
+    return '\n'.join(lines)
+
+
+class SnapshotStore:
+    """
+    Directory with one snapshot file per switch
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def get_path(self, switch):
+        return self.directory / '{}{}'.format(switch, SNAPSHOT_FILE_EXTENSION)
+
+    def load(self, switch):
+        """
+        Returns the last snapshot of the switch or None if there is no snapshot
+        """
+        path = self.get_path(switch)
+        if not path.is_file():
+            return None
+        return MacTableSnapshot.from_bytes(path.read_bytes())
+
+    def save(self, switch, snapshot):
+        """
+        Saves snapshot of the switch atomically, so an interrupted run does not corrupt the previous snapshot
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.get_path(switch)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        tmp_path.write_bytes(snapshot.to_bytes())
+        os.replace(str(tmp_path), str(path))
+
+    def update(self, switch, mac_address_table):
+        """
+        Replaces the snapshot of the switch with the new MAC address table
+
+        Args:
+            switch (str): switch name
+            mac_address_table (MacAddressTable): parsed MAC address table
+
+        Returns:
+            MacTableDelta: changes since the previous snapshot, everything is added
+                if there was no previous snapshot
+        """
+        new_snapshot = MacTableSnapshot.from_table(mac_address_table)
+        delta = diff_snapshots(self.load(switch), new_snapshot)
+        self.save(switch, new_snapshot)
+        return delta
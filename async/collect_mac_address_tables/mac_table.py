@@ -0,0 +1,186 @@
+import re
+from array import array
+
+
+MAC_ADDR_TABLE_ROW_RE = re.compile(
+    r'^\s*(\d+)\s+'
+    r'((?:[0-9a-fA-F]{4}\.){2}[0-9a-fA-F]{4}|[0-9a-fA-F]{2}(?:[:\-][0-9a-fA-F]{2}){5})\s+'
+    r'(\S+)\s+(\S+)',
+    re.M
+)
+NATURAL_SORT_SPLIT_RE = re.compile(r'(\d+)')
+
+
+def mac_to_int(mac_address):
+    """
+    Packs MAC address in any of the common notations into 48-bit integer
+
+    Args:
+        mac_address (str): MAC address, for example aabb.cc00.0100 or aa:bb:cc:00:01:00
+
+    Returns:
+        int: MAC address as an integer
+    """
+    mac_hex = mac_address.replace('.', '').replace(':', '').replace('-', '')
+    if len(mac_hex) != 12:
+        raise ValueError('{!r} is not a MAC address'.format(mac_address))
+    return int(mac_hex, 16)
+
+
+def int_to_mac(mac_int):
+    """
+    Formats 48-bit integer as MAC address in Cisco notation, e.g. aabb.cc00.0100
+    """
+    mac_hex = '%012x' % mac_int
+    return mac_hex[:4] + '.' + mac_hex[4:8] + '.' + mac_hex[8:]
+
+
+def natural_sort_key(value):
+    """
+    Sort key which compares numbers inside of the string as integers,
+    so Gi1/0/2 goes before Gi1/0/10
+    """
+    return tuple(
+        int(part) if part.isdigit() else part
+        for part in NATURAL_SORT_SPLIT_RE.split(value)
+    )
+
+
+class MacAddressTable:
+    """
+    Columnar MAC address table
+
+    Every column is stored in a separate typed array: MAC addresses as 48-bit integers,
+    VLANs as small integers, entry types and interface names as indexes into
+    lists of interned strings. Text is rendered only when render() is called.
+    """
+    __slots__ = ('macs', 'vlans', 'type_ids', 'interface_ids', 'types', 'interfaces',
+                 '_type_to_id', '_interface_to_id')
+
+    def __init__(self):
+        self.macs = array('Q')
+        self.vlans = array('H')
+        self.type_ids = array('B')
+        self.interface_ids = array('I')
+        self.types = []
+        self.interfaces = []
+        self._type_to_id = {}
+        self._interface_to_id = {}
+
+    def __len__(self):
+        return len(self.macs)
+
+    def __iter__(self):
+        """
+        Yields tuples (vlan_number, mac_address, type, interface_name)
+        """
+        types = self.types
+        interfaces = self.interfaces
+        for mac, vlan, type_id, interface_id in zip(self.macs, self.vlans, self.type_ids, self.interface_ids):
+            yield vlan, int_to_mac(mac), types[type_id], interfaces[interface_id]
+
+    def __repr__(self):
+        return '{}(entries={}, interfaces={})'.format(
+            self.__class__.__qualname__, len(self), len(self.interfaces)
+        )
+
+    @classmethod
+    def from_cli_output(cls, cli_output):
+        """
+        Parses output of "show mac address-table" into a columnar table
+
+        Args:
+            cli_output (str): output of the command
+
+        Returns:
+            MacAddressTable: parsed table, rows are in the same order as in the output
+        """
+        table = cls()
+        rows = MAC_ADDR_TABLE_ROW_RE.findall(cli_output)
+        if not rows:
+            return table
+        vlans, mac_addresses, entry_types, interface_names = zip(*rows)
+        table.vlans = array('H', map(int, vlans))
+        table.macs = array('Q', [int(mac_address.replace('.', '').replace(':', '').replace('-', ''), 16)
+                                 for mac_address in mac_addresses])
+        type_to_id = table._type_to_id
+        table.type_ids = array('B', [type_to_id.setdefault(entry_type, len(type_to_id))
+                                     for entry_type in entry_types])
+        interface_to_id = table._interface_to_id
+        table.interface_ids = array('I', [interface_to_id.setdefault(interface_name, len(interface_to_id))
+                                          for interface_name in interface_names])
+        table.types = list(type_to_id)
+        table.interfaces = list(interface_to_id)
+        return table
+
+    def interface_id(self, interface_name):
+        """
+        Returns id of the interned interface name or None if the table has no such interface
+        """
+        return self._interface_to_id.get(interface_name)
+
+    def sort_by_interface(self):
+        """
+        Sorts rows in place by interface name using natural ordering.
+        Only unique interface names are compared, rows are distributed into
+        per-interface buckets, so the order of rows within an interface is preserved.
+        """
+        interface_order = sorted(range(len(self.interfaces)), key=lambda i: natural_sort_key(self.interfaces[i]))
+        buckets = [[] for _ in self.interfaces]
+        for row_num, interface_id in enumerate(self.interface_ids):
+            buckets[interface_id].append(row_num)
+        row_order = [row_num for interface_id in interface_order for row_num in buckets[interface_id]]
+
+        self.macs = array('Q', [self.macs[i] for i in row_order])
+        self.vlans = array('H', [self.vlans[i] for i in row_order])
+        self.type_ids = array('B', [self.type_ids[i] for i in row_order])
+        self.interface_ids = array('I', [self.interface_ids[i] for i in row_order])
+
+    def to_dicts(self):
+        """
+        Converts table into the list of dictionaries, the same format
+        as produced by the dict-based parser
+        """
+        return [
+            {
+                'vlan_number': str(vlan),
+                'mac_address': mac_address,
+                'type': entry_type,
+                'interface_name': interface_name,
+            }
+            for vlan, mac_address, entry_type, interface_name in self
+        ]
+
+    def render(self, neighbors=None):
+        """
+        Renders the table as text
+
+        Args:
+            neighbors (dict): key is short interface name, value is the list of
+                neighbor dictionaries from CDP/LLDP parsers
+
+        Returns:
+            str: one row per MAC address with the list of interface neighbors
+        """
+        neighbors = neighbors or {}
+        neighbors_strings = []
+        for interface_name in self.interfaces:
+            interface_neighbors = neighbors.get(interface_name)
+            if interface_neighbors:
+                neighbors_strings.append(', '.join(
+                    '{remote_hostname} {remote_interface} {protocol}'.format(**interface_neighbor)
+                    for interface_neighbor in interface_neighbors
+                ))
+            else:
+                neighbors_strings.append('-')
+
+        # everything except VLAN and MAC address is formatted once per interned value
+        type_columns = ['{:>11}'.format(entry_type) for entry_type in self.types]
+        interface_columns = [
+            '{:>10}   {}'.format(interface_name, neighbors_string)
+            for interface_name, neighbors_string in zip(self.interfaces, neighbors_strings)
+        ]
+        return '\n'.join(
+            '{:>4}{:>18}{}{}'.format(vlan, int_to_mac(mac), type_columns[type_id], interface_columns[interface_id])
+            for mac, vlan, type_id, interface_id in zip(self.macs, self.vlans, self.type_ids, self.interface_ids)
+        )
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import re
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# platforms which buffer typed-ahead input and process it line by line after the prompt,
+# other platforms may drop characters or interleave echo with the output
+PIPELINE_SAFE_DEVICE_TYPES = {'cisco_ios'}
+
+MAX_BUFFER = 65535
+
+
+class PipelineError(Exception):
+    pass
+
+
+def get_prompt_re(base_prompt):
+    """
+    Returns regular expression matching device prompt at the beginning of the line,
+    for example SW1#, SW1> or SW1(config)#
+    """
+    return re.compile(r'^{}(?:\(.*?\))?[#>]'.format(re.escape(base_prompt)), re.M)
+
+
+def split_pipelined_output(output, commands, prompt_re):
+    """
+    Splits output of the pipelined commands into per-command outputs
+
+    Every command output ends with the prompt, so the output is split by prompts.
+    Echo of the command is removed from the beginning of its part. Depending on the
+    platform, echo of typed-ahead commands can come before the first output, so
+    the first part can start with echoes of several commands in the order they were sent.
+    Only these lines are treated as echo, output lines which look like a later
+    command are kept.
+
+    Args:
+        output (str): everything that was received after the commands were sent
+        commands (list): commands in the order they were sent
+        prompt_re: compiled regular expression matching the prompt
+
+    Returns:
+        list: outputs in the same order as commands
+    """
+    parts = prompt_re.split(output)
+    if len(parts) != len(commands) + 1 or parts[-1].strip():
+        raise PipelineError(
+            'Expected {} prompts in the output, found {}'.format(len(commands), len(parts) - 1)
+        )
+    # index of the first command whose echo was not received yet
+    next_echo = 0
+    result = []
+    for command_num, part in enumerate(parts[:-1]):
+        lines = part.lstrip('\n').split('\n')
+        # echo of a command which was not echoed before its output won't come later
+        next_echo = max(next_echo, command_num)
+        if command_num == 0:
+            while lines and next_echo < len(commands) and lines[0].strip() == commands[next_echo]:
+                lines.pop(0)
+                next_echo += 1
+        elif next_echo == command_num and lines and lines[0].strip() == commands[command_num]:
+            lines.pop(0)
+            next_echo += 1
+        result.append('\n'.join(lines).rstrip('\n'))
+    return result
+
+
+async def send_commands_pipelined(device_conn, commands, on_command_done=None):
+    """
+    Writes all commands to the session at once and reads outputs until
+    the prompt is received once per command
+
+    Args:
+        device_conn: netdev connection
+        commands (list): show commands
+        on_command_done: optional callback(command, seconds), seconds is the time between
+            the previous prompt (or sending the commands) and the prompt after the command
+
+    Returns:
+        list: outputs in the same order as commands
+    """
+    prompt_re = get_prompt_re(device_conn.base_prompt)
+    device_conn._stdin.write(''.join(device_conn._normalize_cmd(command) for command in commands))
+    output = ''
+    num_prompts = 0
+    last_prompt_time = time.perf_counter()
+    while num_prompts < len(commands):
+        try:
+            output += await asyncio.wait_for(device_conn._stdout.read(MAX_BUFFER), device_conn._timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(
+                'Timed out waiting for output of {} pipelined commands'.format(len(commands))
+            )
+        new_num_prompts = len(prompt_re.findall(output))
+        if on_command_done is not None and new_num_prompts > num_prompts:
+            now = time.perf_counter()
+            for command in commands[num_prompts:min(new_num_prompts, len(commands))]:
+                on_command_done(command, now - last_prompt_time)
+                last_prompt_time = now
+        num_prompts = new_num_prompts
+    if device_conn._ansi_escape_codes:
+        output = device_conn._strip_ansi_escape_codes(output)
+    output = device_conn._normalize_linefeeds(output)
+    return split_pipelined_output(output, commands, prompt_re)
+
+
+async def send_commands_sequential(device_conn, commands, on_command_done=None):
+    outputs = []
+    for command in commands:
+        start_time = time.perf_counter()
+        outputs.append(await device_conn.send_command(command))
+        if on_command_done is not None:
+            on_command_done(command, time.perf_counter() - start_time)
+    return outputs
+
+
+async def send_commands(device_conn, commands, device_type, pipelined=True, on_command_done=None):
+    """
+    Sends show commands and returns their outputs
+
+    Commands are pipelined on the platforms which support it. If the output of the
+    pipelined commands can't be split back into per-command outputs,
+    the commands are sent again one by one.
+
+    Args:
+        device_conn: netdev connection
+        commands (list): show commands
+        device_type (str): netdev device type
+        pipelined (bool): whether to pipeline commands where it is safe
+        on_command_done: optional callback(command, seconds) called when the output of
+            the command is received
+
+    Returns:
+        list: outputs in the same order as commands
+    """
+    if pipelined and device_type in PIPELINE_SAFE_DEVICE_TYPES:
+        try:
+            return await send_commands_pipelined(device_conn, commands, on_command_done)
+        except PipelineError as e:
+            logger.warning('%s: pipelined commands failed (%s), sending commands one by one',
+                           device_conn.base_prompt, e)
+    return await send_commands_sequential(device_conn, commands, on_command_done)
@@ -0,0 +1,97 @@
+import csv
+import json
+import sys
+
+
+OUTPUT_FORMATS = ('ndjson', 'csv')
+
+
+class ResultWriter:
+    """
+    Writes records to the file or stdout as soon as they are received,
+    one JSON object per line (NDJSON) or one CSV row per record
+
+    Args:
+        path (str): output file, '-' means stdout
+        output_format (str): 'ndjson' or 'csv'
+        fieldnames (list): CSV columns, keys of every record
+        total (int): total number of devices for the progress counter, None if unknown
+        progress (bool): whether to print progress counter and failures to stderr
+
+    Failed devices are always recorded in `failures` as (host, exception) tuples,
+    so they can be reported after the run even without progress output.
+    """
+
+    def __init__(self, path='-', output_format='ndjson', fieldnames=None, total=None, progress=True):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError('Unsupported output format {!r}, supported: {}'.format(
+                output_format, ', '.join(OUTPUT_FORMATS)
+            ))
+        if output_format == 'csv' and not fieldnames:
+            raise ValueError('fieldnames are required for CSV output')
+        self.path = path
+        self.output_format = output_format
+        self.fieldnames = fieldnames
+        self.total = total
+        self.progress = progress
+        self.num_records = 0
+        self.num_devices = 0
+        self.num_failed = 0
+        self.failures = []
+        self._file = None
+        self._csv_writer = None
+
+    def __enter__(self):
+        if self.path == '-':
+            self._file = sys.stdout
+        else:
+            self._file = open(self.path, 'w', newline='')
+        if self.output_format == 'csv':
+            self._csv_writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+            self._csv_writer.writeheader()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._file.flush()
+        if self._file is not sys.stdout:
+            self._file.close()
+        if self.progress:
+            sys.stderr.write('\n')
+
+    def write_records(self, records):
+        if self.output_format == 'csv':
+            self._csv_writer.writerows(records)
+        else:
+            for record in records:
+                self._file.write(json.dumps(record))
+                self._file.write('\n')
+        self.num_records += len(records)
+
+    def device_done(self, records):
+        """
+        Writes records of one device and updates the progress counter
+        """
+        self.write_records(records)
+        self.num_devices += 1
+        self._file.flush()
+        self._print_progress()
+
+    def device_failed(self, host, exception):
+        """
+        Records the failure of the device and updates the progress counter
+        """
+        self.failures.append((host, exception))
+        self.num_devices += 1
+        self.num_failed += 1
+        if self.progress:
+            sys.stderr.write('\n{}: {!r}\n'.format(host, exception))
+        self._print_progress()
+
+    def _print_progress(self):
+        if not self.progress:
+            return
+        total = '/{}'.format(self.total) if self.total is not None else ''
+        sys.stderr.write('\r[{}{}] devices done, {} failed, {} records written'.format(
+            self.num_devices, total, self.num_failed, self.num_records
+        ))
+        sys.stderr.flush()
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import random
+from collections import namedtuple
+
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_SESSIONS = 100
+MAX_CONCURRENT_SESSIONS_PER_SITE = 20
+MAX_NEW_CONNECTIONS_PER_SECOND = 20
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 1
+BACKOFF_MAX = 30
+
+TRANSIENT_EXCEPTIONS = (OSError, asyncio.TimeoutError)
+
+DeviceFailure = namedtuple('DeviceFailure', ['host', 'site', 'attempts', 'exception'])
+
+
+class RateLimiter:
+    """
+    Spreads events evenly in time: not more than `rate` events per second.
+    Every caller reserves the next free time slot, so waiting callers are served in order.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next_slot = 0
+
+    async def wait(self):
+        now = asyncio.get_event_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class Scheduler:
+    """
+    Runs coroutine for every device with limited concurrency
+
+    Args:
+        max_concurrency (int): maximum number of devices processed at the same time
+        max_per_site (int): maximum number of devices of the same site processed at the same time,
+            None means no limit
+        connections_per_second (float): maximum number of new connections per second,
+            None means no limit
+        max_attempts (int): how many times the device is tried before it is reported as failed
+        backoff_base (float): delay in seconds before the first retry, doubles with every next retry
+        backoff_max (float): maximum delay in seconds between retries
+        transient_exceptions (tuple): exceptions which are retried, other exceptions fail
+            the device immediately
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_SESSIONS, max_per_site=MAX_CONCURRENT_SESSIONS_PER_SITE,
+                 connections_per_second=MAX_NEW_CONNECTIONS_PER_SECOND, max_attempts=MAX_ATTEMPTS,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX, transient_exceptions=TRANSIENT_EXCEPTIONS):
+        self.max_concurrency = max_concurrency
+        self.max_per_site = max_per_site
+        self.connections_per_second = connections_per_second
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.transient_exceptions = transient_exceptions
+        self._semaphore = None
+        self._site_semaphores = {}
+        self._rate_limiter = None
+
+    def _get_site_semaphore(self, site):
+        if self.max_per_site is None:
+            return None
+        semaphore = self._site_semaphores.get(site)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_site)
+            self._site_semaphores[site] = semaphore
+        return semaphore
+
+    def get_backoff_delay(self, attempt):
+        """
+        Exponential backoff with full jitter, attempt starts from 1
+        """
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return random.uniform(0, delay)
+
+    async def _run_once(self, coroutine_func, host, site):
+        site_semaphore = self._get_site_semaphore(site)
+        # site slot is taken first, so devices of a busy site do not hold global slots while waiting
+        if site_semaphore is not None:
+            await site_semaphore.acquire()
+        try:
+            async with self._semaphore:
+                if self._rate_limiter is not None:
+                    await self._rate_limiter.wait()
+                return await coroutine_func(host)
+        finally:
+            if site_semaphore is not None:
+                site_semaphore.release()
+
+    async def run_device(self, coroutine_func, host, site=None):
+        """
+        Runs coroutine_func(host) retrying transient failures
+
+        Returns:
+            tuple: (result, None) on success, (None, DeviceFailure) on failure
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await self._run_once(coroutine_func, host, site), None
+            except self.transient_exceptions as e:
+                if attempt >= self.max_attempts:
+                    return None, DeviceFailure(host, site, attempt, e)
+                delay = self.get_backoff_delay(attempt)
+                logger.warning('%s: attempt %s failed with %r, retrying in %.1f seconds', host, attempt, e, delay)
+                await asyncio.sleep(delay)
+            except Exception as e:
+                return None, DeviceFailure(host, site, attempt, e)
+
+    def _reset(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._site_semaphores = {}
+        self._rate_limiter = RateLimiter(self.connections_per_second) if self.connections_per_second else None
+
+    async def run(self, coroutine_func, devices):
+        """
+        Runs coroutine_func for all devices
+
+        Args:
+            coroutine_func: coroutine function which accepts host as the only argument
+            devices (list): tuples (host, site)
+
+        Returns:
+            tuple: dictionary where key is host and value is the result of coroutine_func,
+                and list of DeviceFailure for devices which failed
+        """
+        self._reset()
+        outcomes = await asyncio.gather(*[
+            self.run_device(coroutine_func, host, site)
+            for host, site in devices
+        ])
+
+        results = {}
+        failures = []
+        for (host, _), (result, failure) in zip(devices, outcomes):
+            if failure is None:
+                results[host] = result
+            else:
+                failures.append(failure)
+        return results, failures
+
+    async def iter_run(self, coroutine_func, devices, max_pending=None):
+        """
+        Runs coroutine_func for all devices and yields results as soon as devices complete
+
+        Devices are taken from the iterable lazily and not more than max_pending
+        of them are in progress or waiting, so memory does not grow with the number of devices.
+
+        Args:
+            coroutine_func: coroutine function which accepts host as the only argument
+            devices (iterable): tuples (host, site)
+            max_pending (int): maximum number of scheduled devices, default is 4 * max_concurrency
+
+        Yields:
+            tuple: (host, result, failure), either result or failure is None
+        """
+        self._reset()
+        max_pending = max_pending or 4 * self.max_concurrency
+        devices = iter(devices)
+        task_to_host = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(task_to_host) < max_pending:
+                device = next(devices, None)
+                if device is None:
+                    exhausted = True
+                    break
+                host, site = device
+                task = asyncio.ensure_future(self.run_device(coroutine_func, host, site))
+                task_to_host[task] = host
+            if not task_to_host:
+                return
+            done, _ = await asyncio.wait(task_to_host, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result, failure = task.result()
+                yield task_to_host.pop(task), result, failure
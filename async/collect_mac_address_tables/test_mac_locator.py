@@ -0,0 +1,76 @@
+from canned_outputs import SHOW_MAC_ADDR_TABLE_HEADER
+from mac_locator import MacLocatorIndex
+from mac_table import MacAddressTable
+
+
+def get_table(*rows):
+    return MacAddressTable.from_cli_output(SHOW_MAC_ADDR_TABLE_HEADER + '\n'.join(
+        '{:>4}    {}    DYNAMIC     {}'.format(vlan, mac_address, interface_name)
+        for vlan, mac_address, interface_name in rows
+    ))
+
+
+def get_locations(index, mac_address):
+    return [(location.switch, location.interface) for location in index.lookup(mac_address)]
+
+
+NEIGHBORS = {'Gi1/1/1': [{'remote_hostname': 'dist-1', 'remote_interface': 'Te1/1/1', 'protocol': 'C'}]}
+
+
+def test_uplinks_are_skipped():
+    index = MacLocatorIndex()
+    index.add_switch('SW1', get_table((10, 'aabb.cc00.0100', 'Gi1/0/1'), (10, 'aabb.cc00.0200', 'Gi1/1/1')), NEIGHBORS)
+    assert get_locations(index, 'aabb.cc00.0100') == [('SW1', 'Gi1/0/1')]
+    assert get_locations(index, 'aabb.cc00.0200') == []
+
+
+def test_port_channel_with_neighbors_on_members_is_uplink():
+    index = MacLocatorIndex()
+    table = get_table((10, 'aabb.cc00.0100', 'Po1'), (10, 'aabb.cc00.0200', 'Po2'), (10, 'aabb.cc00.0300', 'Gi1/0/1'))
+    port_channels = {'Po1': ['Gi1/1/1', 'Gi1/1/2'], 'Po2': ['Gi1/0/47', 'Gi1/0/48']}
+    index.add_switch('SW1', table, NEIGHBORS, port_channels)
+    assert get_locations(index, 'aabb.cc00.0100') == []
+    # a Port-channel to a server without CDP/LLDP is an edge port
+    assert get_locations(index, 'aabb.cc00.0200') == [('SW1', 'Po2')]
+    assert get_locations(index, 'aabb.cc00.0300') == [('SW1', 'Gi1/0/1')]
+
+
+def test_add_switch_again_replaces_its_entries():
+    index = MacLocatorIndex()
+    index.add_switch('SW1', get_table((10, 'aabb.cc00.0100', 'Gi1/0/1')), {})
+    index.add_switch('SW2', get_table((10, 'aabb.cc00.0200', 'Gi1/0/2')), {})
+    index.add_switch('SW1', get_table((10, 'aabb.cc00.0100', 'Gi1/0/3')), {})
+    assert len(index) == 2
+    assert get_locations(index, 'aabb.cc00.0100') == [('SW1', 'Gi1/0/3')]
+    assert get_locations(index, 'aabb.cc00.0200') == [('SW2', 'Gi1/0/2')]
+
+
+def test_update_keeps_switches_which_were_not_collected(tmp_path):
+    path = tmp_path / 'mac_locator.idx'
+    previous = MacLocatorIndex()
+    previous.add_switch('SW1', get_table((10, 'aabb.cc00.0100', 'Gi1/0/1'), (20, 'aabb.cc00.0101', 'Gi1/0/1')), {})
+    previous.add_switch('SW2', get_table((10, 'aabb.cc00.0200', 'Gi1/0/2')), {})
+    previous.save(path)
+
+    # SW2 failed in this run, SW1 has a new table, SW3 is new
+    current = MacLocatorIndex()
+    current.add_switch('SW1', get_table((10, 'aabb.cc00.0300', 'Gi1/0/5')), {})
+    current.add_switch('SW3', get_table((10, 'aabb.cc00.0100', 'Gi1/0/7')), {})
+    index = MacLocatorIndex.load(path, missing_ok=True)
+    index.update(current)
+    index.save(path)
+
+    index = MacLocatorIndex.load(path)
+    assert index.switches == {'SW1', 'SW2', 'SW3'}
+    assert len(index) == 3
+    assert get_locations(index, 'aabb.cc00.0100') == [('SW3', 'Gi1/0/7')]
+    assert get_locations(index, 'aabb.cc00.0101') == []
+    assert get_locations(index, 'aabb.cc00.0200') == [('SW2', 'Gi1/0/2')]
+    assert get_locations(index, 'aabb.cc00.0300') == [('SW1', 'Gi1/0/5')]
+    assert [location.mac for location in index.lookup_prefix('aabb.cc00')] == [
+        'aabb.cc00.0100', 'aabb.cc00.0200', 'aabb.cc00.0300'
+    ]
+
+
+def test_load_missing_file(tmp_path):
+    assert len(MacLocatorIndex.load(tmp_path / 'missing.idx', missing_ok=True)) == 0
@@ -0,0 +1,85 @@
+import struct
+from array import array
+
+import pytest
+
+from canned_outputs import generate_show_mac_address_table, SHOW_MAC_ADDR_TABLE_HEADER
+from mac_snapshots import (
+    diff_snapshots,
+    MacTableSnapshot,
+    render_delta,
+    SNAPSHOT_HEADER,
+    SNAPSHOT_MAGIC,
+    SnapshotStore,
+)
+from mac_table import MacAddressTable, mac_to_int
+
+
+def get_table(*rows):
+    return MacAddressTable.from_cli_output(SHOW_MAC_ADDR_TABLE_HEADER + '\n'.join(
+        '{:>4}    {}    DYNAMIC     {}'.format(vlan, mac_address, interface_name)
+        for vlan, mac_address, interface_name in rows
+    ))
+
+
+def test_bytes_round_trip():
+    snapshot = MacTableSnapshot.from_table(MacAddressTable.from_cli_output(generate_show_mac_address_table(1000)))
+    restored = MacTableSnapshot.from_bytes(snapshot.to_bytes())
+    assert restored.keys == snapshot.keys
+    assert restored.interface_ids == snapshot.interface_ids
+    assert restored.interfaces == snapshot.interfaces
+    assert list(restored.keys) == sorted(restored.keys)
+
+
+def test_empty_round_trip():
+    restored = MacTableSnapshot.from_bytes(MacTableSnapshot().to_bytes())
+    assert len(restored) == 0
+    assert restored.interfaces == []
+
+
+def test_version_1_is_read():
+    interfaces = ['Gi1/0/1', 'Gi1/0/2']
+    names_block = '\n'.join(interfaces).encode()
+    data = b''.join([
+        SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1, 2, len(names_block)),
+        names_block,
+        struct.pack('<QQ', 1, 2),
+        struct.pack('<HH', 1, 0),
+    ])
+    snapshot = MacTableSnapshot.from_bytes(data)
+    assert list(snapshot.keys) == [1, 2]
+    assert list(snapshot.interface_ids) == [1, 0]
+    assert snapshot.interfaces == interfaces
+
+
+def test_not_a_snapshot():
+    with pytest.raises(ValueError):
+        MacTableSnapshot.from_bytes(SNAPSHOT_HEADER.pack(b'XXXX', 2, 0, 0))
+
+
+def test_diff_snapshots():
+    old = MacTableSnapshot.from_table(get_table(
+        (10, 'aabb.cc00.0100', 'Gi1/0/1'),
+        (10, 'aabb.cc00.0200', 'Gi1/0/2'),
+        (20, 'aabb.cc00.0300', 'Gi1/0/3'),
+    ))
+    new = MacTableSnapshot.from_table(get_table(
+        (10, 'aabb.cc00.0200', 'Gi1/0/5'),
+        (20, 'aabb.cc00.0300', 'Gi1/0/3'),
+        (30, 'aabb.cc00.0400', 'Gi1/0/1'),
+    ))
+    delta = diff_snapshots(old, new)
+    assert delta.added == [(30, mac_to_int('aabb.cc00.0400'), 'Gi1/0/1')]
+    assert delta.removed == [(10, mac_to_int('aabb.cc00.0100'), 'Gi1/0/1')]
+    assert delta.moved == [(10, mac_to_int('aabb.cc00.0200'), 'Gi1/0/2', 'Gi1/0/5')]
+    assert render_delta(delta).split('\n')[0] == '1 added, 1 removed, 1 moved'
+
+
+def test_store_update(tmp_path):
+    store = SnapshotStore(tmp_path)
+    assert store.load('SW1') is None
+    delta = store.update('SW1', get_table((10, 'aabb.cc00.0100', 'Gi1/0/1')))
+    assert len(delta.added) == 1
+    delta = store.update('SW1', get_table((10, 'aabb.cc00.0100', 'Gi1/0/1')))
+    assert delta == ([], [], [])
+    assert store.load('SW1').interface_ids == array('I', [0])
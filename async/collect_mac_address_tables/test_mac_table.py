@@ -0,0 +1,88 @@
+import pytest
+
+from canned_outputs import generate_show_mac_address_table, SHOW_MAC_ADDR_TABLE_HEADER
+from mac_table import int_to_mac, mac_to_int, MacAddressTable
+
+
+CLI_OUTPUT = SHOW_MAC_ADDR_TABLE_HEADER + '''  10    aabb.cc00.0100    DYNAMIC     Gi1/0/10
+  10    aabb.cc00.0200    DYNAMIC     Gi1/0/2
+  20    aabb.cc00.0300    STATIC      Gi1/0/10
+ 100    aa:bb:cc:00:04:00    DYNAMIC     Po1
+Total Mac Addresses for this criterion: 4
+'''
+
+
+@pytest.mark.parametrize('mac_address', ['aabb.cc00.0100', 'aa:bb:cc:00:01:00', 'aa-bb-cc-00-01-00'])
+def test_mac_to_int(mac_address):
+    assert mac_to_int(mac_address) == 0xaabbcc000100
+    assert int_to_mac(mac_to_int(mac_address)) == 'aabb.cc00.0100'
+
+
+def test_mac_to_int_invalid():
+    with pytest.raises(ValueError):
+        mac_to_int('aabb.cc00')
+
+
+def test_from_cli_output():
+    table = MacAddressTable.from_cli_output(CLI_OUTPUT)
+    assert list(table) == [
+        (10, 'aabb.cc00.0100', 'DYNAMIC', 'Gi1/0/10'),
+        (10, 'aabb.cc00.0200', 'DYNAMIC', 'Gi1/0/2'),
+        (20, 'aabb.cc00.0300', 'STATIC', 'Gi1/0/10'),
+        (100, 'aabb.cc00.0400', 'DYNAMIC', 'Po1'),
+    ]
+    assert table.interfaces == ['Gi1/0/10', 'Gi1/0/2', 'Po1']
+    assert table.interface_id('Gi1/0/2') == 1
+    assert table.interface_id('Gi1/0/3') is None
+
+
+def test_from_cli_output_empty():
+    table = MacAddressTable.from_cli_output(SHOW_MAC_ADDR_TABLE_HEADER)
+    assert len(table) == 0
+    assert table.render() == ''
+
+
+def test_to_dicts():
+    table = MacAddressTable.from_cli_output(CLI_OUTPUT)
+    assert table.to_dicts()[1] == {
+        'vlan_number': '10',
+        'mac_address': 'aabb.cc00.0200',
+        'type': 'DYNAMIC',
+        'interface_name': 'Gi1/0/2',
+    }
+
+
+def test_sort_by_interface():
+    table = MacAddressTable.from_cli_output(CLI_OUTPUT)
+    table.sort_by_interface()
+    assert [(mac, interface_name) for _, mac, _, interface_name in table] == [
+        ('aabb.cc00.0200', 'Gi1/0/2'),
+        ('aabb.cc00.0100', 'Gi1/0/10'),
+        ('aabb.cc00.0300', 'Gi1/0/10'),
+        ('aabb.cc00.0400', 'Po1'),
+    ]
+
+
+def test_render():
+    table = MacAddressTable.from_cli_output(CLI_OUTPUT)
+    neighbors = {'Po1': [{'remote_hostname': 'dist-1', 'remote_interface': 'Te1/1/1', 'protocol': 'CDP'}]}
+    lines = table.render(neighbors).split('\n')
+    assert lines[0].split() == ['10', 'aabb.cc00.0100', 'DYNAMIC', 'Gi1/0/10', '-']
+    assert lines[3].split() == ['100', 'aabb.cc00.0400', 'DYNAMIC', 'Po1', 'dist-1', 'Te1/1/1', 'CDP']
+
+
+def test_many_interfaces():
+    interfaces = ['Vl{}'.format(interface_num) for interface_num in range(70000)]
+    cli_output = SHOW_MAC_ADDR_TABLE_HEADER + '\n'.join(
+        '   1    {}    DYNAMIC     {}'.format(int_to_mac(mac), interface_name)
+        for mac, interface_name in enumerate(interfaces)
+    )
+    table = MacAddressTable.from_cli_output(cli_output)
+    assert len(table.interfaces) == 70000
+    assert list(table)[-1] == (1, int_to_mac(69999), 'DYNAMIC', 'Vl69999')
+
+
+def test_generated_output():
+    table = MacAddressTable.from_cli_output(generate_show_mac_address_table(1000))
+    assert len(table) == 1000
+    assert [row['mac_address'] for row in table.to_dicts()] == [mac for _, mac, _, _ in table]
@@ -0,0 +1,37 @@
+import pytest
+
+from pipelining import get_prompt_re, PipelineError, split_pipelined_output
+
+
+PROMPT_RE = get_prompt_re('SW1')
+COMMANDS = ['show version', 'show clock', 'show users']
+
+
+def test_echo_after_every_prompt():
+    output = 'show version\nversion output\nSW1#show clock\n10:00\nSW1#show users\nusers output\nSW1#'
+    assert split_pipelined_output(output, COMMANDS, PROMPT_RE) == ['version output', '10:00', 'users output']
+
+
+def test_typed_ahead_echo_before_first_output():
+    output = 'show version\nshow clock\nshow users\nversion output\nSW1#10:00\nSW1#users output\nSW1#'
+    assert split_pipelined_output(output, COMMANDS, PROMPT_RE) == ['version output', '10:00', 'users output']
+
+
+def test_output_line_equal_to_later_command_is_kept():
+    output = 'show version\nversion output\nSW1#show clock\nshow users\nSW1#show users\nusers output\nSW1#'
+    assert split_pipelined_output(output, COMMANDS, PROMPT_RE) == ['version output', 'show users', 'users output']
+
+
+def test_output_line_equal_to_earlier_command_is_kept():
+    output = 'show version\nversion output\nSW1#show clock\n10:00\nSW1#show users\nshow clock\nSW1#'
+    assert split_pipelined_output(output, COMMANDS, PROMPT_RE) == ['version output', '10:00', 'show clock']
+
+
+def test_no_echo():
+    output = 'version output\nSW1#10:00\nSW1#users output\nSW1(config)#'
+    assert split_pipelined_output(output, COMMANDS, PROMPT_RE) == ['version output', '10:00', 'users output']
+
+
+def test_missing_prompt():
+    with pytest.raises(PipelineError):
+        split_pipelined_output('show version\nversion output\nSW1#', COMMANDS, PROMPT_RE)
@@ -0,0 +1,15 @@
+import json
+
+from result_writer import ResultWriter
+
+
+def test_failures_are_recorded_without_progress(tmp_path, capsys):
+    path = tmp_path / 'records.ndjson'
+    with ResultWriter(str(path), progress=False) as writer:
+        writer.device_done([{'hostname': 'sw1', 'mac': 'aaaa.bbbb.cccc'}])
+        error = OSError('Connection refused')
+        writer.device_failed('sw2', error)
+    assert writer.failures == [('sw2', error)]
+    assert (writer.num_devices, writer.num_failed, writer.num_records) == (2, 1, 1)
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [{'hostname': 'sw1', 'mac': 'aaaa.bbbb.cccc'}]
+    assert capsys.readouterr().err == ''
@@ -1,18 +1,51 @@
 #!/usr/bin/env python3
 import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager
 from copy import deepcopy
+from functools import partial
 
 import netdev
 import yaml
 
 from helper import read_yaml, form_connection_params_from_yaml
 
+# streaming and instrumentation are shared with the MAC address table collector
+from collect_mac_address_tables.instrumentation import INSTRUMENTATION
+from collect_mac_address_tables.result_writer import ResultWriter
+from collect_mac_address_tables.scheduler import Scheduler
+
 SITE_NAME = "SJ-HQ"
 
 COMMANDS_LIST = [
     "show clock", "show version", "show inventory", "show ip interface brief"
 ]
 
+# write outputs to the file as soon as every device is done instead of printing
+# everything at the end, "-" means stdout
+STREAM_OUTPUT_FILE = None
+STREAM_OUTPUT_FORMAT = "ndjson"
+STREAM_OUTPUT_FIELDS = ["hostname", "command", "output"]
+# maximum number of devices in progress in streaming mode
+STREAM_MAX_PENDING = 100
+
+# record connect and command times of every device and save them to the JSON file
+TRACE_FILE = None
+
+
+@asynccontextmanager
+async def connect(device_params, hostname):
+    start_counter = time.perf_counter()
+    async with netdev.create(**device_params) as connection:
+        INSTRUMENTATION.record("connect", "session", time.perf_counter() - start_counter, hostname)
+        yield connection
+
+
+async def send_command(connection, command, hostname):
+    with INSTRUMENTATION.span("command", command, hostname):
+        return await connection.send_command(command)
+
 
 async def collect_outputs(device_params, commands):
     """
@@ -27,11 +60,11 @@ async def collect_outputs(device_params, commands):
         dict: key is the hostname, value is string with all outputs
     """
     hostname = device_params.pop("hostname")
-    async with netdev.create(**device_params) as connection:
+    async with connect(device_params, hostname) as connection:
         device_result = ["{0} {1} {0}".format("=" * 20, hostname)]
 
         for command in commands:
-            command_result = await connection.send_command(command)
+            command_result = await send_command(connection, command, hostname)
             device_result.append("{0} {1} {0}".format("=" * 20, command))
             device_result.append(command_result)
 
@@ -39,16 +72,75 @@ async def collect_outputs(device_params, commands):
         return device_result_string
 
 
+async def collect_output_records(device_params, commands):
+    """
+    Collects commands from the device
+
+    Args:
+        device_params (dict): netmiko connection dictionary with hostname
+        commands (list): list of commands to be executed on the device
+
+    Returns:
+        list: dictionaries with hostname, command and output keys
+    """
+    device_params = dict(device_params)
+    hostname = device_params.pop("hostname")
+    async with connect(device_params, hostname) as connection:
+        return [
+            {"hostname": hostname, "command": command, "output": await send_command(connection, command, hostname)}
+            for command in commands
+        ]
+
+
+async def stream_outputs(devices, commands, writer, max_pending=STREAM_MAX_PENDING):
+    """
+    Collects commands from the devices and writes records as soon as every
+    device is done. Not more than max_pending devices are in progress,
+    so memory does not grow with the number of devices.
+
+    Args:
+        devices (iterable): netmiko connection dictionaries with hostname
+        commands (list): list of commands to be executed on every device
+        writer (ResultWriter): opened writer with STREAM_OUTPUT_FIELDS columns
+        max_pending (int): maximum number of devices in progress
+    """
+    scheduler = Scheduler(max_concurrency=max_pending, max_per_site=None, connections_per_second=None, max_attempts=1)
+    collect = partial(collect_output_records, commands=commands)
+    devices = ((device, SITE_NAME) for device in devices)
+    async for device, records, failure in scheduler.iter_run(collect, devices, max_pending=max_pending):
+        if failure is None:
+            writer.device_done(records)
+        else:
+            writer.device_failed(device["hostname"], failure.exception)
+
+
 def main():
     parsed_yaml = read_yaml()
+    devices = form_connection_params_from_yaml(parsed_yaml, site_name=SITE_NAME)
+    if TRACE_FILE is not None:
+        INSTRUMENTATION.enable()
+    if STREAM_OUTPUT_FILE is not None:
+        loop = asyncio.get_event_loop()
+        with ResultWriter(STREAM_OUTPUT_FILE, STREAM_OUTPUT_FORMAT, STREAM_OUTPUT_FIELDS) as writer:
+            loop.run_until_complete(stream_outputs(devices, COMMANDS_LIST, writer))
+        for hostname, exception in writer.failures:
+            print("Failed to collect outputs from {}: {!r}".format(hostname, exception), file=sys.stderr)
+        if TRACE_FILE is not None:
+            INSTRUMENTATION.export_trace(TRACE_FILE)
+            print(INSTRUMENTATION.format_summary(), file=sys.stderr)
+        return
+
     loop = asyncio.get_event_loop()
     tasks = [
         loop.create_task(collect_outputs(device, COMMANDS_LIST))
-        for device in form_connection_params_from_yaml(parsed_yaml, site=SITE_NAME)
+        for device in devices
     ]
     loop.run_until_complete(asyncio.wait(tasks))
     for task in tasks:
         print(task.result())
+    if TRACE_FILE is not None:
+        INSTRUMENTATION.export_trace(TRACE_FILE)
+        print(INSTRUMENTATION.format_summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+import logging
+from bisect import bisect_left
+from collections import defaultdict, deque
+from typing import Deque, DefaultDict, Dict, Iterable, List, Optional, Tuple
+
+from nornir.core.inventory import Host
+
+from group_index import GroupIndex
+
+
+logger = logging.getLogger("lab_system.allocation")
+
+
+class GearAllocator:
+    """Index of unallocated pod gear by group and tags
+
+    Every device is put into a bucket for each of its groups, including parent groups,
+    and its set of tags, which is stored as a bitset. A request scans only the buckets
+    of the requested group with matching tags instead of all unallocated devices.
+    Buckets keep devices in the inventory order and allocated devices are dropped
+    from them lazily, so the first matching device is the same as with
+    a linear scan of the inventory. Released devices are put back in the inventory order.
+    """
+
+    def __init__(self, devices: Dict[str, Host], group_index: GroupIndex) -> None:
+        self.devices: List[Host] = list(devices.values())
+        self.device_indexes: Dict[str, int] = {device.name: index for index, device in enumerate(self.devices)}
+        self.group_index = group_index
+        self.allocated = bytearray(len(self.devices))
+        self.tag_bits: Dict[str, int] = {}
+        self.device_tags: List[int] = []
+        # group -> tags bitset -> indexes of devices in the inventory order
+        self.buckets: DefaultDict[str, Dict[int, Deque[int]]] = defaultdict(dict)
+        self._matching_buckets: Dict[Tuple[str, int, int], List[Deque[int]]] = {}
+        for device_index, device in enumerate(self.devices):
+            tags_bitset = self.get_tags_bitset(device.get("tags", []), add=True)
+            self.device_tags.append(tags_bitset)
+            for group in group_index.get_parent_groups(device):
+                self.buckets[group].setdefault(tags_bitset, deque()).append(device_index)
+
+    def get_tags_bitset(self, tags: Iterable[str], add: bool = False) -> Optional[int]:
+        """Returns the bitset of the tags, None if some tag is unknown and add is False"""
+        bitset = 0
+        for tag in tags:
+            bit = self.tag_bits.get(tag)
+            if bit is None:
+                if not add:
+                    return None
+                bit = self.tag_bits[tag] = 1 << len(self.tag_bits)
+            bitset |= bit
+        return bitset
+
+    def get_exclude_tags_bitset(self, exclude_tags: Iterable[str]) -> int:
+        # unknown exclude tags can't be on any device
+        bitset = 0
+        for tag in exclude_tags:
+            bitset |= self.tag_bits.get(tag, 0)
+        return bitset
+
+    def _get_matching_buckets(self, group: str, tags_bitset: int, exclude_tags_bitset: int) -> List[Deque[int]]:
+        key = (group, tags_bitset, exclude_tags_bitset)
+        buckets = self._matching_buckets.get(key)
+        if buckets is None:
+            buckets = [
+                bucket
+                for bucket_tags_bitset, bucket in self.buckets.get(group, {}).items()
+                if bucket_tags_bitset & tags_bitset == tags_bitset
+                and not bucket_tags_bitset & exclude_tags_bitset
+            ]
+            self._matching_buckets[key] = buckets
+        return buckets
+
+    def allocate(self, group: str, tags: Iterable[str] = (), exclude_tags: Iterable[str] = ()) -> Optional[Host]:
+        """Marks the first unallocated device of the group with all tags and without exclude_tags as allocated
+
+        Returns:
+            Host: the allocated device or None if there is no such device
+        """
+        tags_bitset = self.get_tags_bitset(tags)
+        if tags_bitset is None:
+            return None
+        exclude_tags_bitset = self.get_exclude_tags_bitset(exclude_tags)
+
+        best_bucket: Optional[Deque[int]] = None
+        for bucket in self._get_matching_buckets(group, tags_bitset, exclude_tags_bitset):
+            while bucket and self.allocated[bucket[0]]:
+                bucket.popleft()
+            if bucket and (best_bucket is None or bucket[0] < best_bucket[0]):
+                best_bucket = bucket
+        if best_bucket is None:
+            return None
+        device_index = best_bucket.popleft()
+        self.allocated[device_index] = 1
+        return self.devices[device_index]
+
+    def allocate_device(
+        self, device_name: str, group: str, tags: Iterable[str] = (), exclude_tags: Iterable[str] = ()
+    ) -> Optional[Host]:
+        """Marks the device as allocated if it is unallocated and matches the group and tags
+
+        Returns:
+            Host: the allocated device or None if it can't be allocated
+        """
+        device_index = self.device_indexes.get(device_name)
+        if device_index is None or self.allocated[device_index]:
+            return None
+        device = self.devices[device_index]
+        tags_bitset = self.get_tags_bitset(tags)
+        device_tags_bitset = self.device_tags[device_index]
+        if (
+            tags_bitset is None
+            or device_tags_bitset & tags_bitset != tags_bitset
+            or device_tags_bitset & self.get_exclude_tags_bitset(exclude_tags)
+            or not self.group_index.has_parent_group(device, group)
+        ):
+            return None
+        # the device is dropped from its buckets lazily
+        self.allocated[device_index] = 1
+        return device
+
+    def release(self, device: Host) -> None:
+        """Marks the device as unallocated again"""
+        device_index = self.device_indexes[device.name]
+        if not self.allocated[device_index]:
+            return
+        self.allocated[device_index] = 0
+        tags_bitset = self.device_tags[device_index]
+        for group in self.group_index.get_parent_groups(device):
+            bucket = self.buckets[group][tags_bitset]
+            # the device is still in the buckets which it wasn't dropped from
+            position = bisect_left(bucket, device_index)
+            if position == len(bucket) or bucket[position] != device_index:
+                bucket.insert(position, device_index)
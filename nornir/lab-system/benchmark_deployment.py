@@ -0,0 +1,178 @@
+"""Benchmark of Deployment construction on a synthetic inventory
+
+The inventory has NUM_HOSTS hosts: pod routers, matrix switches with two
+ports for every router, pod management switches and pair routers with
+internet VLANs. Pods of the "simple" topology are allocated on it.
+Group lookups with inventory.filter, as Deployment did them before,
+are compared with GroupIndex.
+
+Usage:
+    python benchmark_deployment.py [number of hosts] [number of pods]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import ruamel.yaml
+from nornir.core import InitNornir
+from nornir.core.filter import F
+from nornir.core.inventory import Inventory
+
+import setup  # noqa
+from deployment import Deployment
+from group_index import GroupIndex
+from utils import update_description
+
+NUM_HOSTS = 20000
+NUM_PODS = 99
+MATRIX_PORTS_PER_ROUTER = 2
+PORTS_PER_SWITCH = 48
+NUM_PAIR_ROUTERS = 10
+INTERNET_VLAN_START = 1000
+RACK_UNITS = 42
+
+YAML = ruamel.yaml.YAML(typ="safe")
+
+
+def get_rack(host_num: int) -> Dict[str, Any]:
+    return {"rack": f"R{host_num // RACK_UNITS}", "rack_unit": host_num % RACK_UNITS + 1}
+
+
+def generate_inventory(num_hosts: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Returns hosts and groups in the format of inventory/hosts.yaml and inventory/groups.yaml"""
+    num_infra = (
+        num_hosts * MATRIX_PORTS_PER_ROUTER // PORTS_PER_SWITCH
+        + num_hosts // PORTS_PER_SWITCH
+        + NUM_PAIR_ROUTERS
+    )
+    num_routers = num_hosts - num_infra
+    hosts: Dict[str, Any] = {}
+    for router_num in range(num_routers):
+        hosts[f"R{router_num}"] = {
+            "hostname": f"10.{router_num // 65536}.{router_num // 256 % 256}.{router_num % 256}",
+            "groups": ["pod-routers", "dynamic"],
+            **get_rack(router_num),
+        }
+
+    matrix_ports = [
+        (f"R{router_num}", f"Ethernet1/{port_num}")
+        for router_num in range(num_routers)
+        for port_num in range(MATRIX_PORTS_PER_ROUTER)
+    ]
+    for switch_num, start in enumerate(range(0, len(matrix_ports), PORTS_PER_SWITCH)):
+        hosts[f"matrix-{switch_num + 1}"] = {
+            "groups": ["matrix-switches"],
+            "interfaces": [
+                {
+                    "name": f"Ethernet{port_num // 4 + 1}/{port_num % 4}",
+                    "mode": "dot1q-tunnel",
+                    "connected_device": {"name": device_name, "port": port},
+                }
+                for port_num, (device_name, port) in enumerate(matrix_ports[start:start + PORTS_PER_SWITCH])
+            ],
+            **get_rack(num_routers + switch_num),
+        }
+
+    for switch_num, start in enumerate(range(0, num_routers, PORTS_PER_SWITCH)):
+        hosts[f"pod-mgmt-{switch_num + 1}"] = {
+            "groups": ["pod-mgmt"],
+            "interfaces": [
+                {
+                    "name": f"GigabitEthernet0/{port_num}",
+                    "connected_device": {"name": f"R{router_num}", "port": "Ethernet0/0"},
+                }
+                for port_num, router_num in enumerate(range(start, min(start + PORTS_PER_SWITCH, num_routers)))
+            ],
+        }
+
+    vlans_per_router = NUM_PODS // NUM_PAIR_ROUTERS + 1
+    for router_num in range(NUM_PAIR_ROUTERS):
+        hosts[f"pair-{router_num + 1}"] = {
+            "groups": ["pair-routers"],
+            "interfaces": [
+                {
+                    "name": f"Ethernet1/0.{vlan}",
+                    "service": "internet",
+                    "vlan": vlan,
+                }
+                for vlan in range(
+                    INTERNET_VLAN_START + router_num * vlans_per_router,
+                    INTERNET_VLAN_START + (router_num + 1) * vlans_per_router,
+                )
+            ],
+        }
+
+    with open("inventory/groups.yaml") as f:
+        groups = YAML.load(f)
+    return hosts, groups
+
+
+def write_inventory(directory: Path, num_hosts: int) -> Path:
+    hosts, groups = generate_inventory(num_hosts)
+    with open(directory / "hosts.yaml", "w") as f:
+        YAML.dump(hosts, f)
+    with open(directory / "groups.yaml", "w") as f:
+        YAML.dump(groups, f)
+    config_file = directory / "config.yaml"
+    with open(config_file, "w") as f:
+        YAML.dump(
+            {
+                "num_workers": 20,
+                "inventory": "nornir.plugins.inventory.simple.SimpleInventory",
+                "SimpleInventory": {
+                    "host_file": str(directory / "hosts.yaml"),
+                    "group_file": str(directory / "groups.yaml"),
+                },
+            },
+            f,
+        )
+    return config_file
+
+
+def filter_lookups(inventory: Inventory) -> None:
+    """Group lookups of Deployment and update_description with inventory.filter"""
+    inventory.filter(F(pod="unallocated", has_parent_group="pod-gear"))
+    for group in ("matrix-switches", "pod-mgmt", "pair-routers"):
+        inventory.filter(F(groups__contains=group))
+    inventory.filter(F(has_parent_group="infra"))
+
+
+def index_lookups(group_index: GroupIndex) -> None:
+    [host for host in group_index.get_descendant_hosts("pod-gear") if host.get("pod") == "unallocated"]
+    for group in ("matrix-switches", "pod-mgmt", "pair-routers"):
+        group_index.get_hosts(group)
+    group_index.get_descendant_hosts("infra")
+
+
+def measure(description: str, func: Callable[[], Any]) -> Any:
+    start_time = time.perf_counter()
+    result = func()
+    print(f"{description:<40}{time.perf_counter() - start_time:>8.3f} s")
+    return result
+
+
+def run(inventory: Inventory, num_pods: int) -> None:
+    measure("inventory.filter lookups", lambda: filter_lookups(inventory))
+    group_index = measure("GroupIndex build", lambda: GroupIndex(inventory))
+    measure("GroupIndex lookups", lambda: index_lookups(group_index))
+    measure("update_description", lambda: update_description(inventory, group_index))
+    deployment = measure(
+        f"Deployment, {num_pods} pods",
+        lambda: Deployment({"simple": {"quantity": num_pods}}, inventory, group_index),
+    )
+    assert len(deployment.pods) == num_pods
+
+
+def main() -> None:
+    num_hosts = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_HOSTS
+    num_pods = int(sys.argv[2]) if len(sys.argv) > 2 else NUM_PODS
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = write_inventory(Path(directory), num_hosts)
+        nr = measure(f"InitNornir, {num_hosts} hosts", lambda: InitNornir(str(config_file)))
+        run(nr.inventory, num_pods)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Fragmentation and speed of VlanPool under churn of pods
+
+Pods with random numbers of dot1q-tunnel VLANs are added and torn down at random,
+as in a long-running lab. The invariants of the pool are checked by test_vlan_pool.py.
+Reported are allocations which failed while the pool had enough free VLANs
+for the pod (failures because of fragmentation) and the time of an allocation.
+The old counter, which never reused VLANs, is run on the same steps for comparison.
+
+Usage:
+    python benchmark_vlan_pool.py [number of steps] [seed]
+"""
+import random
+import sys
+import time
+from typing import Dict, List
+
+import constants
+from vlan_pool import VlanPool
+
+NUM_STEPS = 20000
+SEED = 0
+MAX_POD_VLANS = 35
+# pods which are deployed at the same time, they take about 90% of the pool
+MAX_PODS = 80
+
+
+def run(num_steps: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    pool = VlanPool.from_range(
+        constants.DOT1Q_TUNNEL_VLAN_START,
+        constants.DOT1Q_TUNNEL_VLAN_END,
+        constants.DOT1Q_TUNNEL_VLAN_BLOCK_SIZE,
+    )
+    pod_vlans: Dict[str, List[int]] = {}
+    counter = constants.DOT1Q_TUNNEL_VLAN_START
+    counter_exhausted_step = None
+    allocations = failures = fragmentation_failures = 0
+    allocation_time = 0.0
+    next_pod_id = 0
+    for step in range(num_steps):
+        if pod_vlans and (len(pod_vlans) >= MAX_PODS or rnd.random() < 0.5):
+            owner = rnd.choice(list(pod_vlans))
+            pool.release(owner)
+            del pod_vlans[owner]
+        else:
+            count = rnd.randint(1, MAX_POD_VLANS)
+            owner = str(next_pod_id)
+            next_pod_id += 1
+            start_time = time.perf_counter()
+            vlans = pool.allocate_block(owner, count)
+            allocation_time += time.perf_counter() - start_time
+            allocations += 1
+            if vlans is None:
+                failures += 1
+                blocks = -(-count // pool.block_size)
+                if pool.num_free >= blocks * pool.block_size:
+                    fragmentation_failures += 1
+            else:
+                pod_vlans[owner] = vlans
+            # the counter and roundup, as Deployment allocated VLANs before
+            counter = -(-(counter + count) // pool.block_size) * pool.block_size
+            if counter_exhausted_step is None and counter > constants.DOT1Q_TUNNEL_VLAN_END + 1:
+                counter_exhausted_step = step
+
+    print(f"{num_steps} steps, {allocations} allocations, {len(pool.vlans)} VLANs in the pool")
+    print(f"{'failed allocations':<45}{failures:>10}")
+    print(f"{'failed because of fragmentation':<45}{fragmentation_failures:>10}")
+    print(f"{'the counter ran out of VLANs at step':<45}{str(counter_exhausted_step):>10}")
+    print(f"{'time of an allocation':<45}{allocation_time / allocations * 1e6:>8.1f} us")
+
+
+def main() -> None:
+    num_steps = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_STEPS
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else SEED
+    run(num_steps, seed)
+
+
+if __name__ == "__main__":
+    main()
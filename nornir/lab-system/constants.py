@@ -2,6 +2,17 @@ import re
 
 POD_ID_STEP = 100
 DOT1Q_TUNNEL_VLAN_START = 2100
+DOT1Q_TUNNEL_VLAN_END = 4094
+# dot1q-tunnel VLANs of a pod take whole blocks, e.g. 2100-2109, 2110-2119
+DOT1Q_TUNNEL_VLAN_BLOCK_SIZE = 10
+# pods, their gear and VLANs are kept between runs and pods can be added and removed
+# without changing the other pods, None to allocate all pods from scratch on every run
+DEPLOYMENT_STATE_FILE = None
+TOPOLOGIES_DIR = "topologies"
+# parsed topologies and startup configs, None to parse them on every run
+TOPOLOGY_CACHE_DIR = ".cache/topologies"
+# threads to parse topologies which are not in the cache, None for the default of ThreadPoolExecutor
+TOPOLOGY_LOAD_WORKERS = 8
 INTERFACE_NAME_RE = re.compile(
     r"(?P<interface_type>[a-zA-Z\-_ ]*)(?P<interface_num>[\d.\/]*)"
 )
\ No newline at end of file
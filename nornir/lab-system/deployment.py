@@ -1,7 +1,9 @@
+import copy
 import itertools
+import json
 import logging
-from collections import deque, defaultdict, OrderedDict
-from pathlib import Path
+import os
+from collections import defaultdict, OrderedDict
 from typing import (
     Dict,
     List,
@@ -12,24 +14,25 @@ from typing import (
     Optional,
     ValuesView,
     Iterator,
-    Deque,
     DefaultDict,
+    Tuple,
 )
 
-import ruamel.yaml
+from pathlib import Path
+
 from mypy_extensions import TypedDict
 from nornir.core.inventory import Inventory
 from nornir.core.inventory import Host
-from nornir.core.filter import F
 
 import constants
-from utils import roundup
+from allocation import GearAllocator
+from group_index import GroupIndex
+from topology_loader import load_topologies, TopologyCache
+from vlan_pool import VlanPool, VlanPoolState
 
 
 YAML_FILENAME_EXTENSIONS = [".yml", ".yaml"]
 
-YAML = ruamel.yaml.YAML(typ="safe")
-
 
 ConnectionEnd = TypedDict(
     "ConnectionEnd",
@@ -42,6 +45,22 @@ Connection = List[ConnectionEnd]
 VMDict = TypedDict("VMDict", {"name": str})
 # TopologyDict = TypedDict("TopologyDict", {"connections": List[List[LinkDict]]})
 
+# lab hostname -> device name
+PodState = TypedDict("PodState", {"topology": str, "devices": Dict[str, str]})
+DeploymentState = TypedDict(
+    "DeploymentState",
+    {
+        "topologies": Dict[str, Dict[str, int]],
+        "pod_id_starts": Dict[str, int],
+        "pods": Dict[str, PodState],
+        "vlans": Dict[str, VlanPoolState],
+    },
+    total=False,
+)
+
+# host data which is set when the device is allocated to a pod
+POD_DEVICE_DATA_KEYS = ("pod", "lab_hostname", "startup_config", "special_reset", "template_data")
+
 logger = logging.getLogger("lab_system.deployment")
 
 
@@ -78,20 +97,48 @@ class VM:
 
 
 class Deployment:
-    def __init__(self, topologies: Dict[str, Dict[str, Any]], inventory) -> None:
-        self.topologies: Dict[str, Dict[str, Any]] = topologies
+    def __init__(
+        self,
+        topologies: Dict[str, Dict[str, Any]],
+        inventory,
+        group_index: Optional[GroupIndex] = None,
+    ) -> None:
+        """
+        Args:
+            topologies: topology name -> {"quantity": number of pods}, if it's empty and
+                DEPLOYMENT_STATE_FILE is set, the topologies of the previous run are deployed
+        """
+        state = self._load_state()
+        self.topologies: Dict[str, Dict[str, Any]] = topologies or state.get("topologies", {})
+        # topology name -> pod id before the first pod of the topology, it's kept between runs,
+        # so pod ids don't depend on the order of the topologies
+        self.pod_id_starts: Dict[str, int] = dict(state.get("pod_id_starts", {}))
+        self._assign_pod_id_starts(self.topologies)
         self.inventory = inventory
+        self.group_index = group_index if group_index is not None else GroupIndex(inventory)
         self.pod_id_to_pod: Dict[int, Pod] = {}
-        self.unallocated_pod_gear = inventory.filter(
-            F(pod="unallocated", has_parent_group="pod-gear")
-        ).hosts
-        self._load_topologies()
-        self.free_matrix_connections = self._parse_matrix_switches()
+        self.unallocated_pod_gear: Dict[str, Host] = {
+            host.name: host
+            for host in self.group_index.get_descendant_hosts("pod-gear")
+            if host.get("pod") == "unallocated"
+        }
+        self.gear_allocator = GearAllocator(self.unallocated_pod_gear, self.group_index)
+        self._load_topologies(self.topologies)
+        self.matrix_connections = self._parse_matrix_switches()
+        self.free_matrix_connections: DefaultDict[str, DeviceMatrixConnections] = defaultdict(OrderedDict)
+        for device_name, matrix_connections in self.matrix_connections.items():
+            self.free_matrix_connections[device_name] = OrderedDict(matrix_connections)
         self.device_to_pod_mgmt_port = self._parse_pod_mgmt_ports()
-        self.internet_vlans = self._parse_pair_routers()
-        self.cur_dot1q_tunnel_vlan = constants.DOT1Q_TUNNEL_VLAN_START
+        self.internet_vlans = VlanPool(self._parse_pair_routers())
+        self.dot1q_tunnel_vlans = VlanPool.from_range(
+            constants.DOT1Q_TUNNEL_VLAN_START,
+            constants.DOT1Q_TUNNEL_VLAN_END,
+            constants.DOT1Q_TUNNEL_VLAN_BLOCK_SIZE,
+        )
+        for pool_name, vlan_pool in self.vlan_pools.items():
+            vlan_pool.load_state(state.get("vlans", {}).get(pool_name, {}))
 
-        self._allocate_pod_gear()
+        self._allocate_pod_gear(state.get("pods", {}))
 
     @property
     def pods(self) -> ValuesView["Pod"]:
@@ -101,32 +148,28 @@ class Deployment:
     def vms(self) -> Iterator[VM]:
         return itertools.chain.from_iterable(pod.vms for pod in self.pods)
 
+    @property
+    def vlan_pools(self) -> Dict[str, VlanPool]:
+        return {"dot1q_tunnel": self.dot1q_tunnel_vlans, "internet": self.internet_vlans}
+
     @property
     def matrix_switches(self) -> Iterable[Host]:
-        return self.inventory.filter(
-            F(groups__contains="matrix-switches")
-        ).hosts.values()
+        return self.group_index.get_hosts("matrix-switches")
 
     def get_device(self, device_name: str) -> Host:
         return self.inventory.hosts[device_name]
 
-    def _load_topologies(self) -> None:
-        topologies_dir = Path("topologies")
-        for topology_name, topology_info in self.topologies.items():
-            topology_dir = topologies_dir / topology_name
-            if not topology_dir.is_dir():
-                raise OSError(f'Directory "{topology_dir}" was not found')
-            configs_dir = topology_dir / "configs"
-            with open(topology_dir / "topology.yml") as f:
-                logger.info('Loading topology "%s"', topology_name)
-                details = YAML.load(f)
-            for device_name, device in details.get('devices', {}).items():
-                startup_config_path = configs_dir / f'{device_name}.txt'
-                if startup_config_path.is_file():
-                    with open(startup_config_path) as f:
-                        device["startup_config"] = f.read()
-            details["configs_dir"] = str(configs_dir)
-            topology_info.update(details)
+    def _load_topologies(self, topologies: Dict[str, Dict[str, Any]]) -> None:
+        cache = (
+            TopologyCache(constants.TOPOLOGY_CACHE_DIR)
+            if constants.TOPOLOGY_CACHE_DIR is not None
+            else None
+        )
+        topology_details = load_topologies(
+            topologies, constants.TOPOLOGIES_DIR, cache, constants.TOPOLOGY_LOAD_WORKERS
+        )
+        for topology_name, topology_info in topologies.items():
+            topology_info.update(topology_details[topology_name])
 
     def _parse_matrix_switches(self) -> DefaultDict[str, DeviceMatrixConnections]:
         result: DefaultDict[str, DeviceMatrixConnections] = defaultdict(OrderedDict)
@@ -160,9 +203,7 @@ class Deployment:
 
     def _parse_pod_mgmt_ports(self) -> Dict[str, Interface]:
         result: Dict[str, Interface] = {}
-        pod_mgmt_switches = self.inventory.filter(
-            F(groups__contains="pod-mgmt")
-        ).hosts.values()
+        pod_mgmt_switches = self.group_index.get_hosts("pod-mgmt")
         for pod_mgmt_switch in pod_mgmt_switches:
             for int_num, interface in enumerate(pod_mgmt_switch.get("interfaces")):
                 interface_name = interface["name"]
@@ -182,12 +223,10 @@ class Deployment:
                     result[device] = connected_interface
         return result
 
-    def _parse_pair_routers(self) -> Deque[int]:
-        result: Deque[int] = deque()
+    def _parse_pair_routers(self) -> List[int]:
+        result: List[int] = []
         presence_set: Set[int] = set()
-        pair_routers = self.inventory.filter(
-            F(groups__contains="pair-routers")
-        ).hosts.values()
+        pair_routers = self.group_index.get_hosts("pair-routers")
         for router in pair_routers:
             for interface in router.get("interfaces", []):
                 if interface.get("service") == "internet":
@@ -206,23 +245,169 @@ class Deployment:
                     presence_set.add(vlan)
         return result
 
-    def _increase_dot1q_tunnel_vlan(self) -> None:
-        self.cur_dot1q_tunnel_vlan = roundup(self.cur_dot1q_tunnel_vlan)
+    def _assign_pod_id_starts(self, topology_names: Iterable[str]) -> None:
+        """Gives topologies which don't have pod ids yet the lowest free range of POD_ID_STEP ids"""
+        used_pod_id_starts = set(self.pod_id_starts.values())
+        pod_id_start = constants.POD_ID_STEP
+        for topology_name in topology_names:
+            if topology_name in self.pod_id_starts:
+                continue
+            while pod_id_start in used_pod_id_starts:
+                pod_id_start += constants.POD_ID_STEP
+            self.pod_id_starts[topology_name] = pod_id_start
+            used_pod_id_starts.add(pod_id_start)
+
+    def get_pod_id_start(self, topology_name: str) -> int:
+        """Returns the pod id before the first pod of the topology"""
+        return self.pod_id_starts[topology_name]
+
+    def _get_free_pod_ids(self, topology_name: str, used_pod_ids: Set[int]) -> Iterator[int]:
+        """Yields ids of the topology which are not used, the lowest first"""
+        pod_id_start = self.get_pod_id_start(topology_name)
+        for pod_id in range(pod_id_start + 1, pod_id_start + constants.POD_ID_STEP):
+            if pod_id not in used_pod_ids:
+                yield pod_id
+        raise ValueError(
+            f'Cannot allocate more than {constants.POD_ID_STEP - 1} pods of the topology "{topology_name}"'
+        )
+
+    def _get_pod_ids(self, saved_pods: Dict[str, PodState]) -> Dict[int, str]:
+        """Returns pod id -> topology name
 
-    def _allocate_pod_gear(self) -> None:
-        topology_pod_id_start = 0
+        Pods of the previous run keep their ids, other pods get the lowest free ids of their topology.
+        """
+        result: Dict[int, str] = {}
         for topology_name, topology_info in self.topologies.items():
-            topology_pod_id_start += constants.POD_ID_STEP
-            for i in range(topology_info["quantity"]):
-                pod_id = topology_pod_id_start + i + 1
+            pod_id_start = self.get_pod_id_start(topology_name)
+            pod_ids = sorted(
+                int(pod_id)
+                for pod_id, pod_state in saved_pods.items()
+                if pod_state["topology"] == topology_name
+                and pod_id_start < int(pod_id) < pod_id_start + constants.POD_ID_STEP
+            )[:topology_info["quantity"]]
+            free_pod_ids = self._get_free_pod_ids(topology_name, set(pod_ids))
+            pod_ids.extend(next(free_pod_ids) for _ in range(topology_info["quantity"] - len(pod_ids)))
+            for pod_id in sorted(pod_ids):
+                result[pod_id] = topology_name
+        return result
+
+    def _allocate_pod_gear(self, saved_pods: Dict[str, PodState]) -> None:
+        pod_ids = self._get_pod_ids(saved_pods)
+        # VLANs of pods which are not deployed anymore are reused
+        for vlan_pool in self.vlan_pools.values():
+            vlan_pool.release_unused(str(pod_id) for pod_id in pod_ids)
+        saved_devices = {
+            pod_id: saved_pods[str(pod_id)]["devices"]
+            for pod_id, topology_name in pod_ids.items()
+            if saved_pods.get(str(pod_id), {}).get("topology") == topology_name
+        }
+        # pods of the previous run are allocated first, so they get their gear back
+        for pod_id in sorted(pod_ids, key=lambda pod_id: pod_id not in saved_devices):
+            topology_name = pod_ids[pod_id]
+            pod = Pod(pod_id, topology_name, deployment=self, saved_devices=saved_devices.get(pod_id))
+            self.pod_id_to_pod[pod_id] = pod
+            logger.info(f'Allocated pod #{pod_id}, topology: "{topology_name}"')
+        self.pod_id_to_pod = {pod_id: self.pod_id_to_pod[pod_id] for pod_id in pod_ids}
+        self.save_state()
+
+    def add_pods(self, topology_name: str, quantity: int = 1) -> Set[str]:
+        """Allocates pods of the topology, the deployed pods are not changed
+
+        Returns:
+            set: names of devices which need to be reconfigured
+        """
+        if topology_name not in self.topologies:
+            topologies = {topology_name: {"quantity": 0}}
+            self._load_topologies(topologies)
+            self.topologies.update(topologies)
+            self._assign_pod_id_starts(topologies)
+        free_pod_ids = self._get_free_pod_ids(topology_name, set(self.pod_id_to_pod))
+        changed_devices: Set[str] = set()
+        try:
+            for _ in range(quantity):
+                pod_id = next(free_pod_ids)
                 pod = Pod(pod_id, topology_name, deployment=self)
                 self.pod_id_to_pod[pod_id] = pod
+                self.topologies[topology_name]["quantity"] += 1
+                changed_devices.update(pod.changed_devices)
                 logger.info(f'Allocated pod #{pod_id}, topology: "{topology_name}"')
-                self._increase_dot1q_tunnel_vlan()
+        finally:
+            self.save_state()
+        return changed_devices
+
+    def remove_pods(self, pod_ids: Iterable[int]) -> Set[str]:
+        """Releases gear, matrix ports and VLANs of the pods, other pods are not changed
+
+        Returns:
+            set: names of devices which need to be reconfigured
+        """
+        pod_ids = list(dict.fromkeys(pod_ids))
+        # nothing is released if any of the pods is not deployed
+        for pod_id in pod_ids:
+            if pod_id not in self.pod_id_to_pod:
+                raise ValueError(f"Pod #{pod_id} is not deployed")
+        changed_devices: Set[str] = set()
+        try:
+            for pod_id in pod_ids:
+                pod = self.pod_id_to_pod.pop(pod_id)
+                changed_devices.update(pod.release())
+                self.topologies[pod.topology_name]["quantity"] -= 1
+                logger.info(f'Removed pod #{pod_id}, topology: "{pod.topology_name}"')
+        finally:
+            self.save_state()
+        return changed_devices
+
+    def get_state(self) -> DeploymentState:
+        return {
+            "topologies": {
+                topology_name: {"quantity": topology_info["quantity"]}
+                for topology_name, topology_info in self.topologies.items()
+            },
+            "pod_id_starts": dict(self.pod_id_starts),
+            "pods": {
+                str(pod.id): {
+                    "topology": pod.topology_name,
+                    "devices": {hostname: device.name for hostname, device in pod.hostname_to_device.items()},
+                }
+                for pod in self.pods
+            },
+            "vlans": {pool_name: vlan_pool.get_state() for pool_name, vlan_pool in self.vlan_pools.items()},
+        }
+
+    def save_state(self) -> None:
+        if constants.DEPLOYMENT_STATE_FILE is None:
+            return
+        path = Path(constants.DEPLOYMENT_STATE_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.get_state(), f, indent=2)
+        os.replace(str(tmp_path), str(path))
+
+    @staticmethod
+    def _load_state() -> DeploymentState:
+        if constants.DEPLOYMENT_STATE_FILE is None:
+            return {}
+        try:
+            with open(constants.DEPLOYMENT_STATE_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
 
 
 class Pod:
-    def __init__(self, pod_id: int, topology_name: str, deployment: Deployment) -> None:
+    def __init__(
+        self,
+        pod_id: int,
+        topology_name: str,
+        deployment: Deployment,
+        saved_devices: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Args:
+            saved_devices: lab hostname -> device name, the devices of the pod in the previous run,
+                they are allocated again if they are still unallocated and match the topology
+        """
         self.id = pod_id
         self.deployment = deployment
         self.topology_name = topology_name
@@ -233,11 +418,19 @@ class Pod:
         self.connections = topology_info.get("connections", [])
 
         self.hostname_to_device: Dict[str, Host] = {}
+        self.saved_devices = saved_devices or {}
+        # host data and interfaces before they were changed by the pod, they are restored on release
+        self._original_data: Dict[str, Dict[str, Any]] = {}
+        self._original_interfaces: Dict[Tuple[str, int], Dict[str, Any]] = {}
 
         self._update_vms(topology_info.get("vms", []))
-        self._allocate_gear()
-        self._process_connections()
-        self._flatten_template_data()
+        try:
+            self._allocate_gear()
+            self._process_connections()
+            self._flatten_template_data()
+        except Exception:
+            self.release()
+            raise
 
     @property
     def vms(self) -> ValuesView[VM]:
@@ -247,6 +440,13 @@ class Pod:
     def sequence_num(self) -> int:
         return self.id % constants.POD_ID_STEP
 
+    @property
+    def changed_devices(self) -> Set[str]:
+        """Names of the pod gear and of the switches whose interfaces were changed for the pod"""
+        return {device.name for device in self.hostname_to_device.values()} | {
+            device_name for device_name, _ in self._original_interfaces
+        }
+
     @property
     def inventory(self) -> Inventory:
         return self.deployment.inventory
@@ -287,16 +487,22 @@ class Pod:
             full_vm_name = self.get_vm_name(vm_name)
             self.vm_name_to_vm[vm_name] = VM(full_vm_name, self)
 
+    def _get_interface(self, device: Host, interface_num: int) -> Dict[str, Any]:
+        """Returns the interface of the device which is going to be changed, its original settings are saved"""
+        interface = device["interfaces"][interface_num]
+        key = (device.name, interface_num)
+        if key not in self._original_interfaces:
+            self._original_interfaces[key] = dict(interface)
+        return interface
+
     def _process_special_reset_device(self, device: Host) -> None:
         device.data["special_reset"] = True
         pod_mgmt_interface = self.deployment.device_to_pod_mgmt_port[device.name]
-        device_name = pod_mgmt_interface.device_name
-        pod_mgmt_interfaces = self.get_device(device_name=device_name).get("interfaces")
-        pod_mgmt_interfaces[pod_mgmt_interface.num]["shutdown"] = True
+        pod_mgmt_switch = self.get_device(device_name=pod_mgmt_interface.device_name)
+        self._get_interface(pod_mgmt_switch, pod_mgmt_interface.num)["shutdown"] = True
 
     def _allocate_gear(self) -> None:
         for device, device_info in self.devices.items():
-            unallocated = True
             group = device_info.get("group")
             if group:
                 group = f"{group}__{self.sequence_num:02d}"
@@ -305,32 +511,39 @@ class Pod:
             tags = device_info.get("tags", [])
             exclude_tags = device_info.get("exclude_tags", [])
             special_reset = device_info.get("special_reset", False)
-            for free_device_name, free_device in list(
-                self.unallocated_pod_gear.items()
-            ):
-                free_device_tags = free_device.get("tags", [])
-                if (
-                    free_device.has_parent_group(group)
-                    and all(tag in free_device_tags for tag in tags)
-                    and not any(tag in free_device_tags for tag in exclude_tags)
-                ):
-                    self.unallocated_pod_gear.pop(free_device_name)
-                    free_device.data["pod"] = self.id
-                    free_device.data["lab_hostname"] = device
-                    startup_config = device_info.get("startup_config")
-                    if startup_config is not None:
-                        free_device.data["startup_config"] = startup_config
-                    self.hostname_to_device[device] = free_device
-                    if special_reset:
-                        self._process_special_reset_device(free_device)
-                    unallocated = False
-                    break
-            if unallocated:
+            free_device = None
+            saved_device_name = self.saved_devices.get(device)
+            if saved_device_name is not None:
+                free_device = self.deployment.gear_allocator.allocate_device(
+                    saved_device_name, group, tags, exclude_tags
+                )
+                if free_device is None:
+                    logger.warning(
+                        f"Device {saved_device_name} of pod #{self.id} can't be allocated again, "
+                        f'looking for another device for "{device}"'
+                    )
+            if free_device is None:
+                free_device = self.deployment.gear_allocator.allocate(group, tags, exclude_tags)
+            if free_device is None:
                 raise ValueError(
                     f'Cannot allocate pod #{self.id}, topology "{self.topology_name}" '
                     f"because an unallocated device with tags: {tags} and "
                     f'the group "{group}" was not found'
                 )
+            self.unallocated_pod_gear.pop(free_device.name)
+            self.hostname_to_device[device] = free_device
+            self._original_data[free_device.name] = {
+                key: copy.deepcopy(free_device.data[key])
+                for key in POD_DEVICE_DATA_KEYS
+                if key in free_device.data
+            }
+            free_device.data["pod"] = self.id
+            free_device.data["lab_hostname"] = device
+            startup_config = device_info.get("startup_config")
+            if startup_config is not None:
+                free_device.data["startup_config"] = startup_config
+            if special_reset:
+                self._process_special_reset_device(free_device)
 
     @staticmethod
     def skip_tunnel_creation(connection: Connection) -> bool:
@@ -408,7 +621,7 @@ class Pod:
 
             matrix_switch = self.get_device(device_name=matrix_int.device_name)
             matrix_int_num = matrix_int.num
-            matrix_int_details = matrix_switch["interfaces"][matrix_int_num]
+            matrix_int_details = self._get_interface(matrix_switch, matrix_int_num)
             matrix_int_details["access_vlan"] = dot1q_vlan
             matrix_int_details["shutdown"] = False
             matrix_int_details["description"] += (
@@ -431,16 +644,43 @@ class Pod:
         for connection_end in connection:
             self._process_connection_end(connection_end, dot1q_vlan)
 
+    def _allocate_vlans(self, vlan_pool: VlanPool, count: int, block: bool, description: str) -> Iterator[int]:
+        if block:
+            vlans = vlan_pool.allocate_block(str(self.id), count)
+        else:
+            vlans = vlan_pool.allocate(str(self.id), count)
+        if vlans is None:
+            raise ValueError(
+                f'Cannot allocate pod #{self.id}, topology "{self.topology_name}" '
+                f"because {count} free {description} VLANs were not found"
+            )
+        return iter(vlans)
+
     def _process_connections(self) -> None:
+        tunnel_connections = [
+            connection for connection in self.connections if not self.skip_tunnel_creation(connection)
+        ]
+        num_internet_connections = sum(
+            1 for connection in tunnel_connections if self.is_internet_service(connection)
+        )
+        internet_vlans = self._allocate_vlans(
+            self.deployment.internet_vlans, num_internet_connections, block=False, description="internet"
+        )
+        # all dot1q-tunnel VLANs of the pod are in a run of aligned blocks
+        dot1q_tunnel_vlans = self._allocate_vlans(
+            self.deployment.dot1q_tunnel_vlans,
+            len(tunnel_connections) - num_internet_connections,
+            block=True,
+            description="dot1q-tunnel",
+        )
         for connection in self.connections:
             if self.skip_tunnel_creation(connection):
                 self._process_matrix_bypass(connection)
             else:
                 if self.is_internet_service(connection):
-                    dot1q_vlan = self.deployment.internet_vlans.popleft()
+                    dot1q_vlan = next(internet_vlans)
                 else:
-                    dot1q_vlan = self.deployment.cur_dot1q_tunnel_vlan
-                    self.deployment.cur_dot1q_tunnel_vlan += 1
+                    dot1q_vlan = next(dot1q_tunnel_vlans)
                 self._process_matrix_connection(connection, dot1q_vlan)
 
     def _flatten_template_data(self) -> None:
@@ -448,3 +688,31 @@ class Pod:
             if 'template_data' in device.data:
                 template_data = device.data["template_data"]
                 template_data.update(template_data.pop('interfaces', {}))
+
+    def release(self) -> Set[str]:
+        """Returns the gear, matrix ports and VLANs of the pod and restores changed host data and interfaces
+
+        Returns:
+            set: names of devices which need to be reconfigured
+        """
+        changed_devices = self.changed_devices
+        for (device_name, interface_num), original_interface in self._original_interfaces.items():
+            interface = self.get_device(device_name=device_name)["interfaces"][interface_num]
+            interface.clear()
+            interface.update(original_interface)
+        for device in self.hostname_to_device.values():
+            for key in POD_DEVICE_DATA_KEYS:
+                device.data.pop(key, None)
+            device.data.update(self._original_data[device.name])
+            self.deployment.gear_allocator.release(device)
+            self.unallocated_pod_gear[device.name] = device
+            self.free_matrix_connections[device.name] = OrderedDict(
+                self.deployment.matrix_connections.get(device.name, {})
+            )
+        for vlan_pool in self.deployment.vlan_pools.values():
+            vlan_pool.release(str(self.id))
+        self.hostname_to_device = {}
+        self.vm_name_to_vm = {}
+        self._original_data = {}
+        self._original_interfaces = {}
+        return changed_devices
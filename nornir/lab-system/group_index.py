@@ -0,0 +1,59 @@
+import logging
+from collections import defaultdict
+from typing import DefaultDict, Dict, FrozenSet, Iterator, List
+
+from nornir.core.inventory import Host, Inventory
+
+
+logger = logging.getLogger("lab_system.group_index")
+
+
+def iter_parent_group_names(item) -> Iterator[str]:
+    """Yields names of the groups of the host or the group and of all their parent groups"""
+    # nornir 2 keeps group names in the list and Group objects in "refs"
+    for group in getattr(item.groups, "refs", item.groups):
+        yield group.name
+        yield from iter_parent_group_names(group)
+
+
+class GroupIndex:
+    """Group membership of all hosts, built once when the inventory is loaded
+
+    Replaces inventory.filter(F(groups__contains=...)) and
+    inventory.filter(F(has_parent_group=...)), which walk all hosts
+    and their group trees on every call. Hosts are kept in the inventory order.
+    """
+
+    def __init__(self, inventory: Inventory) -> None:
+        self.inventory = inventory
+        self._group_hosts: DefaultDict[str, List[Host]] = defaultdict(list)
+        self._parent_group_hosts: DefaultDict[str, List[Host]] = defaultdict(list)
+        self._host_parent_groups: Dict[str, FrozenSet[str]] = {}
+        # parent groups of every group, the same groups are shared by many hosts
+        group_parents: Dict[str, FrozenSet[str]] = {}
+        for host in inventory.hosts.values():
+            parent_groups = set()
+            for group in getattr(host.groups, "refs", host.groups):
+                self._group_hosts[group.name].append(host)
+                if group.name not in group_parents:
+                    group_parents[group.name] = frozenset(iter_parent_group_names(group))
+                parent_groups.add(group.name)
+                parent_groups.update(group_parents[group.name])
+            self._host_parent_groups[host.name] = frozenset(parent_groups)
+            for group_name in parent_groups:
+                self._parent_group_hosts[group_name].append(host)
+        logger.info("Indexed groups of %s hosts", len(self._host_parent_groups))
+
+    def get_hosts(self, group: str) -> List[Host]:
+        """Returns hosts which are members of the group, same as F(groups__contains=group)"""
+        return self._group_hosts.get(group, [])
+
+    def get_descendant_hosts(self, group: str) -> List[Host]:
+        """Returns hosts which are members of the group or its child groups, same as F(has_parent_group=group)"""
+        return self._parent_group_hosts.get(group, [])
+
+    def get_parent_groups(self, host: Host) -> FrozenSet[str]:
+        return self._host_parent_groups[host.name]
+
+    def has_parent_group(self, host: Host, group: str) -> bool:
+        return group in self._host_parent_groups[host.name]
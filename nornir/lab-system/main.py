@@ -6,6 +6,7 @@ from nornir.core import InitNornir
 
 import setup  # noqa
 from deployment import Deployment
+from group_index import GroupIndex
 from utils import update_description, update_host_vars
 
 logger = logging.getLogger('lab_system.main')
@@ -25,16 +26,35 @@ def parse_arguments() -> argparse.Namespace:
         nargs='+',
         help=(
             "Specify topology name and quantity separated by :, "
-            "for example --topology advanced:2 simple:2"
+            "for example --topology advanced:2 simple:2, "
+            "default: the topologies of the previous run if DEPLOYMENT_STATE_FILE is set"
         ),
         type=convert_topology_arg,
-        dest="topologies"
+        dest="topologies",
+        default=[],
+    )
+    parser.add_argument(
+        "-a",
+        "--add",
+        nargs='+',
+        help="Add pods without changing the deployed ones, for example --add simple:1",
+        type=convert_topology_arg,
+        default=[],
+    )
+    parser.add_argument(
+        "-r",
+        "--remove",
+        nargs='+',
+        help="Remove pods by their ids without changing other pods, for example --remove 102",
+        type=int,
+        default=[],
     )
     parser.add_argument(
         "-p", "--pod", type=str, default="all", help="Specify pod number, default: all"
     )
     args = parser.parse_args()
     args.topologies = dict(args.topologies)
+    args.add = dict(args.add)
     return args
 
 
@@ -42,8 +62,14 @@ def main() -> None:
     args = parse_arguments()
     nr = InitNornir("config.yaml")
     update_host_vars(nr.inventory)
-    update_description(nr.inventory)
-    deployment = Deployment(args.topologies, nr.inventory)
+    group_index = GroupIndex(nr.inventory)
+    update_description(nr.inventory, group_index)
+    deployment = Deployment(args.topologies, nr.inventory, group_index)
+    changed_devices = deployment.remove_pods(args.remove)
+    for topology, topology_info in args.add.items():
+        changed_devices |= deployment.add_pods(topology, topology_info["quantity"])
+    if args.add or args.remove:
+        logger.info(f"Devices to reconfigure: {', '.join(sorted(changed_devices))}")
     import ipdb;
     ipdb.set_trace()
 
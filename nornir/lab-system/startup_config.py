@@ -0,0 +1,35 @@
+import logging
+from pathlib import Path
+from typing import Union
+
+
+logger = logging.getLogger("lab_system.startup_config")
+
+
+class StartupConfig:
+    """Startup config of a device which is read from the file only when it is used
+
+    The text is not kept in memory, so configs of all pods are not held for the
+    whole run. str() of the handle reads the file, so templates which render
+    host data and dumps with default=str get the config text as before.
+    Code which uses the text many times calls read() once and keeps it,
+    code which pushes the config can pass path to a driver instead of the text.
+    Handles are equal only to themselves, the same as other host data objects.
+    """
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        # resolved, so the handle still works if the working directory is changed before it is read
+        self.path = Path(path).resolve()
+
+    def read(self) -> str:
+        logger.debug("Reading startup config %s", self.path)
+        with open(self.path) as f:
+            return f.read()
+
+    def __str__(self) -> str:
+        return self.read()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self.path)!r})"
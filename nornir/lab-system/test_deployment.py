@@ -0,0 +1,194 @@
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List
+
+import jinja2
+import pytest
+import ruamel.yaml
+from nornir.core import InitNornir
+from nornir.core.inventory import Inventory
+
+import constants
+from deployment import Deployment
+from utils import update_description
+
+LAB_DIR = Path(__file__).resolve().parent
+NUM_ROUTERS = 12
+MATRIX_PORTS_PER_ROUTER = 2
+INTERNET_VLANS = range(1000, 1010)
+
+YAML = ruamel.yaml.YAML(typ="safe")
+
+
+def write_inventory(directory: Path) -> Path:
+    """Writes the inventory with routers for pods of the "simple" topology, returns the config file"""
+    routers = [f"R{router_num}" for router_num in range(NUM_ROUTERS)]
+    hosts: Dict[str, Any] = {
+        router: {
+            "hostname": f"10.0.0.{router_num + 1}",
+            "groups": ["pod-routers", "dynamic"],
+            "rack": "R1",
+            "rack_unit": router_num + 1,
+        }
+        for router_num, router in enumerate(routers)
+    }
+    hosts["matrix-1"] = {
+        "groups": ["matrix-switches"],
+        "interfaces": [
+            {
+                "name": f"Ethernet{router_num + 1}/{port_num}",
+                "mode": "dot1q-tunnel",
+                "connected_device": {"name": router, "port": f"Ethernet1/{port_num}"},
+            }
+            for router_num, router in enumerate(routers)
+            for port_num in range(MATRIX_PORTS_PER_ROUTER)
+        ],
+    }
+    hosts["pod-mgmt-1"] = {
+        "groups": ["pod-mgmt"],
+        "interfaces": [
+            {"name": f"GigabitEthernet0/{port_num}", "connected_device": {"name": router, "port": "Ethernet0/0"}}
+            for port_num, router in enumerate(routers)
+        ],
+    }
+    hosts["pair-1"] = {
+        "groups": ["pair-routers"],
+        "interfaces": [
+            {"name": f"Ethernet1/0.{vlan}", "service": "internet", "vlan": vlan} for vlan in INTERNET_VLANS
+        ],
+    }
+    with open(LAB_DIR / "inventory" / "groups.yaml") as f:
+        groups = YAML.load(f)
+    with open(directory / "hosts.yaml", "w") as f:
+        YAML.dump(hosts, f)
+    with open(directory / "groups.yaml", "w") as f:
+        YAML.dump(groups, f)
+    config_file = directory / "config.yaml"
+    with open(config_file, "w") as f:
+        YAML.dump(
+            {
+                "logging_file": str(directory / "nornir.log"),
+                "inventory": "nornir.plugins.inventory.simple.SimpleInventory",
+                "SimpleInventory": {
+                    "host_file": str(directory / "hosts.yaml"),
+                    "group_file": str(directory / "groups.yaml"),
+                },
+            },
+            f,
+        )
+    return config_file
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    topologies_dir = tmp_path / "topologies"
+    # two topologies with the same devices, so pods of both can be allocated
+    for topology_name in ("simple", "simple-copy"):
+        shutil.copytree(str(LAB_DIR / "topologies" / "simple"), str(topologies_dir / topology_name))
+    monkeypatch.setattr(constants, "TOPOLOGIES_DIR", str(topologies_dir))
+    monkeypatch.setattr(constants, "TOPOLOGY_CACHE_DIR", None)
+    monkeypatch.setattr(constants, "DEPLOYMENT_STATE_FILE", str(tmp_path / "state" / "deployment.json"))
+    return write_inventory(tmp_path)
+
+
+def load_inventory(config_file: Path) -> Inventory:
+    inventory = InitNornir(str(config_file)).inventory
+    update_description(inventory)
+    return inventory
+
+
+def get_host_data(inventory: Inventory) -> Dict[str, str]:
+    return {host.name: json.dumps(host.data, sort_keys=True, default=repr) for host in inventory.hosts.values()}
+
+
+def get_pod_devices(deployment: Deployment) -> Dict[int, Dict[str, str]]:
+    return {
+        pod.id: {hostname: device.name for hostname, device in pod.hostname_to_device.items()}
+        for pod in deployment.pods
+    }
+
+
+def get_vlans(deployment: Deployment) -> Dict[str, Dict[str, List[int]]]:
+    return {pool_name: vlan_pool.get_state() for pool_name, vlan_pool in deployment.vlan_pools.items()}
+
+
+def test_add_pods_matches_deployment_from_scratch(config_file, monkeypatch):
+    deployment = Deployment({"simple": {"quantity": 2}}, load_inventory(config_file))
+    before = get_host_data(deployment.inventory)
+    changed_devices = deployment.add_pods("simple")
+
+    monkeypatch.setattr(constants, "DEPLOYMENT_STATE_FILE", None)
+    from_scratch = Deployment({"simple": {"quantity": 3}}, load_inventory(config_file))
+    assert get_pod_devices(deployment) == get_pod_devices(from_scratch)
+    after = get_host_data(deployment.inventory)
+    assert after == get_host_data(from_scratch.inventory)
+    assert changed_devices == {name for name in after if after[name] != before[name]}
+
+
+def test_remove_pods_and_reload_state(config_file):
+    deployment = Deployment({"simple": {"quantity": 4}}, load_inventory(config_file))
+    pod_devices = get_pod_devices(deployment)
+    changed_devices = deployment.remove_pods([102])
+    assert changed_devices >= set(pod_devices[102].values())
+    del pod_devices[102]
+    assert get_pod_devices(deployment) == pod_devices
+
+    reloaded = Deployment({}, load_inventory(config_file))
+    assert reloaded.get_state()["topologies"] == {"simple": {"quantity": 3}}
+    assert get_pod_devices(reloaded) == pod_devices
+    assert get_host_data(reloaded.inventory) == get_host_data(deployment.inventory)
+    assert get_vlans(reloaded) == get_vlans(deployment)
+
+    # the lowest free id is used again
+    reloaded.add_pods("simple")
+    assert sorted(pod.id for pod in reloaded.pods) == [101, 102, 103, 104]
+
+
+def test_remove_all_pods_restores_inventory(config_file):
+    deployment = Deployment({"simple": {"quantity": 0}}, load_inventory(config_file))
+    pristine = get_host_data(deployment.inventory)
+    deployment.add_pods("simple", 3)
+    deployment.remove_pods([101, 102, 103])
+    assert get_host_data(deployment.inventory) == pristine
+    assert get_vlans(deployment) == {"dot1q_tunnel": {}, "internet": {}}
+
+
+def test_remove_pods_releases_nothing_if_a_pod_is_not_deployed(config_file):
+    deployment = Deployment({"simple": {"quantity": 2}}, load_inventory(config_file))
+    host_data = get_host_data(deployment.inventory)
+    state = deployment.get_state()
+    with pytest.raises(ValueError):
+        deployment.remove_pods([101, 199])
+    assert get_host_data(deployment.inventory) == host_data
+    assert deployment.get_state() == state
+    with open(constants.DEPLOYMENT_STATE_FILE) as f:
+        assert json.load(f) == state
+
+
+def test_pod_ids_do_not_depend_on_topology_order(config_file):
+    deployment = Deployment({"simple": {"quantity": 1}}, load_inventory(config_file))
+    pod_devices = get_pod_devices(deployment)
+    assert list(pod_devices) == [101]
+
+    reordered = Deployment(
+        {"simple-copy": {"quantity": 1}, "simple": {"quantity": 1}}, load_inventory(config_file)
+    )
+    assert {pod.id: pod.topology_name for pod in reordered.pods} == {101: "simple", 201: "simple-copy"}
+    assert get_pod_devices(reordered)[101] == pod_devices[101]
+    assert reordered.get_state()["pod_id_starts"] == {"simple": 100, "simple-copy": 200}
+
+
+def test_startup_config_is_rendered_from_the_file(config_file):
+    deployment = Deployment({"simple": {"quantity": 1}}, load_inventory(config_file))
+    environment = jinja2.Environment(undefined=jinja2.StrictUndefined, trim_blocks=True)
+    configs_dir = Path(constants.TOPOLOGIES_DIR) / "simple" / "configs"
+    for hostname, device in deployment.pod_id_to_pod[101].hostname_to_device.items():
+        config_text = (configs_dir / f"{hostname}.txt").read_text()
+        assert str(device["startup_config"]) == config_text
+        # the config is a template of the pod interfaces, as nornir template_string renders it
+        rendered = environment.from_string(str(device["startup_config"])).render(**device["template_data"])
+        assert rendered == config_text.replace("{{ interface_1 }}", device["template_data"]["interface_1"])
+        # host data rendered or dumped as text has the config text
+        assert environment.from_string("{{ startup_config }}").render(**device.data) == config_text
+        assert json.loads(json.dumps(device.data, default=str))["startup_config"] == config_text
@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import topology_loader
+from startup_config import StartupConfig
+from topology_loader import load_topologies, TopologyCache
+
+TOPOLOGY = """\
+devices:
+  Madrid:
+    tags:
+      - router
+  London:
+    tags:
+      - router
+"""
+
+
+@pytest.fixture
+def topologies_dir(tmp_path: Path) -> Path:
+    configs_dir = tmp_path / "topologies" / "simple" / "configs"
+    configs_dir.mkdir(parents=True)
+    (configs_dir.parent / "topology.yml").write_text(TOPOLOGY)
+    (configs_dir / "Madrid.txt").write_text("hostname Madrid\n")
+    return tmp_path / "topologies"
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> TopologyCache:
+    return TopologyCache(str(tmp_path / "cache"))
+
+
+def touch(path: Path, text: str) -> None:
+    """Writes the file and moves its modification time forward, so the change is seen on any filesystem"""
+    mtime_ns = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(text)
+    os.utime(str(path), ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+
+
+def load_from_cache(cache: TopologyCache, topologies_dir: Path):
+    return cache.load("simple", topologies_dir / "simple")
+
+
+def test_hit(cache, topologies_dir):
+    details = load_topologies(["simple"], str(topologies_dir), cache)["simple"]
+    cached = load_from_cache(cache, topologies_dir)
+    assert cached is not None
+    assert cached.keys() == details.keys()
+    assert isinstance(cached["devices"]["Madrid"]["startup_config"], StartupConfig)
+    assert cached["devices"]["Madrid"]["startup_config"].read() == "hostname Madrid\n"
+    assert "startup_config" not in cached["devices"]["London"]
+
+
+def test_edited_config(cache, topologies_dir):
+    load_topologies(["simple"], str(topologies_dir), cache)
+    touch(topologies_dir / "simple" / "configs" / "Madrid.txt", "hostname Madrid-2\n")
+    assert load_from_cache(cache, topologies_dir) is None
+    details = load_topologies(["simple"], str(topologies_dir), cache)["simple"]
+    assert details["devices"]["Madrid"]["startup_config"].read() == "hostname Madrid-2\n"
+    assert load_from_cache(cache, topologies_dir) is not None
+
+
+def test_edited_topology(cache, topologies_dir):
+    load_topologies(["simple"], str(topologies_dir), cache)
+    touch(topologies_dir / "simple" / "topology.yml", TOPOLOGY.replace("router", "switch"))
+    assert load_from_cache(cache, topologies_dir) is None
+    details = load_topologies(["simple"], str(topologies_dir), cache)["simple"]
+    assert details["devices"]["London"]["tags"] == ["switch"]
+
+
+def test_added_config(cache, topologies_dir):
+    load_topologies(["simple"], str(topologies_dir), cache)
+    touch(topologies_dir / "simple" / "configs" / "London.txt", "hostname London\n")
+    assert load_from_cache(cache, topologies_dir) is None
+    details = load_topologies(["simple"], str(topologies_dir), cache)["simple"]
+    assert details["devices"]["London"]["startup_config"].read() == "hostname London\n"
+
+
+def test_stale_cache_version(cache, topologies_dir, monkeypatch):
+    load_topologies(["simple"], str(topologies_dir), cache)
+    monkeypatch.setattr(topology_loader, "CACHE_VERSION", topology_loader.CACHE_VERSION + 1)
+    assert load_from_cache(cache, topologies_dir) is None
+    load_topologies(["simple"], str(topologies_dir), cache)
+    assert load_from_cache(cache, topologies_dir) is not None
+
+
+def test_corrupted_cache(cache, topologies_dir):
+    load_topologies(["simple"], str(topologies_dir), cache)
+    cache.get_path("simple").write_bytes(b"not a pickle")
+    assert load_from_cache(cache, topologies_dir) is None
@@ -0,0 +1,127 @@
+import random
+from typing import Dict, List
+
+from vlan_pool import VlanPool
+
+
+def check_pool(pool: VlanPool, pod_vlans: Dict[str, List[int]]) -> None:
+    """Checks that allocations are whole aligned blocks of contiguous VLANs which don't overlap"""
+    seen = set()
+    for owner, vlans in pod_vlans.items():
+        all_vlans = pool.get_vlans(owner)
+        assert all_vlans[:len(vlans)] == vlans, owner
+        assert all_vlans == list(range(all_vlans[0], all_vlans[0] + len(all_vlans))), owner
+        assert (all_vlans[0] - pool.vlans[0]) % pool.block_size == 0, owner
+        assert len(all_vlans) % pool.block_size == 0, owner
+        assert seen.isdisjoint(all_vlans), owner
+        seen.update(all_vlans)
+    assert pool.num_free == len(pool.vlans) - len(seen)
+    for vlan in seen:
+        assert not pool.free >> pool.vlan_to_index[vlan] & 1, vlan
+
+
+def test_blocks_are_aligned_to_the_start_of_the_pool():
+    pool = VlanPool.from_range(101, 120, block_size=4)
+    assert pool.allocate_block("1", 3) == [101, 102, 103]
+    assert pool.get_vlans("1") == [101, 102, 103, 104]
+    assert pool.allocate_block("2", 5) == [105, 106, 107, 108, 109]
+    assert pool.get_vlans("2") == list(range(105, 113))
+    assert pool.allocate_block("3", 1) == [113]
+    assert pool.num_free == 4
+    assert pool.allocate_block("4", 0) == []
+
+
+def test_allocation_of_the_owner_is_returned_again():
+    pool = VlanPool.from_range(100, 115, block_size=4)
+    assert pool.allocate_block("1", 3) == [100, 101, 102]
+    assert pool.allocate_block("1", 2) == [100, 101]
+    # more blocks are needed, the old ones are released first
+    assert pool.allocate_block("1", 6) == list(range(100, 106))
+    assert pool.num_free == 8
+
+
+def test_released_vlans_are_reused_lower_first():
+    pool = VlanPool.from_range(100, 115, block_size=4)
+    pool.allocate_block("1", 4)
+    pool.allocate_block("2", 4)
+    pool.allocate_block("3", 4)
+    assert pool.release("2") == [104, 105, 106, 107]
+    assert pool.release("1") == [100, 101, 102, 103]
+    assert pool.release("1") == []
+    assert pool.allocate_block("4", 2) == [100, 101]
+    assert pool.allocate_block("5", 4) == [104, 105, 106, 107]
+    assert pool.allocate_block("6", 8) is None
+
+
+def test_fragmented_pool():
+    pool = VlanPool.from_range(100, 107, block_size=2)
+    for owner in "1234":
+        pool.allocate_block(owner, 2)
+    pool.release("1")
+    pool.release("3")
+    # 4 VLANs are free, but not in one run
+    assert pool.num_free == 4
+    assert pool.allocate_block("5", 4) is None
+    assert pool.get_vlans("5") == []
+    assert pool.num_free == 4
+    # VLANs which don't have to be contiguous are still allocated
+    assert pool.allocate("5", 4) == [100, 101, 104, 105]
+    assert pool.allocate("6", 1) is None
+
+
+def test_pool_of_separate_vlans():
+    pool = VlanPool([3001, 2001, 1001])
+    assert pool.allocate("1", 2) == [3001, 2001]
+    assert pool.allocate("2", 1) == [1001]
+    pool.release_unused(["2"])
+    assert pool.owners == ["2"]
+    assert pool.allocate("3", 1) == [3001]
+
+
+def test_owner_without_vlans_is_not_in_the_state():
+    pool = VlanPool.from_range(100, 107, block_size=2)
+    assert pool.allocate("1", 0) == []
+    assert pool.allocate_block("2", 0) == []
+    assert pool.get_state() == {}
+    # an owner which doesn't need VLANs anymore gives them back
+    pool.allocate("3", 2)
+    assert pool.allocate("3", 0) == []
+    assert pool.get_state() == {}
+    assert pool.num_free == 8
+
+
+def test_state_round_trip():
+    pool = VlanPool.from_range(100, 131, block_size=4)
+    pool.allocate_block("1", 5)
+    pool.allocate_block("2", 1)
+    pool.allocate_block("3", 9)
+    pool.release("2")
+    state = pool.get_state()
+
+    restored = VlanPool.from_range(100, 131, block_size=4)
+    restored.load_state(state)
+    assert restored.get_state() == state
+    assert restored.free == pool.free
+    assert restored.allocate_block("4", 4) == pool.allocate_block("4", 4) == [108, 109, 110, 111]
+
+
+def test_load_state_skips_unavailable_vlans():
+    pool = VlanPool.from_range(100, 107, block_size=2)
+    pool.load_state({"1": [100, 101], "2": [101, 102, 200]})
+    assert pool.get_state() == {"1": [100, 101], "2": [102]}
+    assert pool.num_free == 5
+
+
+def test_churn():
+    rnd = random.Random(0)
+    pool = VlanPool.from_range(100, 399, block_size=4)
+    pod_vlans: Dict[str, List[int]] = {}
+    for step in range(3000):
+        if pod_vlans and (len(pod_vlans) >= 15 or rnd.random() < 0.5):
+            owner = rnd.choice(list(pod_vlans))
+            assert pool.release(owner)[:len(pod_vlans[owner])] == pod_vlans.pop(owner)
+        else:
+            vlans = pool.allocate_block(str(step), rnd.randint(1, 35))
+            if vlans is not None:
+                pod_vlans[str(step)] = vlans
+        check_pool(pool, pod_vlans)
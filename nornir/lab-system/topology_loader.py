@@ -0,0 +1,146 @@
+import logging
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import ruamel.yaml
+
+from startup_config import StartupConfig
+
+
+logger = logging.getLogger("lab_system.topology_loader")
+
+TOPOLOGY_FILENAME = "topology.yml"
+CONFIGS_DIRNAME = "configs"
+CACHE_FILENAME_EXTENSION = ".pickle"
+CACHE_VERSION = 2
+
+# relative path -> (mtime in ns, size), None if the file does not exist
+Fingerprint = Dict[str, Optional[Tuple[int, int]]]
+
+
+def get_file_fingerprint(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_fingerprint(topology_dir: Path, paths: Iterable[str]) -> Fingerprint:
+    return {path: get_file_fingerprint(topology_dir / path) for path in paths}
+
+
+def parse_topology(topology_dir: Path) -> Tuple[Dict[str, Any], Fingerprint]:
+    """Parses topology.yml and finds startup configs of the devices
+
+    Startup configs are not read, devices get StartupConfig handles to their files.
+
+    Returns:
+        tuple: topology details and the fingerprint of all files which were read.
+            The configs directory is in the fingerprint too, so configs
+            which are added later invalidate the cache
+    """
+    configs_dir = topology_dir / CONFIGS_DIRNAME
+    paths = [TOPOLOGY_FILENAME, CONFIGS_DIRNAME]
+    # the fingerprint is taken before reading, so a file changed while it is read is reloaded next time
+    fingerprint = get_fingerprint(topology_dir, paths)
+    # ruamel.yaml.YAML keeps the parser state, so every thread needs its own instance
+    yaml = ruamel.yaml.YAML(typ="safe")
+    with open(topology_dir / TOPOLOGY_FILENAME) as f:
+        details = yaml.load(f) or {}
+    for device_name, device in details.get('devices', {}).items():
+        startup_config_path = configs_dir / f'{device_name}.txt'
+        relative_path = f"{CONFIGS_DIRNAME}/{device_name}.txt"
+        fingerprint[relative_path] = get_file_fingerprint(startup_config_path)
+        if startup_config_path.is_file():
+            device["startup_config"] = StartupConfig(startup_config_path)
+    details["configs_dir"] = str(configs_dir)
+    return details, fingerprint
+
+
+class TopologyCache:
+    """Parsed topologies, one pickle file per topology
+
+    The cached topology is used while the topology file, the configs directory
+    and all startup configs have the same modification time and size.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+
+    def get_path(self, topology_name: str) -> Path:
+        return self.directory / f"{topology_name}{CACHE_FILENAME_EXTENSION}"
+
+    def load(self, topology_name: str, topology_dir: Path) -> Optional[Dict[str, Any]]:
+        """Returns cached details of the topology or None if there are none or they are stale"""
+        path = self.get_path(topology_name)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ValueError) as e:
+            logger.warning('Ignoring the corrupted cache of the topology "%s": %s', topology_name, e)
+            return None
+        if entry.get("version") != CACHE_VERSION:
+            return None
+        fingerprint = entry["fingerprint"]
+        if get_fingerprint(topology_dir, fingerprint) != fingerprint:
+            return None
+        return entry["details"]
+
+    def save(self, topology_name: str, details: Dict[str, Any], fingerprint: Fingerprint) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.get_path(topology_name)
+        tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"version": CACHE_VERSION, "fingerprint": fingerprint, "details": details},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(str(tmp_path), str(path))
+
+
+def load_topologies(
+    topology_names: Iterable[str],
+    topologies_dir: str,
+    cache: Optional[TopologyCache] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Loads topologies from the cache, the stale and missing ones are parsed in a thread pool
+
+    Returns:
+        dict: topology name -> details
+    """
+    result: Dict[str, Dict[str, Any]] = {}
+    cold_topologies: List[Tuple[str, Path]] = []
+    for topology_name in topology_names:
+        topology_dir = Path(topologies_dir) / topology_name
+        if not topology_dir.is_dir():
+            raise OSError(f'Directory "{topology_dir}" was not found')
+        details = cache.load(topology_name, topology_dir) if cache is not None else None
+        if details is None:
+            cold_topologies.append((topology_name, topology_dir))
+        else:
+            logger.info('Loaded topology "%s" from the cache', topology_name)
+            result[topology_name] = details
+
+    def load_topology(topology: Tuple[str, Path]) -> Tuple[str, Dict[str, Any], Fingerprint]:
+        topology_name, topology_dir = topology
+        logger.info('Loading topology "%s"', topology_name)
+        return (topology_name, *parse_topology(topology_dir))
+
+    if len(cold_topologies) > 1 and workers != 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            loaded = list(executor.map(load_topology, cold_topologies))
+    else:
+        loaded = [load_topology(topology) for topology in cold_topologies]
+    for topology_name, details, fingerprint in loaded:
+        if cache is not None:
+            cache.save(topology_name, details, fingerprint)
+        result[topology_name] = details
+    return result
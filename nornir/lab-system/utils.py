@@ -1,15 +1,18 @@
-import math
 from pathlib import Path
+from typing import Optional
 
 import ruamel.yaml
 from nornir.core.inventory import Inventory
-from nornir.core.filter import F
+
+from group_index import GroupIndex
 
 YAML = ruamel.yaml.YAML(typ="safe")
 
 
-def update_description(inventory: Inventory) -> None:
-    infra_devices = inventory.filter(F(has_parent_group='infra')).hosts.values()
+def update_description(inventory: Inventory, group_index: Optional[GroupIndex] = None) -> None:
+    if group_index is None:
+        group_index = GroupIndex(inventory)
+    infra_devices = group_index.get_descendant_hosts('infra')
     for device in infra_devices:
         for interface in device.get('interfaces', []):
             if 'connected_device' in interface:
@@ -32,7 +35,3 @@ def update_host_vars(inventory: Inventory) -> None:
             with open(path) as f:
                 host_info = YAML.load(f)
                 host.data.update(host_info)
-
-
-def roundup(value: float) -> int:
-    return int(math.ceil(value / 10)) * 10
@@ -0,0 +1,149 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+logger = logging.getLogger("lab_system.vlan_pool")
+
+# owner -> allocated VLANs, the format of the persisted state
+VlanPoolState = Dict[str, List[int]]
+
+
+class VlanPool:
+    """Pool of VLANs with allocations by owner, e.g. by pod
+
+    Free VLANs are kept in a bitmap, an int where bit i is set if vlans[i] is free.
+    The lowest free VLAN is the lowest set bit and a run of free aligned blocks
+    is found with a few shifts of the bitmap, so allocation doesn't depend
+    on the number of allocated VLANs. Released VLANs are reused, lower ones first.
+    """
+
+    def __init__(self, vlans: Sequence[int], block_size: int = 1) -> None:
+        self.vlans: List[int] = list(vlans)
+        self.block_size = block_size
+        self.vlan_to_index: Dict[int, int] = {vlan: index for index, vlan in enumerate(self.vlans)}
+        self.free = (1 << len(self.vlans)) - 1
+        # bits at the start of every block
+        self._block_starts = sum(1 << index for index in range(0, len(self.vlans), block_size))
+        self._owner_indexes: Dict[str, List[int]] = {}
+
+    @classmethod
+    def from_range(cls, start: int, end: int, block_size: int = 1) -> "VlanPool":
+        """Returns the pool of VLANs from start to end inclusive, blocks are aligned to start"""
+        return cls(range(start, end + 1), block_size)
+
+    @property
+    def owners(self) -> List[str]:
+        return list(self._owner_indexes)
+
+    @property
+    def num_free(self) -> int:
+        return bin(self.free).count("1")
+
+    def get_vlans(self, owner: str) -> List[int]:
+        return [self.vlans[index] for index in self._owner_indexes.get(owner, [])]
+
+    def _take(self, owner: str, indexes: List[int]) -> List[int]:
+        for index in indexes:
+            self.free &= ~(1 << index)
+        self._owner_indexes[owner] = indexes
+        return [self.vlans[index] for index in indexes]
+
+    def _get_allocation(self, owner: str, size: int) -> Optional[List[int]]:
+        """Returns VLANs of the owner if it has exactly size of them, otherwise releases them"""
+        indexes = self._owner_indexes.get(owner)
+        if indexes is None:
+            return None
+        if len(indexes) == size:
+            return [self.vlans[index] for index in indexes]
+        self.release(owner)
+        return None
+
+    def allocate(self, owner: str, count: int) -> Optional[List[int]]:
+        """Allocates the lowest count free VLANs, they don't have to be contiguous
+
+        VLANs which the owner already has are returned if there are count of them.
+
+        Returns:
+            list: allocated VLANs or None if there are not enough free VLANs
+        """
+        if count == 0:
+            # the owner isn't registered, so pods without VLANs are not in the state
+            self.release(owner)
+            return []
+        vlans = self._get_allocation(owner, count)
+        if vlans is not None:
+            return vlans
+        indexes = []
+        free = self.free
+        for _ in range(count):
+            if not free:
+                return None
+            lowest_bit = free & -free
+            free ^= lowest_bit
+            indexes.append(lowest_bit.bit_length() - 1)
+        return self._take(owner, indexes)
+
+    def allocate_block(self, owner: str, count: int) -> Optional[List[int]]:
+        """Allocates the first run of contiguous free blocks which has at least count VLANs
+
+        Whole blocks are allocated to the owner, the first count VLANs are returned.
+        VLANs which the owner already has are returned if they take the same number of blocks.
+
+        Returns:
+            list: count contiguous VLANs or None if there is no such run of free blocks
+        """
+        if count == 0:
+            self.release(owner)
+            return []
+        num_blocks = -(-count // self.block_size)
+        size = num_blocks * self.block_size
+        vlans = self._get_allocation(owner, size)
+        if vlans is not None:
+            return vlans[:count]
+        # bit i stays set if VLANs from i to i + size - 1 are free,
+        # bits above the pool are never set, so the run can't go past its end
+        starts = self.free & self._block_starts
+        shift = 1
+        while shift < size and starts:
+            starts &= self.free >> shift
+            shift += 1
+        if not starts:
+            return None
+        start = (starts & -starts).bit_length() - 1
+        return self._take(owner, list(range(start, start + size)))[:count]
+
+    def release(self, owner: str) -> List[int]:
+        """Frees all VLANs of the owner
+
+        Returns:
+            list: freed VLANs
+        """
+        indexes = self._owner_indexes.pop(owner, [])
+        for index in indexes:
+            self.free |= 1 << index
+        return [self.vlans[index] for index in indexes]
+
+    def release_unused(self, owners: Iterable[str]) -> None:
+        """Frees VLANs of all owners except the given ones"""
+        owners = set(owners)
+        for owner in self.owners:
+            if owner not in owners:
+                logger.info('Released VLANs %s of "%s"', self.release(owner), owner)
+
+    def get_state(self) -> VlanPoolState:
+        return {owner: self.get_vlans(owner) for owner in self._owner_indexes}
+
+    def load_state(self, state: VlanPoolState) -> None:
+        """Restores allocations, VLANs which are not in the pool or already allocated are skipped"""
+        for owner, vlans in state.items():
+            self.release(owner)
+            indexes = []
+            for vlan in vlans:
+                index = self.vlan_to_index.get(vlan)
+                if index is None or not self.free >> index & 1:
+                    logger.warning('VLAN %s of "%s" is not available in the pool, skipping it', vlan, owner)
+                    continue
+                indexes.append(index)
+            if indexes:
+                self._take(owner, indexes)
+
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Benchmark of parsing neighbors of the CLI backend against the RESTCONF backend
+
+The same synthetic neighbors are rendered as "show lldp neighbors detail"
+and as openconfig-lldp JSON. Compared:
+    RESTCONF: json.loads and parse_openconfig_lldp_interfaces, as update_lldp_neighbors does
+    CLI in threads: regex parsing in the Nornir threads, serialized by the GIL
+    CLI in processes: parse_cli_outputs with a process pool, as update_cli_neighbors does
+
+Usage:
+    python benchmark_cli.py [number of devices] [neighbors per device]
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from cli_neighbors import build_interfaces, parse_cli_outputs, parse_neighbors, ParseJob
+from lldp import parse_openconfig_lldp_interfaces
+
+
+NUM_DEVICES = 2000
+NUM_NEIGHBORS = 48
+NUM_THREADS = 10
+WORKERS = os.cpu_count()
+DOMAIN = "lab.local"
+
+LLDP_NEIGHBOR_TEMPLATE = """------------------------------------------------
+Local Intf: Gi1/0/{local_port}
+Chassis id: 5254.00{device_num:04x}.{local_port:04x}
+Port id: Gi1/0/{remote_port}
+Port Description: GigabitEthernet1/0/{remote_port}
+System Name: {remote_device}.{domain}
+
+System Description:
+Cisco IOS Software, C3750E Software (C3750E-UNIVERSALK9-M), Version 15.0(2)SE11, RELEASE SOFTWARE (fc3)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2017 by Cisco Systems, Inc.
+Compiled Sat 19-Aug-17 09:34 by prod_rel_team
+
+Time remaining: 97 seconds
+System Capabilities: B,R
+Enabled Capabilities: B
+Management Addresses:
+    IP: 10.{ip_high}.{ip_low}.1
+Auto Negotiation - supported, enabled
+Physical media capabilities:
+    1000baseT(FD)
+    100base-TX(FD)
+Media Attachment Unit type: 30
+Vlan ID: 1
+
+"""
+
+
+def get_neighbors(device_num: int, num_devices: int, num_neighbors: int) -> List[Tuple[int, str, int]]:
+    """Returns (local port, remote device, remote port), the ports of the device are connected to the next devices"""
+    return [
+        (port, f"SW{(device_num + port) % num_devices}", num_neighbors + port)
+        for port in range(1, num_neighbors + 1)
+    ]
+
+
+def render_cli_output(device_num: int, num_devices: int, num_neighbors: int) -> str:
+    neighbors = get_neighbors(device_num, num_devices, num_neighbors)
+    return "".join(
+        LLDP_NEIGHBOR_TEMPLATE.format(
+            local_port=local_port,
+            device_num=device_num,
+            remote_port=remote_port,
+            remote_device=remote_device,
+            domain=DOMAIN,
+            ip_high=device_num // 256,
+            ip_low=device_num % 256,
+        )
+        for local_port, remote_device, remote_port in neighbors
+    ) + f"\nTotal entries displayed: {len(neighbors)}\n"
+
+
+def render_restconf_response(device_num: int, num_devices: int, num_neighbors: int) -> str:
+    interfaces = []
+    for local_port, remote_device, remote_port in get_neighbors(device_num, num_devices, num_neighbors):
+        interface_name = f"GigabitEthernet1/0/{local_port}"
+        interfaces.append({
+            "name": interface_name,
+            "config": {"name": interface_name, "enabled": True},
+            "state": {"name": interface_name, "enabled": True},
+            "neighbors": {"neighbor": [{
+                "id": f"{remote_device}.{DOMAIN}",
+                "state": {
+                    "id": f"{remote_device}.{DOMAIN}",
+                    "system-name": f"{remote_device}.{DOMAIN}",
+                    "port-id": f"Gi1/0/{remote_port}",
+                    "port-description": f"GigabitEthernet1/0/{remote_port}",
+                },
+            }]},
+        })
+    return json.dumps({"openconfig-lldp:interface": interfaces})
+
+
+def parse_restconf_responses(responses: Dict[str, str]) -> Dict[str, Dict]:
+    return {
+        device_name: parse_openconfig_lldp_interfaces(json.loads(response)["openconfig-lldp:interface"], device_name)
+        for device_name, response in responses.items()
+    }
+
+
+def parse_cli_in_threads(jobs: List[ParseJob]) -> Dict[str, Dict]:
+    def parse(job: ParseJob) -> Tuple[str, Dict]:
+        device_name, neighbors = parse_neighbors(job)
+        return device_name, build_interfaces(device_name, neighbors)
+
+    with ThreadPoolExecutor(max_workers=NUM_THREADS) as pool:
+        return dict(pool.map(parse, jobs))
+
+
+def measure(description: str, func: Callable[[], Dict[str, Dict]]) -> None:
+    start_time = time.perf_counter()
+    host_interfaces = func()
+    time_to_run = time.perf_counter() - start_time
+    num_interfaces = sum(len(interfaces) for interfaces in host_interfaces.values())
+    print(f"{description:<35}{time_to_run:>8.2f} s{num_interfaces:>10} interfaces")
+
+
+def main() -> None:
+    num_devices = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_DEVICES
+    num_neighbors = int(sys.argv[2]) if len(sys.argv) > 2 else NUM_NEIGHBORS
+    device_names = [f"SW{device_num}" for device_num in range(num_devices)]
+    responses = {
+        device_name: render_restconf_response(device_num, num_devices, num_neighbors)
+        for device_num, device_name in enumerate(device_names)
+    }
+    jobs = [
+        (device_name, "cisco_ios", "lldp", render_cli_output(device_num, num_devices, num_neighbors))
+        for device_num, device_name in enumerate(device_names)
+    ]
+    print(f"{num_devices} devices, {num_neighbors} neighbors per device")
+    measure("RESTCONF JSON", lambda: parse_restconf_responses(responses))
+    measure(f"CLI regex, {NUM_THREADS} threads", lambda: parse_cli_in_threads(jobs))
+    measure(f"CLI regex, {WORKERS} processes", lambda: parse_cli_outputs(jobs, workers=WORKERS))
+
+
+if __name__ == "__main__":
+    main()
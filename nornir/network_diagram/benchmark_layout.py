@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark of the layout algorithms on synthetic multi-site topologies
+
+Every site has SITE_SIZE devices: two core devices connected to all others,
+and the core devices of neighboring sites are connected.
+
+Usage:
+    python benchmark_layout.py [number of devices ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Tuple
+
+import networkx as nx
+
+import layout
+
+
+SIZES = (500, 1000, 2000, 4000, 8000)
+SITE_SIZE = 50
+# the whole-graph spring layout is quadratic, it is skipped for bigger topologies
+MAX_SPRING_SIZE = 2000
+WORKERS = os.cpu_count()
+
+
+def generate_topology(num_devices: int) -> Tuple[nx.Graph, Dict[str, str]]:
+    graph = nx.Graph()
+    sites = {}
+    num_sites = max(1, num_devices // SITE_SIZE)
+    for device_num in range(num_devices):
+        site_num = device_num % num_sites
+        device_name = f"R{device_num}"
+        graph.add_node(device_name)
+        sites[device_name] = f"site{site_num}"
+        core_num = device_num % (2 * num_sites)
+        if device_num >= 2 * num_sites:
+            graph.add_edge(device_name, f"R{core_num}")
+            graph.add_edge(device_name, f"R{(core_num + num_sites) % (2 * num_sites)}")
+        elif num_sites > 1 and device_num < num_sites:
+            graph.add_edge(device_name, f"R{(device_num + 1) % num_sites}")
+    return graph, sites
+
+
+def measure(func: Callable[[], object]) -> float:
+    start_time = time.perf_counter()
+    func()
+    return time.perf_counter() - start_time
+
+
+def main() -> None:
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    print(
+        f"{'devices':>8}{'spring':>10}{'warm spring':>13}{'hierarchical':>14}"
+        f"{'site':>10}{'warm site':>11}{f'site, {WORKERS} procs':>16}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            graph, sites = generate_topology(size)
+            cache_file = os.path.join(directory, f"layout-{size}.json")
+            site_cache_file = os.path.join(directory, f"site-layout-{size}.json")
+            timings = []
+            if size <= MAX_SPRING_SIZE:
+                timings.append(measure(lambda: layout.compute_layout(graph, "spring", cache_file=cache_file)))
+                timings.append(measure(lambda: layout.compute_layout(graph, "spring", cache_file=cache_file)))
+            else:
+                timings.extend([float("nan")] * 2)
+            timings.append(measure(lambda: layout.compute_layout(graph, "hierarchical")))
+            timings.append(measure(lambda: layout.compute_layout(graph, "site", sites, cache_file=site_cache_file)))
+            timings.append(measure(lambda: layout.compute_layout(graph, "site", sites, cache_file=site_cache_file)))
+            timings.append(measure(lambda: layout.compute_layout(graph, "site", sites, workers=WORKERS)))
+            print(f"{size:>8}" + "".join(
+                f"{timing:>{width}.2f}" for timing, width in zip(timings, (10, 13, 14, 10, 11, 16))
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of interface name normalization
+
+Compares the linear scan over NORMALIZED_INTERFACES with the prefix table
+and the cached normalization on the names of a synthetic topology.
+
+Usage:
+    python benchmark_normalization.py [number of interfaces]
+"""
+import random
+import sys
+import timeit
+from typing import List, Tuple
+
+import normalization
+from normalization import INTERFACE_NAME_RE, NORMALIZED_INTERFACES
+
+
+NUM_INTERFACES = 300_000
+NUM_REPEATS = 5
+INTERFACE_TYPES = (
+    "Gi", "GigabitEthernet", "Te", "TenGigabitEthernet", "Fa", "Fo", "Eth", "Ethernet",
+    "Lo", "Vlan", "Po", "Tu", "mgmt",
+)
+
+
+def linear_scan_normalize_interface_type(interface_type: str) -> str:
+    int_type = interface_type.strip().lower()
+    for norm_int_type in NORMALIZED_INTERFACES:
+        if norm_int_type.lower().startswith(int_type):
+            return norm_int_type
+    return int_type
+
+
+def linear_scan_normalize_interface_name(interface_name: str) -> Tuple[str, str]:
+    match = INTERFACE_NAME_RE.search(interface_name)
+    int_type = linear_scan_normalize_interface_type(match.group("interface_type"))
+    return int_type, match.group("interface_num")
+
+
+def prefix_table_normalize_interface_name(interface_name: str) -> Tuple[str, str]:
+    match = INTERFACE_NAME_RE.search(interface_name)
+    int_type = match.group("interface_type").strip().lower()
+    return normalization.PREFIX_TABLE.get(int_type, int_type), match.group("interface_num")
+
+
+def generate_interface_names(num_interfaces: int, seed: int = 0) -> List[str]:
+    """Interface names as they repeat across the hosts of a big topology"""
+    rnd = random.Random(seed)
+    return [
+        f"{rnd.choice(INTERFACE_TYPES)}{rnd.randint(0, 4)}/{rnd.randint(0, 1)}/{rnd.randint(1, 48)}"
+        for _ in range(num_interfaces)
+    ]
+
+
+def main() -> None:
+    num_interfaces = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_INTERFACES
+    interface_names = generate_interface_names(num_interfaces)
+    print(
+        f"Normalizing {num_interfaces} interface names "
+        f"({len(set(interface_names))} distinct), best of {NUM_REPEATS} runs"
+    )
+    expected = [linear_scan_normalize_interface_name(name) for name in interface_names]
+    for description, func in (
+        ("linear scan", linear_scan_normalize_interface_name),
+        ("prefix table", prefix_table_normalize_interface_name),
+        ("prefix table and cache", normalization.normalize_interface_name),
+    ):
+        normalization.clear_caches()
+        assert [func(name) for name in interface_names] == expected, description
+        normalization.clear_caches()
+        # the first run fills the cache, the best run shows the steady state
+        timings = timeit.repeat(
+            lambda: [func(name) for name in interface_names], number=1, repeat=NUM_REPEATS
+        )
+        print(f"{description:<25}{min(timings):>8.3f} s")
+    print(normalization.normalize_interface_name.cache_info())
+
+
+if __name__ == "__main__":
+    main()
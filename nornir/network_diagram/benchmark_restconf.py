@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark of LLDP collection over RESTCONF against fake_restconf_server.py
+
+Compares one requests.get per host in 10 threads (what update_lldp_neighbors
+does in the Nornir threaded runner) with the asynchronous pooled client
+over HTTP/1.1 and over HTTP/2.
+
+Usage:
+    python benchmark_restconf.py [number of devices] [latency]
+"""
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import requests
+import urllib3
+
+import constants
+import fake_restconf_server
+from lldp import parse_openconfig_lldp_interfaces
+from restconf_async import create_client, run_coroutine, update_lldp_neighbors_async
+
+
+NUM_DEVICES = 500
+LATENCY = 0.05
+NUM_WORKERS = 10
+PORT = 18443
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+def get_hosts(num_devices: int) -> List[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            name=fake_restconf_server.get_device_name(device_num),
+            hostname=f"{fake_restconf_server.get_device_address(device_num)}:{PORT}",
+            username="benchmark",
+            password="benchmark",
+            data={},
+        )
+        for device_num in range(num_devices)
+    ]
+
+
+def update_lldp_neighbors(host: SimpleNamespace) -> None:
+    url = constants.RESTCONF_ROOT + constants.OPENCONFIG_LLDP_NEIGHBORS_ENDPOINT
+    url = url.format(host=host.hostname)
+    response = requests.get(url, headers=constants.HEADERS, auth=(host.username, host.password), verify=False)
+    response.raise_for_status()
+    result = response.json()["openconfig-lldp:interface"]
+    host.data["interfaces"] = parse_openconfig_lldp_interfaces(result, host.name)
+
+
+def collect_with_threads(hosts: List[SimpleNamespace]) -> None:
+    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as pool:
+        list(pool.map(update_lldp_neighbors, hosts))
+
+
+def collect_with_async_client(hosts: List[SimpleNamespace], http2: bool = True) -> None:
+    async def collect() -> Dict[str, Exception]:
+        async with create_client(http2=http2) as client:
+            return await update_lldp_neighbors_async(hosts, client=client)
+
+    failures = run_coroutine(collect())
+    assert not failures, failures
+
+
+def measure(description: str, func: Callable[[], None], hosts: List[SimpleNamespace]) -> None:
+    start_time = time.perf_counter()
+    func()
+    print_result(description, time.perf_counter() - start_time, hosts)
+
+
+def print_result(description: str, time_to_run: float, hosts: List[SimpleNamespace]) -> None:
+    num_links = sum(len(host.data.get("interfaces", {})) for host in hosts)
+    print(f"{description:<45}{time_to_run:>8.2f} s{len(hosts) / time_to_run:>10.1f} hosts/s{num_links:>8} links")
+
+
+def main() -> None:
+    num_devices = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_DEVICES
+    latency = sys.argv[2] if len(sys.argv) > 2 else str(LATENCY)
+    server = subprocess.Popen(
+        [sys.executable, fake_restconf_server.__file__, "-n", str(num_devices), "-p", str(PORT), "-l", latency],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        server.stdout.readline()
+        print(f"{num_devices} devices, {latency} s latency")
+        hosts = get_hosts(num_devices)
+        measure(f"requests.get, {NUM_WORKERS} threads", lambda: collect_with_threads(hosts), hosts)
+
+        for http2 in (False, True):
+            hosts = get_hosts(num_devices)
+            measure(
+                f"httpx {'HTTP/2' if http2 else 'HTTP/1.1'}, {constants.RESTCONF_MAX_CONCURRENCY} concurrent requests",
+                lambda: collect_with_async_client(hosts, http2),
+                hosts,
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
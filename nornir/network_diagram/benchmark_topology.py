@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Benchmark of the interface/link model and build_graph on a synthetic topology
+
+The previous plain-object model is kept here for comparison: it recomputes
+the interface name on every hash, comparison and sort.
+
+Usage:
+    python benchmark_topology.py [number of devices] [number of links]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+
+import normalization
+from interface import Interface
+from topology import build_graph
+
+
+NUM_DEVICES = 10_000
+NUM_LINKS = 200_000
+PORTS_PER_SLOT = 48
+
+
+class LegacyLink:
+    def __init__(self, interfaces: List["LegacyInterface"]) -> None:
+        self.interfaces = sorted(interfaces)
+
+    def __eq__(self, other) -> bool:
+        return all(
+            int1 == int2
+            for int1, int2 in zip(self.interfaces, other.interfaces)
+        )
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.interfaces))
+
+    @property
+    def is_point_to_point(self) -> bool:
+        return len(self.interfaces) == 2
+
+
+class LegacyInterface:
+    def __init__(self, name: str, device_name: Optional[str] = None, neighbors: Iterable = ()) -> None:
+        self.type, self.num = normalization.normalize_interface_name(name)
+        self.device_name = device_name
+        self.neighbors = list(neighbors)
+
+    def __lt__(self, other) -> bool:
+        return (self.device_name, self.name) < (other.device_name, other.name)
+
+    def __eq__(self, other) -> bool:
+        return (self.name, self.device_name) == (other.name, other.device_name)
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.device_name))
+
+    @property
+    def name(self) -> str:
+        return self.type + self.num
+
+    @property
+    def short_name(self) -> str:
+        return self.type[:2] + self.num
+
+    def link_from_neighbors(self) -> LegacyLink:
+        interfaces = [self, *self.neighbors]
+        return LegacyLink(interfaces)
+
+
+def legacy_build_graph(hosts) -> Tuple[nx.Graph, List[Dict[Tuple[str, str], str]]]:
+    edge_labels: List[Dict[Tuple[str, str], str]] = [{}, {}]
+    links = set([
+        interface.link_from_neighbors()
+        for host in hosts
+        for interface in host.data["interfaces"].values()
+    ])
+    graph = nx.Graph()
+    graph.add_nodes_from([host.name for host in hosts])
+
+    for link in links:
+        if not link.is_point_to_point:
+            continue
+
+        edge: Tuple[str, str] = tuple(
+            interface.device_name
+            for interface in link.interfaces
+        )
+        for i, interface in enumerate(link.interfaces):
+            edge_labels[i][edge] = interface.short_name
+        graph.add_edge(*edge)
+    return graph, edge_labels
+
+
+def generate_links(num_devices: int, num_links: int, seed: int = 0) -> List[Tuple[str, str, str, str]]:
+    """Returns list of (device, interface, remote device, remote interface)"""
+    rnd = random.Random(seed)
+    next_port = [0] * num_devices
+
+    def get_interface_name(device_num: int) -> str:
+        port = next_port[device_num]
+        next_port[device_num] += 1
+        return f"Gi{port // PORTS_PER_SLOT + 1}/0/{port % PORTS_PER_SLOT + 1}"
+
+    links = []
+    for _ in range(num_links):
+        device_num1, device_num2 = rnd.sample(range(num_devices), 2)
+        links.append((
+            f"SW{device_num1}", get_interface_name(device_num1),
+            f"SW{device_num2}", get_interface_name(device_num2),
+        ))
+    return links
+
+
+def build_hosts(links: List[Tuple[str, str, str, str]], num_devices: int, interface_cls: Callable) -> List:
+    """Fills host.data["interfaces"] for both ends of every link, like update_lldp_neighbors does"""
+    hosts = {
+        f"SW{device_num}": SimpleNamespace(name=f"SW{device_num}", data={"interfaces": {}})
+        for device_num in range(num_devices)
+    }
+    for device1, interface_name1, device2, interface_name2 in links:
+        for local_device, local_name, remote_device, remote_name in (
+            (device1, interface_name1, device2, interface_name2),
+            (device2, interface_name2, device1, interface_name1),
+        ):
+            interface = interface_cls(local_name, local_device, [interface_cls(remote_name, remote_device)])
+            hosts[local_device].data["interfaces"][interface.name] = interface
+    return list(hosts.values())
+
+
+def run(description: str, links, num_devices: int, interface_cls: Callable, build_graph_func: Callable) -> None:
+    gc.collect()
+    tracemalloc.start()
+    hosts = build_hosts(links, num_devices, interface_cls)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start_time = time.perf_counter()
+    graph, edge_labels = build_graph_func(hosts)
+    build_time = time.perf_counter() - start_time
+    print(
+        f"{description:<10}{memory / 2 ** 20:>12.1f} MiB{build_time:>12.2f} s"
+        f"{graph.number_of_edges():>12}"
+    )
+
+
+def main() -> None:
+    num_devices = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_DEVICES
+    num_links = int(sys.argv[2]) if len(sys.argv) > 2 else NUM_LINKS
+    links = generate_links(num_devices, num_links)
+    print(f"{num_devices} devices, {num_links} links")
+    print(f"{'model':<10}{'interfaces':>16}{'build_graph':>14}{'edges':>12}")
+    run("before", links, num_devices, LegacyInterface, legacy_build_graph)
+    run("after", links, num_devices, Interface, build_graph)
+
+
+if __name__ == "__main__":
+    main()
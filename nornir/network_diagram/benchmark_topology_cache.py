@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Benchmark of the incremental topology against build_graph on a synthetic topology
+
+update_topology is run on an empty cache (the first run), on the saved topology
+without changes and with a part of the links removed, every removed link changes
+the LLDP state of the hosts on its both ends. Every run is repeated and the best
+time is reported.
+
+Usage:
+    python benchmark_topology_cache.py [number of devices] [number of links] [number of segments]
+"""
+import gc
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+from benchmark_topology import build_hosts, generate_links
+from interface import Interface
+from topology import build_graph
+from topology_cache import LldpCache, update_topology
+
+
+NUM_DEVICES = 3000
+NUM_LINKS = 30_000
+NUM_SEGMENTS = 300
+SEGMENT_SIZES = (3, 6)
+# parts of the links which disappear between the runs
+REMOVED_LINKS = (0.001, 0.01)
+REPEATS = 3
+
+
+def add_segments(hosts: List, num_segments: int, seed: int = 0) -> None:
+    """Adds multi-access segments, every interface on a segment sees all the others"""
+    rnd = random.Random(seed)
+    hosts_by_name = {host.name: host for host in hosts}
+    for segment_num in range(num_segments):
+        interfaces = [
+            (device_name, f"Vlan{segment_num + 1}")
+            for device_name in rnd.sample(sorted(hosts_by_name), rnd.randint(*SEGMENT_SIZES))
+        ]
+        for device_name, interface_name in interfaces:
+            neighbors = [Interface(name, device) for device, name in interfaces if device != device_name]
+            interface = Interface(interface_name, device_name, neighbors)
+            hosts_by_name[device_name].data["interfaces"][interface.name] = interface
+
+
+def get_hosts(links, num_devices: int, num_segments: int) -> List:
+    hosts = build_hosts(links, num_devices, Interface)
+    add_segments(hosts, num_segments)
+    return hosts
+
+
+def best_time(func: Callable, setup: Callable = lambda: None) -> float:
+    times = []
+    for _ in range(REPEATS):
+        setup()
+        gc.collect()
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def main() -> None:
+    num_devices = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_DEVICES
+    num_links = int(sys.argv[2]) if len(sys.argv) > 2 else NUM_LINKS
+    num_segments = int(sys.argv[3]) if len(sys.argv) > 3 else NUM_SEGMENTS
+    links = generate_links(num_devices, num_links)
+    hosts = get_hosts(links, num_devices, num_segments)
+    print(f"{num_devices} devices, {num_links} links, {num_segments} segments")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = LldpCache(cache_dir)
+
+        def remove_cache() -> None:
+            if cache.get_path().exists():
+                cache.get_path().unlink()
+
+        def save_cache() -> None:
+            remove_cache()
+            update_topology(hosts, cache)
+
+        results = [
+            ("build_graph", best_time(lambda: build_graph(hosts))),
+            ("update_topology, first run", best_time(lambda: update_topology(hosts, cache), remove_cache)),
+            ("update_topology, no changes", best_time(lambda: update_topology(hosts, cache), save_cache)),
+        ]
+        for removed_links in REMOVED_LINKS:
+            num_removed = int(num_links * removed_links)
+            changed_hosts = get_hosts(links[num_removed:], num_devices, num_segments)
+            num_changed = len({device_name for link in links[:num_removed] for device_name in link[::2]})
+            results.append((
+                f"update_topology, {num_changed} hosts changed",
+                best_time(lambda: update_topology(changed_hosts, cache), save_cache),
+            ))
+    for description, run_time in results:
+        print(f"{description:<36}{run_time:>10.3f} s")
+
+
+if __name__ == "__main__":
+    main()
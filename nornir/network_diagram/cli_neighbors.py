@@ -0,0 +1,159 @@
+"""Neighbors from "show lldp/cdp neighbors detail" for devices without RESTCONF
+
+The devices are polled by Nornir threads, but the outputs are parsed
+in a process pool after the polling: parsing is CPU-bound and in the threads
+it is serialized by the GIL. Workers return plain tuples, which are cheap
+to pickle, and Interface objects are built in the main process.
+
+Outputs are parsed with regular expressions or, with parser="textfsm",
+with ntc-templates, the same templates netmiko uses with use_textfsm=True.
+"""
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from interface import Interface
+from lldp import extract_hostname_from_fqdn
+
+
+logger = logging.getLogger(__name__)
+
+NEIGHBORS_COMMANDS = {
+    "lldp": "show lldp neighbors detail",
+    "cdp": "show cdp neighbors detail",
+}
+CLI_PARSERS = ("regex", "textfsm")
+PROTOCOL_DISABLED_RE = re.compile(r"^% (LLDP|CDP) is not enabled", re.M)
+NEIGHBOR_SPLIT_RE = re.compile(r"^-{6,}$", re.M)
+CDP_NEIGHBOR_RE = re.compile(
+    r"^Device ID:\s*(?P<remote_hostname>\S+).+?"
+    r"^Interface:\s*(?P<local_interface>[^,]+),\s+Port ID \(outgoing port\):\s*(?P<remote_interface>\S.*?)\s*$",
+    re.M | re.S,
+)
+LLDP_LOCAL_INTERFACE_RE = re.compile(r"^Local Intf:\s*(?P<local_interface>\S+)", re.M)
+LLDP_PORT_ID_RE = re.compile(r"^Port id:\s*(?P<port_id>\S+)", re.M)
+LLDP_PORT_DESCRIPTION_RE = re.compile(r"^Port Description:\s*(?P<port_description>\S+)", re.M)
+LLDP_SYSTEM_NAME_RE = re.compile(r"^System Name:\s*(?P<remote_hostname>\S+)", re.M)
+# port id is a MAC address or an ifIndex on some platforms, the port description is used instead
+INTERFACE_LIKE_RE = re.compile(r"^[a-zA-Z][a-zA-Z\-_ ]*\d")
+
+# local interface name -> list of (remote device, remote interface)
+Neighbors = Dict[str, List[Tuple[str, str]]]
+# device name, netmiko platform, protocol, output
+ParseJob = Tuple[str, str, str, str]
+
+
+def is_protocol_disabled(output: str) -> bool:
+    return bool(PROTOCOL_DISABLED_RE.search(output))
+
+
+def parse_cdp_neighbors_detail(output: str) -> Neighbors:
+    neighbors: Neighbors = {}
+    for block in NEIGHBOR_SPLIT_RE.split(output):
+        match = CDP_NEIGHBOR_RE.search(block)
+        if match is None:
+            continue
+        neighbors.setdefault(match.group("local_interface"), []).append(
+            (extract_hostname_from_fqdn(match.group("remote_hostname")), match.group("remote_interface"))
+        )
+    return neighbors
+
+
+def parse_lldp_neighbors_detail(output: str) -> Neighbors:
+    neighbors: Neighbors = {}
+    for block in NEIGHBOR_SPLIT_RE.split(output):
+        local_interface = LLDP_LOCAL_INTERFACE_RE.search(block)
+        system_name = LLDP_SYSTEM_NAME_RE.search(block)
+        if local_interface is None or system_name is None:
+            continue
+        port_id = LLDP_PORT_ID_RE.search(block)
+        remote_interface = port_id.group("port_id") if port_id is not None else ""
+        if not INTERFACE_LIKE_RE.match(remote_interface):
+            port_description = LLDP_PORT_DESCRIPTION_RE.search(block)
+            if port_description is None:
+                continue
+            remote_interface = port_description.group("port_description")
+        neighbors.setdefault(local_interface.group("local_interface"), []).append(
+            (extract_hostname_from_fqdn(system_name.group("remote_hostname")), remote_interface)
+        )
+    return neighbors
+
+
+REGEX_PARSERS = {
+    "lldp": parse_lldp_neighbors_detail,
+    "cdp": parse_cdp_neighbors_detail,
+}
+
+
+def parse_with_textfsm(platform: str, protocol: str, output: str) -> Neighbors:
+    """Parses the output with ntc-templates
+
+    Field names differ between versions of the templates, both old and new names are supported.
+    """
+    from ntc_templates.parse import parse_output
+
+    neighbors: Neighbors = {}
+    for entry in parse_output(platform=platform, command=NEIGHBORS_COMMANDS[protocol], data=output):
+        local_interface = entry.get("local_interface") or entry.get("local_port")
+        remote_hostname = entry.get("neighbor_name") or entry.get("destination_host") or entry.get("neighbor")
+        remote_interface = (
+            entry.get("neighbor_interface") or entry.get("remote_port") or entry.get("neighbor_port_id")
+        )
+        if not (local_interface and remote_hostname and remote_interface):
+            continue
+        neighbors.setdefault(local_interface, []).append(
+            (extract_hostname_from_fqdn(remote_hostname), remote_interface)
+        )
+    return neighbors
+
+
+def parse_neighbors(job: ParseJob, parser: str = "regex") -> Tuple[str, Neighbors]:
+    device_name, platform, protocol, output = job
+    if parser == "textfsm":
+        return device_name, parse_with_textfsm(platform, protocol, output)
+    return device_name, REGEX_PARSERS[protocol](output)
+
+
+def parse_neighbors_with_textfsm(job: ParseJob) -> Tuple[str, Neighbors]:
+    return parse_neighbors(job, "textfsm")
+
+
+def build_interfaces(device_name: str, neighbors: Neighbors) -> Dict[str, Interface]:
+    """Builds interfaces in the same format as parse_openconfig_lldp_interfaces"""
+    host_interfaces = {}
+    for interface_name, remote_ends in neighbors.items():
+        remote_interfaces = [
+            Interface(remote_interface_name, remote_device_name)
+            for remote_device_name, remote_interface_name in remote_ends
+        ]
+        interface = Interface(interface_name, device_name, remote_interfaces)
+        host_interfaces[interface.name] = interface
+    return host_interfaces
+
+
+def parse_cli_outputs(
+    jobs: Iterable[ParseJob],
+    parser: str = "regex",
+    workers: Optional[int] = None,
+) -> Dict[str, Dict[str, Interface]]:
+    """Parses outputs of all devices
+
+    Args:
+        jobs: device name, netmiko platform, protocol ("lldp" or "cdp") and the output
+        parser: "regex" or "textfsm"
+        workers: number of processes, None to parse in this process
+
+    Returns:
+        dict: device name -> interfaces
+    """
+    if parser not in CLI_PARSERS:
+        raise ValueError(f"Unknown CLI parser {parser!r}, supported: {', '.join(CLI_PARSERS)}")
+    jobs = list(jobs)
+    parse_function = parse_neighbors_with_textfsm if parser == "textfsm" else parse_neighbors
+    if workers is not None and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(parse_function, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        results = [parse_function(job) for job in jobs]
+    return {device_name: build_interfaces(device_name, neighbors) for device_name, neighbors in results}
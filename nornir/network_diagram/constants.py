@@ -5,6 +5,48 @@ HEADERS = {
     "Content-Type": "application/yang-data+json",
 }
 
+# collect LLDP neighbors of all hosts with one asynchronous HTTP/2 client
+# instead of one requests.get per host in Nornir threads
+RESTCONF_ASYNC = False
+RESTCONF_MAX_CONCURRENCY = 100
+# seconds, can be overridden per host with "restconf_timeout" in the host data
+RESTCONF_TIMEOUT = 10
+RESTCONF_MAX_ATTEMPTS = 3
+# seconds, the maximum delay before the retry is doubled after every attempt
+RESTCONF_BACKOFF = 0.5
+
+# directory with the topology saved by the previous run, when it is set the graph
+# is loaded from it and only hosts with changed neighbors are re-applied
+LLDP_CACHE_DIR = None
+
+# "restconf" or "cli", can be overridden per host with "collection_backend" in the host data
+COLLECTION_BACKEND = "restconf"
+# the CLI backend tries the protocols in this order until one of them is enabled on the device
+CLI_NEIGHBOR_PROTOCOLS = ("lldp", "cdp")
+# "regex" or "textfsm" (requires ntc-templates)
+CLI_PARSER = "regex"
+# number of processes to parse CLI outputs, None to parse in the main process
+CLI_PARSER_WORKERS = 4
+
+# "spring", "hierarchical" or "site", see layout.py
+LAYOUT_ALGORITHM = "spring"
+# layout of every site for the "site" layout, "spring" or "hierarchical"
+LAYOUT_SITE_ALGORITHM = "spring"
+# positions are saved to the file and the next layout starts from them
+LAYOUT_CACHE_FILE = None
+# number of processes to lay out sites in parallel, None to lay out sites one by one
+LAYOUT_WORKERS = None
+
+# matplotlib picture of the topology, slow to draw for big topologies
+DRAW_TOPOLOGY_PNG = True
+# directory for network-diagram-visualization-js, JSON files per site
+EXPORT_JSON_DIR = None
+EXPORT_SVG_FILE = None
+# CSR index of the topology with articulation points and bridges for topology_index.py queries
+TOPOLOGY_INDEX_FILE = None
+# directory for binary snapshots of every run, the diff with the previous snapshot is printed
+TOPOLOGY_SNAPSHOT_DIR = None
+
 LOGGING_DICT = {
     "version": 1,
     "disable_existing_loggers": True,
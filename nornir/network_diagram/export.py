@@ -0,0 +1,245 @@
+"""Streaming export of the topology for network-diagram-visualization-js and as SVG
+
+JSON export is a directory with one file per site, so the browser can load
+big topologies site by site:
+    index.json: list of sites with their files and sizes
+    site-<site>.json: {"site": ..., "nodes": [...], "edges": [...]}, edges inside of the site
+    inter-site.json: {"edges": [...]}, edges between sites
+Nodes and edges use vis-network format: {"id", "label", "group", "x", "y"}
+and {"from", "to", "title"}.
+
+Both exporters write nodes and edges as they walk the graph, nothing
+is accumulated in memory apart from the list of devices of every site.
+"""
+import json
+import logging
+import math
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import networkx as nx
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = "vis-network"
+EXPORT_VERSION = 1
+INDEX_FILE = "index.json"
+INTER_SITE_FILE = "inter-site.json"
+DEFAULT_SITE = "other"
+# the drawing is at least MIN_DRAWING_SIZE pixels and grows with the square root
+# of the number of devices, so the density of devices is about the same
+MIN_DRAWING_SIZE = 1000
+PIXELS_PER_DEVICE = 80
+SVG_MARGIN = 50
+SVG_NODE_RADIUS = 12
+
+EdgeLabels = List[Dict[Tuple[str, str], str]]
+Layout = Dict[str, Tuple[float, float]]
+
+
+def get_site_file_name(site: str) -> str:
+    return "site-{}.json".format(re.sub(r"[^\w.-]", "_", site))
+
+
+def get_edge_title(edge_labels: EdgeLabels, node1: str, node2: str) -> str:
+    """Returns edge title like R1:Gi1 <-> R2:Gi2"""
+    if (node1, node2) not in edge_labels[0] and (node2, node1) in edge_labels[0]:
+        node1, node2 = node2, node1
+    return (
+        f"{node1}:{edge_labels[0].get((node1, node2), '')} <-> "
+        f"{node2}:{edge_labels[1].get((node1, node2), '')}"
+    )
+
+
+def get_position_scale(layout: Layout) -> float:
+    """Returns number of pixels per unit of the layout"""
+    if not layout:
+        return 1.0
+    xs = [x for x, _ in layout.values()]
+    ys = [y for _, y in layout.values()]
+    layout_size = max(max(xs) - min(xs), max(ys) - min(ys)) or 1
+    return max(MIN_DRAWING_SIZE, math.sqrt(len(layout)) * PIXELS_PER_DEVICE) / layout_size
+
+
+def group_nodes_by_site(graph: nx.Graph, sites: Dict[str, str]) -> Dict[str, List[str]]:
+    site_nodes: Dict[str, List[str]] = defaultdict(list)
+    for node in graph:
+        site_nodes[sites.get(node, DEFAULT_SITE)].append(node)
+    return {site: sorted(nodes) for site, nodes in sorted(site_nodes.items())}
+
+
+def write_json_array(f: TextIO, items: Iterator[dict]) -> int:
+    """Writes JSON array one item at a time
+
+    Returns:
+        int: number of items written
+    """
+    f.write("[")
+    count = 0
+    for item in items:
+        if count:
+            f.write(",\n")
+        f.write(json.dumps(item))
+        count += 1
+    f.write("]")
+    return count
+
+
+class JsonExporter:
+    """Writes the topology in chunks per site
+
+    Args:
+        graph: topology
+        edge_labels: interface names of the edges, as returned by build_graph
+        sites: device name -> site, devices not in the dictionary are in DEFAULT_SITE
+        layout: device positions, devices have no coordinates if it is not set
+    """
+
+    def __init__(
+        self,
+        graph: nx.Graph,
+        edge_labels: EdgeLabels,
+        sites: Dict[str, str],
+        layout: Optional[Layout] = None,
+    ) -> None:
+        self.graph = graph
+        self.edge_labels = edge_labels
+        self.sites = sites
+        self.layout = layout
+        self.position_scale = get_position_scale(layout) if layout else 1.0
+
+    def get_site(self, node: str) -> str:
+        return self.sites.get(node, DEFAULT_SITE)
+
+    def iter_nodes(self, site: str, nodes: List[str]) -> Iterator[dict]:
+        for node in nodes:
+            node_info = {"id": node, "label": node, "group": site}
+            if self.layout is not None and node in self.layout:
+                x, y = self.layout[node]
+                # y grows downwards in the browser
+                node_info["x"] = round(x * self.position_scale, 1)
+                node_info["y"] = round(-y * self.position_scale, 1)
+            yield node_info
+
+    def iter_edges(self, nodes: List[str], inter_site: bool) -> Iterator[dict]:
+        """Yields every edge once: edges inside of the site or edges to other sites"""
+        for node in nodes:
+            site = self.get_site(node)
+            for neighbor in self.graph[node]:
+                is_inter_site = self.get_site(neighbor) != site
+                if is_inter_site != inter_site or neighbor < node:
+                    continue
+                yield {"from": node, "to": neighbor, "title": get_edge_title(self.edge_labels, node, neighbor)}
+
+    def export(self, directory: str) -> Path:
+        """Writes index, site and inter-site files to the directory
+
+        Returns:
+            Path: path of the index file
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        site_nodes = group_nodes_by_site(self.graph, self.sites)
+        index_sites = []
+        for site, nodes in site_nodes.items():
+            file_name = get_site_file_name(site)
+            with (directory / file_name).open("w") as f:
+                f.write('{"site": %s,\n"nodes": ' % json.dumps(site))
+                num_nodes = write_json_array(f, self.iter_nodes(site, nodes))
+                f.write(',\n"edges": ')
+                num_edges = write_json_array(f, self.iter_edges(nodes, inter_site=False))
+                f.write("}\n")
+            index_sites.append({"name": site, "file": file_name, "nodes": num_nodes, "edges": num_edges})
+
+        with (directory / INTER_SITE_FILE).open("w") as f:
+            f.write('{"edges": ')
+            num_inter_site_edges = write_json_array(
+                f,
+                (edge for nodes in site_nodes.values() for edge in self.iter_edges(nodes, inter_site=True)),
+            )
+            f.write("}\n")
+
+        index_path = directory / INDEX_FILE
+        with index_path.open("w") as f:
+            json.dump(
+                {
+                    "format": EXPORT_FORMAT,
+                    "version": EXPORT_VERSION,
+                    "sites": index_sites,
+                    "inter_site_edges": {"file": INTER_SITE_FILE, "edges": num_inter_site_edges},
+                },
+                f,
+                indent=2,
+            )
+        logger.info("The topology was exported to %r, %s sites", str(directory), len(index_sites))
+        return index_path
+
+
+def export_json(
+    graph: nx.Graph,
+    edge_labels: EdgeLabels,
+    sites: Dict[str, str],
+    directory: str,
+    layout: Optional[Layout] = None,
+) -> Path:
+    return JsonExporter(graph, edge_labels, sites, layout).export(directory)
+
+
+def export_svg(
+    graph: nx.Graph,
+    edge_labels: EdgeLabels,
+    sites: Dict[str, str],
+    layout: Layout,
+    path: str,
+) -> None:
+    """Writes the topology as SVG, every site is a separate group
+
+    Edges are drawn first, so nodes are on top of them. The edge title
+    with interface names is shown as a tooltip.
+    """
+    scale = get_position_scale(layout)
+    if layout:
+        min_x = min(x for x, _ in layout.values())
+        max_y = max(y for _, y in layout.values())
+        width = (max(x for x, _ in layout.values()) - min_x) * scale + 2 * SVG_MARGIN
+        height = (max_y - min(y for _, y in layout.values())) * scale + 2 * SVG_MARGIN
+    else:
+        min_x = max_y = 0.0
+        width = height = 2 * SVG_MARGIN
+
+    def to_svg(node: str) -> Tuple[float, float]:
+        x, y = layout[node]
+        return (x - min_x) * scale + SVG_MARGIN, (max_y - y) * scale + SVG_MARGIN
+
+    site_nodes = group_nodes_by_site(graph, sites)
+    with open(path, "w") as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+            f'viewBox="0 0 {width:.0f} {height:.0f}" font-family="sans-serif" font-size="10">\n'
+            '<g class="edges" stroke="#888" stroke-width="1">\n'
+        )
+        for node1, node2 in graph.edges():
+            x1, y1 = to_svg(node1)
+            x2, y2 = to_svg(node2)
+            f.write(
+                f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}">'
+                f"<title>{escape(get_edge_title(edge_labels, node1, node2))}</title></line>\n"
+            )
+        f.write("</g>\n")
+        for site, nodes in site_nodes.items():
+            f.write(f'<g class="site" id={quoteattr("site-" + site)}>\n')
+            for node in nodes:
+                x, y = to_svg(node)
+                f.write(
+                    f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{SVG_NODE_RADIUS}" fill="orange">'
+                    f"<title>{escape(node)} ({escape(site)})</title></circle>"
+                    f'<text x="{x:.1f}" y="{y + 3:.1f}" text-anchor="middle">{escape(node)}</text>\n'
+                )
+            f.write("</g>\n")
+        f.write("</svg>\n")
+    logger.info("The network topology diagram has been saved to %r", path)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Fake RESTCONF devices for benchmarking LLDP collection
+
+Every device listens on its own loopback address (127.1.x.y) on the same port
+and answers any GET with the OpenConfig LLDP interfaces of the device.
+Devices are connected in a ring: GigabitEthernet1 of R{n} is connected
+to GigabitEthernet2 of R{n+1}. The server speaks HTTP/2 or HTTP/1.1 with keep-alive,
+whichever the client selects with ALPN, over TLS with a self-signed certificate
+generated by the openssl command.
+
+Usage:
+    python fake_restconf_server.py -n 500 -l 0.05
+"""
+import argparse
+import asyncio
+import json
+import resource
+import ssl
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+
+from restconf_async import run_coroutine
+
+
+SERVER_PORT = 8443
+DEFAULT_LATENCY = 0.05
+DEFAULT_INTERFACES = 24
+DOMAIN = "lab.local"
+
+
+def get_device_address(device_num: int) -> str:
+    """Returns loopback address of the device, 250 devices per /24 starting from 127.1.0.1"""
+    return f"127.1.{device_num // 250}.{device_num % 250 + 1}"
+
+
+def get_device_name(device_num: int) -> str:
+    return f"R{device_num + 1}"
+
+
+def raise_open_files_limit() -> None:
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit < hard_limit:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+
+
+def generate_lldp_interfaces(device_num: int, num_devices: int, num_interfaces: int) -> Dict[str, List]:
+    """Returns openconfig-lldp interfaces of the device in the ring of num_devices"""
+    ring_neighbors = {
+        "GigabitEthernet1": (get_device_name((device_num + 1) % num_devices), "GigabitEthernet2"),
+        "GigabitEthernet2": (get_device_name((device_num - 1) % num_devices), "GigabitEthernet1"),
+    }
+    interfaces = []
+    for interface_num in range(1, num_interfaces + 1):
+        interface_name = f"GigabitEthernet{interface_num}"
+        interface_info = {
+            "name": interface_name,
+            "config": {"name": interface_name, "enabled": True},
+            "state": {"name": interface_name, "enabled": True},
+        }
+        if interface_name in ring_neighbors and num_devices > 1:
+            remote_device_name, remote_interface_name = ring_neighbors[interface_name]
+            interface_info["neighbors"] = {
+                "neighbor": [{
+                    "id": f"{remote_device_name}.{DOMAIN}",
+                    "state": {
+                        "id": f"{remote_device_name}.{DOMAIN}",
+                        "system-name": f"{remote_device_name}.{DOMAIN}",
+                        "port-id": remote_interface_name,
+                        "port-description": remote_interface_name,
+                    },
+                }]
+            }
+        interfaces.append(interface_info)
+    return {"openconfig-lldp:interface": interfaces}
+
+
+def generate_self_signed_certificate(directory: Path) -> Tuple[Path, Path]:
+    cert_file = directory / "cert.pem"
+    key_file = directory / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=fake-restconf", "-keyout", str(key_file), "-out", str(cert_file),
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return cert_file, key_file
+
+
+class FakeRestconfDevice:
+    def __init__(self, body: bytes, latency: float) -> None:
+        self.body = body
+        self.latency = latency
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        ssl_object = writer.get_extra_info("ssl_object")
+        if ssl_object is not None and ssl_object.selected_alpn_protocol() == "h2":
+            await self.handle_http2_connection(reader, writer)
+        else:
+            await self.handle_http1_connection(reader, writer)
+
+    async def handle_http1_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                await asyncio.sleep(self.latency)
+                if not request.startswith(b"GET "):
+                    writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n")
+                    continue
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/yang-data+json\r\n"
+                    + f"Content-Length: {len(self.body)}\r\n\r\n".encode()
+                    + self.body
+                )
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_http2_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Every request is answered in its own task, so requests multiplexed on the connection wait concurrently"""
+        connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        connection.initiate_connection()
+        writer.write(connection.data_to_send())
+        window_updated = asyncio.Event()
+        responses: Set[asyncio.Task] = set()
+        try:
+            while True:
+                try:
+                    data = await reader.read(65536)
+                except ConnectionError:
+                    break
+                if not data:
+                    break
+                try:
+                    events = connection.receive_data(data)
+                except h2.exceptions.ProtocolError:
+                    writer.write(connection.data_to_send())
+                    break
+                for event in events:
+                    if isinstance(event, h2.events.RequestReceived):
+                        response = asyncio.ensure_future(
+                            self.send_http2_response(connection, writer, event, window_updated)
+                        )
+                        responses.add(response)
+                        response.add_done_callback(responses.discard)
+                    elif isinstance(event, h2.events.WindowUpdated):
+                        window_updated.set()
+                writer.write(connection.data_to_send())
+                if connection.state_machine.state == h2.connection.ConnectionState.CLOSED:
+                    break
+        finally:
+            for response in responses:
+                response.cancel()
+            writer.close()
+
+    async def send_http2_response(
+        self,
+        connection: h2.connection.H2Connection,
+        writer: asyncio.StreamWriter,
+        request: h2.events.RequestReceived,
+        window_updated: asyncio.Event,
+    ) -> None:
+        await asyncio.sleep(self.latency)
+        stream_id = request.stream_id
+        try:
+            if dict(request.headers).get(":method") != "GET":
+                connection.send_headers(stream_id, [(":status", "405"), ("content-length", "0")], end_stream=True)
+                writer.write(connection.data_to_send())
+                return
+            connection.send_headers(stream_id, [
+                (":status", "200"),
+                ("content-type", "application/yang-data+json"),
+                ("content-length", str(len(self.body))),
+            ])
+            offset = 0
+            while offset < len(self.body):
+                chunk_size = min(connection.local_flow_control_window(stream_id), connection.max_outbound_frame_size)
+                if chunk_size <= 0:
+                    window_updated.clear()
+                    await window_updated.wait()
+                    continue
+                connection.send_data(stream_id, self.body[offset:offset + chunk_size])
+                writer.write(connection.data_to_send())
+                offset += chunk_size
+            connection.end_stream(stream_id)
+            writer.write(connection.data_to_send())
+        except h2.exceptions.ProtocolError:
+            # the client reset the stream or closed the connection
+            return
+
+
+async def start_server(
+    cert_directory: Path,
+    num_devices: int,
+    port: int = SERVER_PORT,
+    latency: float = DEFAULT_LATENCY,
+    num_interfaces: int = DEFAULT_INTERFACES,
+) -> List[asyncio.AbstractServer]:
+    """Starts num_devices fake devices, the certificate is generated in cert_directory
+
+    Returns:
+        list: asyncio servers, one per device
+    """
+    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ssl_context.set_alpn_protocols(["h2", "http/1.1"])
+    ssl_context.load_cert_chain(*generate_self_signed_certificate(cert_directory))
+    servers = []
+    for device_num in range(num_devices):
+        body = json.dumps(generate_lldp_interfaces(device_num, num_devices, num_interfaces)).encode()
+        device = FakeRestconfDevice(body, latency)
+        servers.append(await asyncio.start_server(
+            device.handle_connection, get_device_address(device_num), port, ssl=ssl_context
+        ))
+    return servers
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fake RESTCONF devices with OpenConfig LLDP data")
+    parser.add_argument("-n", "--num-devices", type=int, default=100)
+    parser.add_argument("-p", "--port", type=int, default=SERVER_PORT)
+    parser.add_argument("-l", "--latency", type=float, default=DEFAULT_LATENCY,
+                        help="seconds before every response")
+    parser.add_argument("-i", "--num-interfaces", type=int, default=DEFAULT_INTERFACES)
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as cert_directory:
+        await start_server(Path(cert_directory), args.num_devices, args.port, args.latency, args.num_interfaces)
+    print(
+        f"Fake RESTCONF server is ready: {args.num_devices} devices "
+        f"{get_device_address(0)}-{get_device_address(args.num_devices - 1)} port {args.port}",
+        flush=True,
+    )
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    args = parse_arguments()
+    raise_open_files_limit()
+    try:
+        run_coroutine(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,42 @@
-import re
-from typing import Optional, Tuple
+import sys
+from typing import Iterable, Optional, Tuple
 
 from link import Link
-
-
-INTERFACE_NAME_RE = re.compile(
-    r"(?P<interface_type>[a-zA-Z\-_ ]*)(?P<interface_num>[\d.\/]*)"
-)
-
-NORMALIZED_INTERFACES = (
-    "FastEthernet",
-    "GigabitEthernet",
-    "TenGigabitEthernet",
-    "FortyGigabitEthernet",
-    "Ethernet",
-    "Loopback",
-    "Serial",
-    "Vlan",
-    "Tunnel",
-    "Portchannel",
-    "Management",
-)
-
-
+import normalization
+from normalization import INTERFACE_NAME_RE, NORMALIZED_INTERFACES  # noqa: F401
 
 
 class Interface:
-    def __init__(self, name: str, device_name: Optional[str] = None) -> None:
-        self.type, self.num = self.normalize_interface_name(name)
-        self.device_name = device_name
-        self.neighbors = []
+    """Interface of a device with its neighbors
+
+    Interfaces are immutable, so the name and the hash are computed once
+    in the constructor. Neighbors are a tuple, interfaces without neighbors
+    share the empty tuple.
+    """
+    __slots__ = ("type", "num", "device_name", "name", "neighbors", "_hash")
+
+    def __init__(
+        self,
+        name: str,
+        device_name: Optional[str] = None,
+        neighbors: Iterable["Interface"] = (),
+    ) -> None:
+        int_type, int_num = self.normalize_interface_name(name)
+        # the same names repeat on every device, so they are stored once
+        full_name = sys.intern(int_type + int_num)
+        set_attr = object.__setattr__
+        set_attr(self, "type", int_type)
+        set_attr(self, "num", int_num)
+        set_attr(self, "device_name", device_name)
+        set_attr(self, "name", full_name)
+        set_attr(self, "neighbors", tuple(neighbors))
+        set_attr(self, "_hash", hash((device_name, full_name)))
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{self.__class__.__qualname__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__qualname__} is immutable")
 
     def __repr__(self) -> str:
         return (
@@ -45,14 +52,22 @@ class Interface:
         return (self.device_name, self.name) < (other.device_name, other.name)
 
     def __eq__(self, other) -> bool:
-        return (self.name, self.device_name) == (other.name, other.device_name)
+        if self is other:
+            return True
+        if not isinstance(other, Interface):
+            return NotImplemented
+        return (
+            self._hash == other._hash
+            and self.name == other.name
+            and self.device_name == other.device_name
+        )
 
     def __hash__(self) -> int:
-        return hash((self.name, self.device_name))
+        return self._hash
 
     @property
-    def name(self) -> str:
-        return self.type + self.num
+    def key(self) -> Tuple[Optional[str], str]:
+        return self.device_name, self.name
 
     @property
     def short_name(self) -> str:
@@ -70,13 +85,7 @@ class Interface:
             Gi0/1 is converted to GigabitEthernet1
             Te1/1 is converted to TenGigabitEthernet1/1
         """
-        match = INTERFACE_NAME_RE.search(interface_name)
-        if match:
-            int_type = match.group("interface_type")
-            normalized_int_type = Interface.normalize_interface_type(int_type)
-            int_num = match.group("interface_num")
-            return normalized_int_type, int_num
-        raise ValueError(f"Does not recognize {interface_name} as an interface name")
+        return normalization.normalize_interface_name(interface_name)
 
     @staticmethod
     def normalize_interface_type(interface_type: str) -> str:
@@ -86,9 +95,4 @@ class Interface:
             G is converted to GigabitEthernet
             Te is converted to TenGigabitEthernet
         """
-        int_type = interface_type.strip().lower()
-        for norm_int_type in NORMALIZED_INTERFACES:
-            if norm_int_type.lower().startswith(int_type):
-                return norm_int_type
-
-        return int_type
+        return normalization.normalize_interface_type(interface_type)
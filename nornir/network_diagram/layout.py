@@ -0,0 +1,251 @@
+"""Layout of the topology for drawing
+
+Algorithms:
+    spring: force-directed layout of the whole graph, cost grows quadratically
+        with the number of devices
+    hierarchical: devices are placed in layers by the distance from the most connected
+        device of every connected component, linear in the number of devices and links
+    site: every site is laid out separately with SITE_LAYOUT_ALGORITHM and the sites
+        are placed next to each other, linear in the number of sites. Sites can be
+        laid out in parallel in a process pool.
+
+Positions of the previous run can be loaded from the cache file, so the layout
+is warm-started and the devices stay where they were between runs.
+"""
+import json
+import logging
+import math
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+import networkx as nx
+
+if TYPE_CHECKING:
+    from nornir.core.inventory import Host
+
+
+logger = logging.getLogger(__name__)
+
+Position = Tuple[float, float]
+Layout = Dict[str, Position]
+
+LAYOUT_ALGORITHMS = ("spring", "hierarchical", "site")
+SITE_LAYOUT_ALGORITHM = "spring"
+DEFAULT_SITE = "other"
+SPRING_ITERATIONS = 50
+# the cached layout only needs to settle new devices and links
+WARM_START_ITERATIONS = 10
+# free space around every site, relative to the site size
+SITE_PADDING = 0.2
+SEED = 42
+
+
+def get_sites(hosts: Iterable["Host"]) -> Dict[str, str]:
+    """Returns dictionary: host name -> site, the site is the first group of the host"""
+    return {
+        host.name: host.groups[0].name if host.groups else DEFAULT_SITE
+        for host in hosts
+    }
+
+
+def load_layout(path: str) -> Layout:
+    """Returns positions from the cache file or an empty layout if there is no file"""
+    path = Path(path)
+    if not path.is_file():
+        return {}
+    with path.open() as f:
+        return {node: tuple(position) for node, position in json.load(f).items()}
+
+
+def save_layout(path: str, layout: Layout) -> None:
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps({node: list(position) for node, position in layout.items()}))
+    os.replace(str(tmp_path), str(path))
+
+
+def rescale_layout(layout: Layout, scale: float = 1) -> Layout:
+    """Centers the layout at (0, 0) and scales it to fit into [-scale, scale]"""
+    if not layout:
+        return {}
+    xs = [x for x, _ in layout.values()]
+    ys = [y for _, y in layout.values()]
+    center_x = (max(xs) + min(xs)) / 2
+    center_y = (max(ys) + min(ys)) / 2
+    size = max(max(xs) - min(xs), max(ys) - min(ys)) / 2 or 1
+    return {
+        node: ((x - center_x) / size * scale, (y - center_y) / size * scale)
+        for node, (x, y) in layout.items()
+    }
+
+
+def get_initial_layout(graph: nx.Graph, cached_layout: Layout, seed: int = SEED) -> Layout:
+    """Returns positions to start the force-directed layout from
+
+    Devices from the cache keep their positions, new devices are placed
+    at the center of their already placed neighbors or randomly.
+    """
+    rnd = random.Random(seed)
+    layout = rescale_layout({node: cached_layout[node] for node in graph if node in cached_layout})
+    new_nodes = sorted(node for node in graph if node not in layout)
+    for node in new_nodes:
+        placed_neighbors = [layout[neighbor] for neighbor in graph[node] if neighbor in layout]
+        if placed_neighbors:
+            x = sum(position[0] for position in placed_neighbors) / len(placed_neighbors)
+            y = sum(position[1] for position in placed_neighbors) / len(placed_neighbors)
+            layout[node] = (x + rnd.uniform(-0.05, 0.05), y + rnd.uniform(-0.05, 0.05))
+        else:
+            layout[node] = (rnd.uniform(-1, 1), rnd.uniform(-1, 1))
+    return layout
+
+
+def spring_layout(graph: nx.Graph, cached_layout: Optional[Layout] = None) -> Layout:
+    cached_layout = cached_layout or {}
+    if not graph:
+        return {}
+    initial_layout = get_initial_layout(graph, cached_layout)
+    warm_start = all(node in cached_layout for node in graph)
+    iterations = WARM_START_ITERATIONS if warm_start else SPRING_ITERATIONS
+    layout = nx.spring_layout(graph, pos=initial_layout, iterations=iterations)
+    return {node: (float(x), float(y)) for node, (x, y) in layout.items()}
+
+
+def hierarchical_layout(graph: nx.Graph, cached_layout: Optional[Layout] = None) -> Layout:
+    """Places devices in layers by BFS distance from the most connected device
+
+    Every connected component is a separate tree of layers, components are placed
+    from left to right, the biggest first. Inside of the layer devices are ordered
+    by the average position of their parents, so links mostly do not cross.
+    """
+    layout: Layout = {}
+    components = sorted(
+        (sorted(component) for component in nx.connected_components(graph)),
+        key=lambda component: (-len(component), component[0]),
+    )
+    offset_x = 0.0
+    for component in components:
+        root = max(component, key=lambda node: (graph.degree(node), node))
+        layers: List[List[str]] = [[root]]
+        order = {root: 0.0}
+        while True:
+            next_layer_parents: Dict[str, List[float]] = defaultdict(list)
+            for node in layers[-1]:
+                for neighbor in graph[node]:
+                    if neighbor not in order:
+                        next_layer_parents[neighbor].append(order[node])
+            if not next_layer_parents:
+                break
+            layer = sorted(
+                next_layer_parents,
+                key=lambda node: (sum(next_layer_parents[node]) / len(next_layer_parents[node]), node),
+            )
+            for index, node in enumerate(layer):
+                order[node] = index
+            layers.append(layer)
+
+        width = max(len(layer) for layer in layers)
+        for depth, layer in enumerate(layers):
+            start_x = offset_x + (width - len(layer)) / 2
+            for index, node in enumerate(layer):
+                layout[node] = (start_x + index, -depth)
+        offset_x += width + 1
+    return rescale_layout(layout)
+
+
+LAYOUT_FUNCTIONS = {
+    "spring": spring_layout,
+    "hierarchical": hierarchical_layout,
+}
+
+
+def layout_subgraph(args: Tuple[str, nx.Graph, Layout]) -> Layout:
+    algorithm, subgraph, cached_layout = args
+    return rescale_layout(LAYOUT_FUNCTIONS[algorithm](subgraph, cached_layout))
+
+
+def site_layout(
+    graph: nx.Graph,
+    sites: Dict[str, str],
+    cached_layout: Optional[Layout] = None,
+    site_algorithm: str = SITE_LAYOUT_ALGORITHM,
+    workers: Optional[int] = None,
+) -> Layout:
+    """Lays out every site separately and places the sites in rows
+
+    The size of every site is proportional to the square root of the number
+    of its devices, so the density of devices is the same in all sites.
+    Devices which are not in the inventory belong to DEFAULT_SITE.
+
+    Args:
+        graph: topology
+        sites: host name -> site
+        cached_layout: positions from the previous run
+        site_algorithm: layout of every site, "spring" or "hierarchical"
+        workers: number of processes to lay out sites in parallel, None to lay out in this process
+    """
+    cached_layout = cached_layout or {}
+    site_nodes: Dict[str, List[str]] = defaultdict(list)
+    for node in graph:
+        site_nodes[sites.get(node, DEFAULT_SITE)].append(node)
+    site_names = sorted(site_nodes)
+    jobs = [
+        (
+            site_algorithm,
+            graph.subgraph(site_nodes[site]).copy(),
+            {node: cached_layout[node] for node in site_nodes[site] if node in cached_layout},
+        )
+        for site in site_names
+    ]
+    if workers is not None and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            site_layouts = list(executor.map(layout_subgraph, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        site_layouts = [layout_subgraph(job) for job in jobs]
+
+    # sites are placed left to right in rows of about the same width
+    site_sizes = [math.sqrt(len(site_nodes[site])) for site in site_names]
+    row_width = math.sqrt(sum(size ** 2 for size in site_sizes)) * (1 + SITE_PADDING) * 1.5
+    layout: Layout = {}
+    x = y = row_height = 0.0
+    for size, site_layout_ in zip(site_sizes, site_layouts):
+        cell = size * (1 + SITE_PADDING)
+        if x and x + cell > row_width:
+            x = 0.0
+            y -= row_height
+            row_height = 0.0
+        center_x = x + cell / 2
+        center_y = y - cell / 2
+        for node, (node_x, node_y) in site_layout_.items():
+            layout[node] = (center_x + node_x * size / 2, center_y + node_y * size / 2)
+        x += cell
+        row_height = max(row_height, cell)
+    return layout
+
+
+def compute_layout(
+    graph: nx.Graph,
+    algorithm: str = "spring",
+    sites: Optional[Dict[str, str]] = None,
+    cache_file: Optional[str] = None,
+    site_algorithm: str = SITE_LAYOUT_ALGORITHM,
+    workers: Optional[int] = None,
+) -> Layout:
+    """Returns positions of all devices, warm-started from the cache file if it is set
+
+    The result is saved to the cache file for the next run.
+    """
+    if algorithm not in LAYOUT_ALGORITHMS:
+        raise ValueError(f"Unknown layout algorithm {algorithm!r}, supported: {', '.join(LAYOUT_ALGORITHMS)}")
+    cached_layout = load_layout(cache_file) if cache_file is not None else {}
+    if algorithm == "site":
+        layout = site_layout(graph, sites or {}, cached_layout, site_algorithm, workers)
+    else:
+        layout = LAYOUT_FUNCTIONS[algorithm](graph, cached_layout)
+    if cache_file is not None:
+        save_layout(cache_file, layout)
+    logger.info("The %s layout of %s devices was computed", algorithm, len(layout))
+    return layout
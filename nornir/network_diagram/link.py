@@ -1,21 +1,43 @@
-from typing import List, TYPE_CHECKING
+from typing import Iterable, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from interface import Interface
 
 
+LinkKey = Tuple[Tuple[Optional[str], str], ...]
+
+
 class Link:
-    def __init__(self, interfaces: List["Interface"]) -> None:
-        self.interfaces = sorted(interfaces)
+    """Link between interfaces
+
+    Interfaces are sorted, so the same link built from any of its interfaces
+    has the same canonical key: the tuple of (device name, interface name)
+    of every interface. The hash of the key is computed once.
+    """
+    __slots__ = ("interfaces", "key", "_hash")
+
+    def __init__(self, interfaces: Iterable["Interface"]) -> None:
+        sorted_interfaces = tuple(sorted(interfaces))
+        key = tuple(interface.key for interface in sorted_interfaces)
+        object.__setattr__(self, "interfaces", sorted_interfaces)
+        object.__setattr__(self, "key", key)
+        object.__setattr__(self, "_hash", hash(key))
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{self.__class__.__qualname__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__qualname__} is immutable")
 
     def __eq__(self, other) -> bool:
-        return all(
-            int1 == int2
-            for int1, int2 in zip(self.interfaces, other.interfaces)
-        )
+        if self is other:
+            return True
+        if not isinstance(other, Link):
+            return NotImplemented
+        return self._hash == other._hash and self.key == other.key
 
     def __hash__(self) -> int:
-        return hash(tuple(self.interfaces))
+        return self._hash
 
     def __str__(self) -> str:
         return " <-> ".join(
@@ -26,10 +48,9 @@ class Link:
     def __repr__(self) -> str:
         return (
             f"{self.__class__.__qualname__}("
-            f"interfaces={self.interfaces})"
+            f"interfaces={list(self.interfaces)})"
         )
 
     @property
     def is_point_to_point(self) -> bool:
         return len(self.interfaces) == 2
-
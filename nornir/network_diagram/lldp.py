@@ -0,0 +1,39 @@
+from typing import Any, Dict, List
+
+from interface import Interface
+
+
+def extract_hostname_from_fqdn(fqdn: str) -> str:
+    """Extracts hostname from fqdn-like string
+
+    For example, R1.cisco.com -> R1,  sw1 -> sw1"
+    """
+    return fqdn.split(".")[0]
+
+
+def parse_openconfig_lldp_interfaces(result: List[Dict[str, Any]], device_name: str) -> Dict[str, Interface]:
+    """Builds interfaces with LLDP neighbors from openconfig-lldp:interface list
+
+    Interfaces without neighbors are skipped.
+
+    Returns:
+        dict: key is the normalized interface name, value is the interface
+    """
+    host_interfaces = {}
+    for interface_info in result:
+        interface_name = interface_info["name"]
+        neighbors = interface_info.get("neighbors")
+        if not neighbors:
+            continue
+        remote_interfaces = []
+        for neighbor_info in neighbors["neighbor"]:
+            neighbor_state = neighbor_info["state"]
+            remote_interface_name = neighbor_state["port-description"]
+            remote_device_fqdn = neighbor_state["system-name"]
+            remote_device_name = extract_hostname_from_fqdn(remote_device_fqdn)
+            remote_interface = Interface(remote_interface_name, remote_device_name)
+            remote_interfaces.append(remote_interface)
+
+        interface = Interface(interface_name, device_name, remote_interfaces)
+        host_interfaces[interface.name] = interface
+    return host_interfaces
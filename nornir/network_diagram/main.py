@@ -2,11 +2,11 @@
 import logging
 import logging.config
 import time
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 from colorama import Fore
 from nornir import InitNornir
-from nornir.core.inventory import Host
+from nornir.plugins.tasks.networking import netmiko_send_command
 import colorama
 import matplotlib.pyplot as plt
 import networkx as nx
@@ -14,7 +14,15 @@ import requests
 import urllib3
 
 import constants
-from interface import Interface
+from cli_neighbors import NEIGHBORS_COMMANDS, is_protocol_disabled, parse_cli_outputs
+from export import export_json, export_svg
+from layout import compute_layout, get_sites
+from lldp import parse_openconfig_lldp_interfaces
+from restconf_async import run_update_lldp_neighbors
+from snapshot import render_diff, save_snapshot
+from topology import build_graph, get_hub_sites
+from topology_cache import LldpCache, render_delta, update_topology
+from topology_index import TopologyIndex
 
 logging.config.dictConfig(constants.LOGGING_DICT)
 logger = logging.getLogger(__name__)
@@ -23,14 +31,6 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 colorama.init()
 
 
-def extract_hostname_from_fqdn(fqdn: str) -> str:
-    """Extracts hostname from fqdn-like string
-
-    For example, R1.cisco.com -> R1,  sw1 -> sw1"
-    """
-    return fqdn.split(".")[0]
-
-
 def update_lldp_neighbors(task):
     url = constants.RESTCONF_ROOT + constants.OPENCONFIG_LLDP_NEIGHBORS_ENDPOINT
     url = url.format(host=task.host.hostname)
@@ -42,55 +42,66 @@ def update_lldp_neighbors(task):
     )
     response.raise_for_status()
     result = response.json()["openconfig-lldp:interface"]
-    device_name = task.host.name
-    host_interfaces = {}
-    task.host.data["interfaces"] = host_interfaces
-    for interface_info in result:
-        interface_name = interface_info["name"]
-        interface = Interface(interface_name, device_name)
-        neighbors = interface_info.get("neighbors")
-        if not neighbors:
-            continue
-        for neighbor_info in neighbors["neighbor"]:
-            neighbor_state = neighbor_info["state"]
-            remote_interface_name = neighbor_state["port-description"]
-            remote_device_fqdn = neighbor_state["system-name"]
-            remote_device_name = extract_hostname_from_fqdn(remote_device_fqdn)
-            remote_interface = Interface(remote_interface_name, remote_device_name)
-            interface.neighbors.append(remote_interface)
-
-        host_interfaces[interface.name] = interface
-
-
-def build_graph(hosts: List[Host]) -> Tuple[nx.Graph, List[Dict[Tuple[str, str], str]]]:
-    edge_labels: List[Dict[Tuple[str, str], str]] = [{}, {}]
-    links = set([
-        interface.link_from_neighbors()
-        for host in hosts
-        for interface in host.data["interfaces"].values()
-    ])
-    graph = nx.Graph()
-    graph.add_nodes_from([host.name for host in hosts])
-
-    for link in links:
-        if not link.is_point_to_point:
-            continue
-
-        edge: Tuple[str, str] = tuple(
-            interface.device_name
-            for interface in link.interfaces
-        )
-        for i, interface in enumerate(link.interfaces):
-            edge_labels[i][edge] = interface.short_name
-        graph.add_edge(*edge)
-    logger.info("The network graph was built")
-    return graph, edge_labels
+    task.host.data["interfaces"] = parse_openconfig_lldp_interfaces(result, task.host.name)
+
+
+def get_collection_backend(host) -> str:
+    return host.get("collection_backend", constants.COLLECTION_BACKEND)
+
+
+def collect_cli_neighbors(task):
+    """Returns the protocol and the output of the first enabled neighbor discovery protocol"""
+    for protocol in constants.CLI_NEIGHBOR_PROTOCOLS:
+        output = task.run(
+            task=netmiko_send_command,
+            command_string=NEIGHBORS_COMMANDS[protocol],
+        ).result
+        if not is_protocol_disabled(output):
+            return protocol, output
+    raise ValueError(f"{task.host.name}: {', '.join(constants.CLI_NEIGHBOR_PROTOCOLS)} are not enabled")
 
 
-def draw_and_save_topology(graph: nx.Graph, edge_labels: List[Dict[Tuple[str, str], str]]) -> None:
+def update_cli_neighbors(nr) -> Dict[str, Exception]:
+    """Collects neighbors with Nornir threads and parses the outputs in a process pool
+
+    Returns:
+        dict: failed host name -> exception, the failed hosts have no interfaces
+    """
+    start_time = time.time()
+    result = nr.run(task=collect_cli_neighbors, raise_on_error=False)
+    failures = {
+        host_name: multi_result.exception
+        for host_name, multi_result in result.failed_hosts.items()
+    }
+    jobs = [
+        (host_name, nr.inventory.hosts[host_name].platform, *multi_result[0].result)
+        for host_name, multi_result in result.items()
+        if host_name not in failures
+    ]
+    collection_time = time.time() - start_time
+    host_interfaces = parse_cli_outputs(jobs, constants.CLI_PARSER, constants.CLI_PARSER_WORKERS)
+    for host_name, host in nr.inventory.hosts.items():
+        host.data["interfaces"] = host_interfaces.get(host_name, {})
+    logger.info(
+        "Neighbors were collected using CLI in %.2f seconds and parsed in %.2f seconds",
+        collection_time, time.time() - start_time - collection_time,
+    )
+    return failures
+
+
+def draw_and_save_topology(
+    graph: nx.Graph,
+    edge_labels: List[Dict[Tuple[str, str], str]],
+    pos: Optional[Dict[str, Tuple[float, float]]] = None,
+) -> None:
     plt.figure(1, figsize=(12, 12))
-    pos = nx.spring_layout(graph)
-    nx.draw_networkx(graph, pos, node_size=1300, node_color='orange')
+    if pos is None:
+        pos = nx.spring_layout(graph)
+    # hubs of multi-access segments are small, aggregated parallel links are thicker
+    node_size = [300 if is_hub else 1300 for _, is_hub in graph.nodes(data="hub")]
+    node_color = ['grey' if is_hub else 'orange' for _, is_hub in graph.nodes(data="hub")]
+    width = [weight for _, _, weight in graph.edges(data="weight", default=1)]
+    nx.draw_networkx(graph, pos, node_size=node_size, node_color=node_color, width=width)
     nx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_labels[0], label_pos=0.8)
     nx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_labels[1], label_pos=0.2)
     filename = "topology.png"
@@ -101,23 +112,60 @@ def draw_and_save_topology(graph: nx.Graph, edge_labels: List[Dict[Tuple[str, st
 def main():
     start_time = time.time()
     nr = InitNornir("config.yaml", configure_logging=False)
-    # result = nr.run(
-    #     task=netmiko_send_command,
-    #     command_string="show cdp neighbors detail",
-    #     use_textfsm=True,
-    # )
-    nr.run(
-        task=update_lldp_neighbors,
-    )
-    logger.info("LLDP details were successfully fetched using RESTCONF and OPENCONFIG")
+    restconf_nr = nr.filter(filter_func=lambda host: get_collection_backend(host) == "restconf")
+    cli_nr = nr.filter(filter_func=lambda host: get_collection_backend(host) == "cli")
+    failures = {}
+    restconf_start_time = time.time()
+    if restconf_nr.inventory.hosts:
+        if constants.RESTCONF_ASYNC:
+            failures = run_update_lldp_neighbors(restconf_nr.inventory.hosts.values())
+        else:
+            restconf_nr.run(
+                task=update_lldp_neighbors,
+            )
+        logger.info("LLDP details were successfully fetched using RESTCONF and OPENCONFIG")
+    restconf_time = time.time() - restconf_start_time
+    if cli_nr.inventory.hosts:
+        failures.update(update_cli_neighbors(cli_nr))
+    if failures:
+        logger.error("Failed to get LLDP details from %s", ", ".join(sorted(failures)))
     milestone = time.time()
     time_to_run = milestone - start_time
     print(
-        f"{Fore.RED}It took {time_to_run:.2f} seconds to get and parse LLDP details"
+        f"{Fore.RED}It took {time_to_run:.2f} seconds to get and parse LLDP details: "
+        f"{restconf_time:.2f} seconds for {len(restconf_nr.inventory.hosts)} RESTCONF hosts, "
+        f"{milestone - restconf_start_time - restconf_time:.2f} seconds for {len(cli_nr.inventory.hosts)} CLI hosts"
         f"{Fore.RESET}"
     )
-    graph, edge_labels = build_graph(nr.inventory.hosts.values())
-    draw_and_save_topology(graph, edge_labels)
+    if constants.LLDP_CACHE_DIR is not None:
+        topology, delta = update_topology(
+            nr.inventory.hosts.values(), LldpCache(constants.LLDP_CACHE_DIR), failures
+        )
+        print(render_delta(delta))
+        graph, edge_labels = topology.graph, topology.edge_labels
+    else:
+        graph, edge_labels = build_graph(nr.inventory.hosts.values())
+    sites = get_hub_sites(graph, get_sites(nr.inventory.hosts.values()))
+    pos = compute_layout(
+        graph,
+        constants.LAYOUT_ALGORITHM,
+        sites=sites,
+        cache_file=constants.LAYOUT_CACHE_FILE,
+        site_algorithm=constants.LAYOUT_SITE_ALGORITHM,
+        workers=constants.LAYOUT_WORKERS,
+    )
+    if constants.DRAW_TOPOLOGY_PNG:
+        draw_and_save_topology(graph, edge_labels, pos)
+    if constants.EXPORT_JSON_DIR is not None:
+        export_json(graph, edge_labels, sites, constants.EXPORT_JSON_DIR, pos)
+    if constants.EXPORT_SVG_FILE is not None:
+        export_svg(graph, edge_labels, sites, pos, constants.EXPORT_SVG_FILE)
+    if constants.TOPOLOGY_INDEX_FILE is not None:
+        TopologyIndex.from_graph(graph).save(constants.TOPOLOGY_INDEX_FILE)
+    if constants.TOPOLOGY_SNAPSHOT_DIR is not None:
+        _, snapshot_diff = save_snapshot(constants.TOPOLOGY_SNAPSHOT_DIR, graph)
+        if snapshot_diff is not None:
+            print(render_diff(snapshot_diff))
     time_to_run = time.time() - milestone
     print(
         f"{Fore.RED}It took additional {time_to_run:.2f} seconds "
@@ -0,0 +1,88 @@
+"""Interface name normalization shared by the topology builders
+
+Interface types are resolved with a lookup table of every lowercase prefix
+of every normalized type instead of scanning NORMALIZED_INTERFACES,
+and whole interface names are cached, because the same names repeat
+on every host of the topology.
+"""
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+
+INTERFACE_NAME_RE = re.compile(
+    r"(?P<interface_type>[a-zA-Z\-_ ]*)(?P<interface_num>[\d.\/]*)"
+)
+
+NORMALIZED_INTERFACES = (
+    "FastEthernet",
+    "GigabitEthernet",
+    "TenGigabitEthernet",
+    "FortyGigabitEthernet",
+    "Ethernet",
+    "Loopback",
+    "Serial",
+    "Vlan",
+    "Tunnel",
+    "Portchannel",
+    "Management",
+)
+
+# maximum number of distinct interface names and types kept in the caches
+NORMALIZATION_CACHE_SIZE = 65536
+
+
+def build_prefix_table(normalized_interfaces: Iterable[str]) -> Dict[str, str]:
+    """Maps every lowercase prefix of the normalized interface types to the type
+
+    When several types start with the same prefix, the first one wins,
+    e.g. "e" is Ethernet, but "f" is FastEthernet, not FortyGigabitEthernet
+    """
+    prefix_table: Dict[str, str] = {}
+    for norm_int_type in normalized_interfaces:
+        norm_int_type = sys.intern(norm_int_type)
+        lowered = norm_int_type.lower()
+        for length in range(len(lowered) + 1):
+            prefix_table.setdefault(lowered[:length], norm_int_type)
+    return prefix_table
+
+
+PREFIX_TABLE = build_prefix_table(NORMALIZED_INTERFACES)
+
+
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
+def normalize_interface_type(interface_type: str) -> str:
+    """Normalizes interface type
+
+    For example:
+        G is converted to GigabitEthernet
+        Te is converted to TenGigabitEthernet
+    Unknown types are returned lowercased
+    """
+    int_type = interface_type.strip().lower()
+    norm_int_type = PREFIX_TABLE.get(int_type)
+    if norm_int_type is None:
+        return sys.intern(int_type)
+    return norm_int_type
+
+
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
+def normalize_interface_name(interface_name: str) -> Tuple[str, str]:
+    """Splits interface name into normalized type and number
+
+    For example:
+        Gi0/1 is converted to ("GigabitEthernet", "0/1")
+        Te1/1 is converted to ("TenGigabitEthernet", "1/1")
+    """
+    match = INTERFACE_NAME_RE.search(interface_name)
+    if match:
+        int_type = normalize_interface_type(match.group("interface_type"))
+        int_num = match.group("interface_num")
+        return int_type, int_num
+    raise ValueError(f"Does not recognize {interface_name} as an interface name")
+
+
+def clear_caches() -> None:
+    normalize_interface_type.cache_clear()
+    normalize_interface_name.cache_clear()
@@ -0,0 +1,120 @@
+"""Asynchronous collection of LLDP neighbors over RESTCONF
+
+All hosts share one HTTP/2-capable client, so connections are pooled
+and reused between polls when the client is passed in by the caller.
+"""
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, TYPE_CHECKING, TypeVar
+
+import httpx
+
+import constants
+from lldp import parse_openconfig_lldp_interfaces
+
+if TYPE_CHECKING:
+    from nornir.core.inventory import Host
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+
+
+def create_client(
+    max_connections: int = constants.RESTCONF_MAX_CONCURRENCY,
+    timeout: float = constants.RESTCONF_TIMEOUT,
+    http2: bool = True,
+) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=http2,
+        verify=False,
+        headers=constants.HEADERS,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+async def fetch_lldp_interfaces(
+    client: httpx.AsyncClient,
+    host: "Host",
+    timeout: float = constants.RESTCONF_TIMEOUT,
+    max_attempts: int = constants.RESTCONF_MAX_ATTEMPTS,
+    backoff: float = constants.RESTCONF_BACKOFF,
+) -> List[Dict[str, Any]]:
+    """Gets openconfig-lldp:interface list of the host
+
+    Connection errors, timeouts and 429/5xx responses are retried
+    with exponential backoff and jitter.
+    """
+    url = constants.RESTCONF_ROOT + constants.OPENCONFIG_LLDP_NEIGHBORS_ENDPOINT
+    url = url.format(host=host.hostname)
+    timeout = host.data.get("restconf_timeout", timeout)
+    for attempt in range(1, max_attempts + 1):
+        try:
+            response = await client.get(url, auth=(host.username, host.password), timeout=timeout)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == max_attempts:
+                response.raise_for_status()
+                return response.json()["openconfig-lldp:interface"]
+            logger.warning("%s: attempt %s got HTTP %s", host.name, attempt, response.status_code)
+        except httpx.TransportError as e:
+            if attempt == max_attempts:
+                raise
+            logger.warning("%s: attempt %s failed: %r", host.name, attempt, e)
+        await asyncio.sleep(random.uniform(0, backoff * 2 ** (attempt - 1)))
+
+
+async def update_lldp_neighbors_async(
+    hosts: Iterable["Host"],
+    max_concurrency: int = constants.RESTCONF_MAX_CONCURRENCY,
+    timeout: float = constants.RESTCONF_TIMEOUT,
+    max_attempts: int = constants.RESTCONF_MAX_ATTEMPTS,
+    backoff: float = constants.RESTCONF_BACKOFF,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Dict[str, Exception]:
+    """Fills host.data["interfaces"] of every host, same as update_lldp_neighbors task
+
+    Not more than max_concurrency requests are in flight. Hosts which failed
+    get no interfaces.
+
+    Returns:
+        dict: key is the name of the failed host, value is the exception
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    failures: Dict[str, Exception] = {}
+
+    async def update_host(client: httpx.AsyncClient, host: "Host") -> None:
+        async with semaphore:
+            try:
+                result = await fetch_lldp_interfaces(client, host, timeout, max_attempts, backoff)
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                logger.error("%s: failed to get LLDP neighbors: %r", host.name, e)
+                failures[host.name] = e
+                host.data["interfaces"] = {}
+                return
+        host.data["interfaces"] = parse_openconfig_lldp_interfaces(result, host.name)
+
+    if client is not None:
+        await asyncio.gather(*(update_host(client, host) for host in hosts))
+    else:
+        async with create_client(max_concurrency, timeout) as client:
+            await asyncio.gather(*(update_host(client, host) for host in hosts))
+    return failures
+
+
+def run_coroutine(coroutine: Awaitable[T]) -> T:
+    """Runs the coroutine in a new event loop, asyncio.run is not available in Python 3.6"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def run_update_lldp_neighbors(hosts: Iterable["Host"], **kwargs) -> Dict[str, Exception]:
+    return run_coroutine(update_lldp_neighbors_async(hosts, **kwargs))
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Binary snapshots of the topology and the diff between them
+
+Snapshot file, all numbers are little-endian:
+    header: SNAPSHOT_HEADER
+    string offsets: uint32 * (number of strings + 1)
+    strings: UTF-8, sorted, so the order of string ids is the order of the strings
+    padding to 4 bytes
+    nodes: uint32 string id * number of nodes, sorted
+    links: (device1, interface1, device2, interface2) uint32 string ids * number of links,
+        the ends of every link and the links are sorted
+
+The file is memory-mapped and nothing is parsed on open, the strings are
+decoded only when they are needed. Snapshots are diffed by walking both
+sorted link arrays at once, so the memory does not grow with the size of the topology.
+
+Usage:
+    python snapshot.py show SNAPSHOT
+    python snapshot.py diff OLD_SNAPSHOT NEW_SNAPSHOT
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import namedtuple
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+import networkx as nx
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"NDTOPSNP"
+SNAPSHOT_VERSION = 1
+# magic, version, reserved, number of strings, number of nodes, number of links, creation time
+SNAPSHOT_HEADER = struct.Struct("<8sHHIIId")
+SNAPSHOT_FILE_EXTENSION = ".snap"
+LINK_FIELDS = 4
+
+# device and interface of both ends, the interface is empty for the hub of a multi-access segment
+SnapshotLink = Tuple[str, str, str, str]
+SnapshotDiff = namedtuple("SnapshotDiff", ["added_nodes", "removed_nodes", "added_links", "removed_links"])
+
+
+def get_links(graph: nx.Graph) -> Set[SnapshotLink]:
+    """Returns links of the graph built by build_graph or IncrementalTopology
+
+    Aggregated edges are split back into their member links.
+    """
+    links = set()
+    for edge1, edge2, data in graph.edges(data=True):
+        node1, node2 = data.get("ends", (edge1, edge2))
+        for interface1, interface2 in data.get("members", ()):
+            end1, end2 = (node1, interface1), (node2, interface2)
+            links.add(end1 + end2 if end1 <= end2 else end2 + end1)
+    return links
+
+
+def render_link(link: SnapshotLink) -> str:
+    device1, interface1, device2, interface2 = link
+    return f"{device1} {interface1}".rstrip() + " <-> " + f"{device2} {interface2}".rstrip()
+
+
+def write_snapshot(path: str, graph: nx.Graph) -> None:
+    """Writes the snapshot of the graph atomically"""
+    links = sorted(get_links(graph))
+    strings = sorted({string for link in links for string in link} | set(graph))
+    string_ids = {string: string_id for string_id, string in enumerate(strings)}
+    encoded_strings = [string.encode() for string in strings]
+    string_offsets = array("I", [0])
+    for encoded in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+    nodes = array("I", sorted(string_ids[node] for node in graph))
+    link_ids = array("I", (string_ids[string] for link in links for string in link))
+    if sys.byteorder == "big":
+        for values in (string_offsets, nodes, link_ids):
+            values.byteswap()
+
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(strings), len(nodes), len(links), time.time()
+        ))
+        string_offsets.tofile(f)
+        f.write(b"".join(encoded_strings))
+        f.write(b"\0" * (-f.tell() % 4))
+        nodes.tofile(f)
+        link_ids.tofile(f)
+    os.replace(str(tmp_path), str(path))
+    logger.info("The topology snapshot has been saved to %r, %s devices, %s links", str(path), len(nodes), len(links))
+
+
+class Snapshot:
+    """Memory-mapped snapshot, use as a context manager or close it
+
+    Attributes:
+        num_nodes: number of devices
+        num_links: number of links
+        created: UNIX time when the snapshot was written
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        magic, version, _, num_strings, self.num_nodes, self.num_links, self.created = (
+            SNAPSHOT_HEADER.unpack_from(self._buffer)
+        )
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a topology snapshot")
+        if version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported topology snapshot version {version} in {path}")
+        position = SNAPSHOT_HEADER.size
+        self._string_offsets = self._get_array(position, num_strings + 1)
+        position += 4 * (num_strings + 1)
+        self._strings_start = position
+        position += self._string_offsets[num_strings]
+        position += -position % 4
+        self._nodes = self._get_array(position, self.num_nodes)
+        position += 4 * self.num_nodes
+        self._links = self._get_array(position, LINK_FIELDS * self.num_links)
+
+    def _get_array(self, position: int, length: int):
+        values = self._buffer[position:position + 4 * length]
+        if sys.byteorder == "big":
+            swapped = array("I", values)
+            swapped.byteswap()
+            return swapped
+        return values.cast("I")
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for name in ("_string_offsets", "_nodes", "_links"):
+            values = self.__dict__.pop(name, None)
+            if isinstance(values, memoryview):
+                values.release()
+        self._buffer.release()
+        self._mmap.close()
+
+    def get_string_bytes(self, string_id: int) -> bytes:
+        start = self._strings_start + self._string_offsets[string_id]
+        end = self._strings_start + self._string_offsets[string_id + 1]
+        return bytes(self._buffer[start:end])
+
+    def get_string(self, string_id: int) -> str:
+        return self.get_string_bytes(string_id).decode()
+
+    def iter_node_ids(self) -> Iterator[int]:
+        return iter(self._nodes)
+
+    def iter_nodes(self) -> Iterator[str]:
+        return (self.get_string(string_id) for string_id in self._nodes)
+
+    def iter_link_ids(self) -> Iterator[Tuple[int, ...]]:
+        links = self._links
+        for position in range(0, len(links), LINK_FIELDS):
+            yield tuple(links[position:position + LINK_FIELDS])
+
+    def iter_links(self) -> Iterator[SnapshotLink]:
+        for link_ids in self.iter_link_ids():
+            yield tuple(self.get_string(string_id) for string_id in link_ids)
+
+    def has_same_strings(self, other: "Snapshot") -> bool:
+        """Returns True if string ids of both snapshots mean the same strings"""
+        return (
+            self._string_offsets == other._string_offsets
+            and self._buffer[self._strings_start:self._strings_start + self._string_offsets[-1]]
+            == other._buffer[other._strings_start:other._strings_start + other._string_offsets[-1]]
+        )
+
+
+def merge_diff(old: Iterator, new: Iterator) -> Tuple[List, List]:
+    """Compares two sorted iterators
+
+    Returns:
+        tuple: items only in the new iterator and items only in the old one
+    """
+    added = []
+    removed = []
+    old_item = next(old, None)
+    new_item = next(new, None)
+    while old_item is not None or new_item is not None:
+        if new_item is None or (old_item is not None and old_item < new_item):
+            removed.append(old_item)
+            old_item = next(old, None)
+        elif old_item is None or new_item < old_item:
+            added.append(new_item)
+            new_item = next(new, None)
+        else:
+            old_item = next(old, None)
+            new_item = next(new, None)
+    return added, removed
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> SnapshotDiff:
+    """Returns devices and links which appeared and disappeared between the snapshots
+
+    If both snapshots have the same strings, which is the usual case when nothing
+    or only links between known interfaces changed, string ids are compared
+    directly. Otherwise ids are compared as UTF-8 bytes, which keeps the order.
+    """
+    if old.has_same_strings(new):
+        added_nodes, removed_nodes = merge_diff(old.iter_node_ids(), new.iter_node_ids())
+        added_links, removed_links = merge_diff(old.iter_link_ids(), new.iter_link_ids())
+        return SnapshotDiff(
+            [new.get_string(node) for node in added_nodes],
+            [old.get_string(node) for node in removed_nodes],
+            [tuple(new.get_string(string_id) for string_id in link) for link in added_links],
+            [tuple(old.get_string(string_id) for string_id in link) for link in removed_links],
+        )
+
+    def get_node_keys(snapshot: Snapshot) -> Iterator[bytes]:
+        return (snapshot.get_string_bytes(node) for node in snapshot.iter_node_ids())
+
+    def get_link_keys(snapshot: Snapshot) -> Iterator[Tuple[bytes, ...]]:
+        return (
+            tuple(snapshot.get_string_bytes(string_id) for string_id in link)
+            for link in snapshot.iter_link_ids()
+        )
+
+    added_nodes, removed_nodes = merge_diff(get_node_keys(old), get_node_keys(new))
+    added_links, removed_links = merge_diff(get_link_keys(old), get_link_keys(new))
+    return SnapshotDiff(
+        [node.decode() for node in added_nodes],
+        [node.decode() for node in removed_nodes],
+        [tuple(string.decode() for string in link) for link in added_links],
+        [tuple(string.decode() for string in link) for link in removed_links],
+    )
+
+
+def render_diff(diff: SnapshotDiff) -> str:
+    lines = [
+        f"{len(diff.added_nodes)} devices added, {len(diff.removed_nodes)} devices removed, "
+        f"{len(diff.added_links)} links added, {len(diff.removed_links)} links removed"
+    ]
+    lines.extend(f"+ {node}" for node in diff.added_nodes)
+    lines.extend(f"- {node}" for node in diff.removed_nodes)
+    lines.extend(f"+ {render_link(link)}" for link in diff.added_links)
+    lines.extend(f"- {render_link(link)}" for link in diff.removed_links)
+    return "\n".join(lines)
+
+
+def get_latest_snapshot(directory: str) -> Optional[Path]:
+    paths = sorted(Path(directory).glob(f"*{SNAPSHOT_FILE_EXTENSION}"))
+    return paths[-1] if paths else None
+
+
+def save_snapshot(directory: str, graph: nx.Graph) -> Tuple[Path, Optional[SnapshotDiff]]:
+    """Saves the snapshot with the current time in the name to the directory
+
+    Returns:
+        tuple: path of the snapshot and the diff with the previous snapshot, None if there is none
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    previous_path = get_latest_snapshot(directory)
+    path = Path(directory) / time.strftime(f"topology-%Y%m%d-%H%M%S{SNAPSHOT_FILE_EXTENSION}")
+    write_snapshot(str(path), graph)
+    if previous_path is None or previous_path == path:
+        return path, None
+    with Snapshot(str(previous_path)) as old, Snapshot(str(path)) as new:
+        return path, diff_snapshots(old, new)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Topology snapshots saved by main.py")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+    show_parser = subparsers.add_parser("show", help="print devices and links of the snapshot")
+    show_parser.add_argument("snapshot")
+    diff_parser = subparsers.add_parser("diff", help="print the changes, exit code is 1 if there are changes")
+    diff_parser.add_argument("old_snapshot")
+    diff_parser.add_argument("new_snapshot")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        with Snapshot(args.snapshot) as snapshot:
+            print(
+                f"{snapshot.num_nodes} devices, {snapshot.num_links} links, "
+                f"created {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.created))}"
+            )
+            for node in snapshot.iter_nodes():
+                print(node)
+            for link in snapshot.iter_links():
+                print(render_link(link))
+        return
+
+    with Snapshot(args.old_snapshot) as old, Snapshot(args.new_snapshot) as new:
+        diff = diff_snapshots(old, new)
+    print(render_diff(diff))
+    if any(diff):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from collections import defaultdict
+
+import networkx as nx
+import pytest
+
+from topology import add_aggregated_edge
+from snapshot import diff_snapshots, get_links, render_diff, save_snapshot, Snapshot, SNAPSHOT_HEADER, write_snapshot
+
+
+def get_graph(links, nodes=()):
+    """Returns graph in the build_graph format from (device1, interface1, device2, interface2) links"""
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes)
+    edge_members = defaultdict(list)
+    for device1, interface1, device2, interface2 in links:
+        edge_members[device1, device2].append((interface1, interface2))
+    for edge, members in edge_members.items():
+        add_aggregated_edge(graph, [{}, {}], edge, members)
+    return graph
+
+
+LINKS = [
+    ("R1", "Gi1", "R2", "Gi1"),
+    ("R1", "Gi2", "R2", "Gi2"),
+    ("R2", "Gi3", "Коммутатор", "Gi0/1"),
+    ("R1", "Gi3", "segment R1 Gi3", ""),
+    ("R3", "Gi1", "segment R1 Gi3", ""),
+]
+
+
+def write(path, links, nodes=()):
+    write_snapshot(str(path), get_graph(links, nodes))
+    return Snapshot(str(path))
+
+
+def test_round_trip(tmp_path):
+    graph = get_graph(LINKS, ["R4"])
+    write_snapshot(str(tmp_path / "topology.snap"), graph)
+    with Snapshot(str(tmp_path / "topology.snap")) as snapshot:
+        assert snapshot.num_nodes == graph.number_of_nodes()
+        assert snapshot.num_links == len(LINKS)
+        assert list(snapshot.iter_nodes()) == sorted(graph)
+        assert list(snapshot.iter_links()) == sorted(get_links(graph))
+
+
+def test_links_keep_the_order_of_edge_ends():
+    graph = nx.Graph()
+    # the order of nodes in the graph differs from the order of the edge ends
+    graph.add_nodes_from(["segment R1 Gi3", "R2", "R1"])
+    add_aggregated_edge(graph, [{}, {}], ("R1", "R2"), [("Gi1", "Gi5")])
+    add_aggregated_edge(graph, [{}, {}], ("R1", "segment R1 Gi3"), [("Gi3", "")])
+    assert get_links(graph) == {("R1", "Gi1", "R2", "Gi5"), ("R1", "Gi3", "segment R1 Gi3", "")}
+
+
+def test_empty_round_trip(tmp_path):
+    with write(tmp_path / "empty.snap", []) as snapshot:
+        assert list(snapshot.iter_nodes()) == []
+        assert list(snapshot.iter_links()) == []
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "bad.snap"
+    path.write_bytes(b"\0" * SNAPSHOT_HEADER.size)
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+
+
+def test_diff_with_same_strings(tmp_path):
+    # cables are swapped, no new devices or interfaces
+    swapped = [("R1", "Gi1", "R2", "Gi2"), ("R1", "Gi2", "R2", "Gi1")] + LINKS[2:]
+    with write(tmp_path / "old.snap", LINKS) as old, write(tmp_path / "new.snap", swapped) as new:
+        assert old.has_same_strings(new)
+        diff = diff_snapshots(old, new)
+    assert diff.added_nodes == diff.removed_nodes == []
+    assert diff.added_links == [("R1", "Gi1", "R2", "Gi2"), ("R1", "Gi2", "R2", "Gi1")]
+    assert diff.removed_links == [("R1", "Gi1", "R2", "Gi1"), ("R1", "Gi2", "R2", "Gi2")]
+
+
+def test_diff_with_different_strings(tmp_path):
+    new_links = LINKS[:2] + LINKS[3:] + [("R3", "Gi2", "R5", "Gi1")]
+    with write(tmp_path / "old.snap", LINKS) as old, write(tmp_path / "new.snap", new_links) as new:
+        assert not old.has_same_strings(new)
+        diff = diff_snapshots(old, new)
+    assert diff.added_nodes == ["R5"]
+    assert diff.removed_nodes == ["Коммутатор"]
+    assert diff.added_links == [("R3", "Gi2", "R5", "Gi1")]
+    assert diff.removed_links == [("R2", "Gi3", "Коммутатор", "Gi0/1")]
+    assert render_diff(diff).split("\n") == [
+        "1 devices added, 1 devices removed, 1 links added, 1 links removed",
+        "+ R5",
+        "- Коммутатор",
+        "+ R3 Gi2 <-> R5 Gi1",
+        "- R2 Gi3 <-> Коммутатор Gi0/1",
+    ]
+
+
+def test_save_snapshot(tmp_path):
+    path, diff = save_snapshot(str(tmp_path), get_graph(LINKS))
+    assert diff is None
+    previous = path.with_name("topology-20000101-000000.snap")
+    path.rename(previous)
+    path, diff = save_snapshot(str(tmp_path), get_graph(LINKS[1:]))
+    assert path != previous
+    assert diff.removed_links == [LINKS[0]]
+    assert diff.added_links == diff.added_nodes == diff.removed_nodes == []
@@ -0,0 +1,144 @@
+import random
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+from interface import Interface
+from topology import build_graph
+import topology_cache
+from topology_cache import LldpCache, update_topology
+
+
+def generate_views(rng, devices, external_devices):
+    """Returns neighbors seen by every interface: (device, interface) -> list of (device, interface)"""
+    all_devices = devices + external_devices
+    next_port = defaultdict(int)
+    views = defaultdict(list)
+
+    def new_port(device_name):
+        next_port[device_name] += 1
+        return device_name, f"GigabitEthernet{next_port[device_name]}"
+
+    for _ in range(len(devices) * 2):
+        device1, device2 = rng.sample(all_devices, 2)
+        # parallel links between the same devices
+        for _ in range(rng.choice([1, 1, 2])):
+            port1, port2 = new_port(device1), new_port(device2)
+            views[port1].append(port2)
+            views[port2].append(port1)
+    for _ in range(len(devices) // 3):
+        ports = [new_port(device_name) for device_name in rng.sample(all_devices, rng.randint(3, 5))]
+        for port in ports:
+            others = [other for other in ports if other != port]
+            # LLDP is not converged, the device sees only a part of the segment
+            if rng.random() < 0.3:
+                others = others[:2]
+            views[port].extend(others)
+    for device_name in devices:
+        views[new_port(device_name)] = []
+    return views
+
+
+def get_host(device_name, views):
+    interfaces = {
+        interface_name: Interface(
+            interface_name,
+            device_name,
+            [Interface(remote_interface_name, remote_device) for remote_device, remote_interface_name in neighbors],
+        )
+        for (port_device, interface_name), neighbors in views.items()
+        if port_device == device_name
+    }
+    return SimpleNamespace(name=device_name, data={"interfaces": interfaces})
+
+
+def assert_same_graph(topology, hosts):
+    graph, edge_labels = build_graph(hosts)
+    assert dict(topology.graph.nodes(data="hub")) == dict(graph.nodes(data="hub"))
+    assert topology.edge_labels == edge_labels
+    for edge in edge_labels[0]:
+        assert topology.graph.edges[edge] == graph.edges[edge]
+    assert topology.graph.number_of_edges() == graph.number_of_edges()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_topology_matches_build_graph(tmp_path, seed):
+    rng = random.Random(seed)
+    devices = [f"R{device_num}" for device_num in range(30)]
+    external_devices = ["EXT1", "EXT2"]
+    cache = LldpCache(tmp_path)
+
+    old_views = generate_views(rng, devices, external_devices)
+    hosts = {device_name: get_host(device_name, old_views) for device_name in devices}
+    topology, delta = update_topology(hosts.values(), cache)
+    assert_same_graph(topology, hosts.values())
+    assert not delta.removed
+
+    new_views = generate_views(rng, devices + ["R30"], external_devices)
+    new_hosts = {}
+    failed_hosts = set()
+    for device_name in devices[5:] + ["R30"]:
+        if device_name in hosts and rng.random() < 0.5:
+            new_hosts[device_name] = hosts[device_name]
+        else:
+            new_hosts[device_name] = get_host(device_name, new_views)
+        if device_name in hosts and rng.random() < 0.1:
+            failed_hosts.add(device_name)
+    topology, _ = update_topology(new_hosts.values(), cache, failed_hosts)
+    # failed hosts keep the neighbors from the previous run
+    expected_hosts = [hosts[name] if name in failed_hosts else host for name, host in new_hosts.items()]
+    assert_same_graph(topology, expected_hosts)
+
+
+def test_segment_is_removed_when_nobody_reports_it(tmp_path):
+    views = {
+        ("R1", "GigabitEthernet1"): [("R2", "GigabitEthernet1"), ("R3", "GigabitEthernet1")],
+        ("R2", "GigabitEthernet1"): [("R1", "GigabitEthernet1"), ("R3", "GigabitEthernet1")],
+    }
+    hosts = [get_host("R1", views), get_host("R2", views)]
+    cache = LldpCache(tmp_path)
+    topology, _ = update_topology(hosts, cache)
+    assert sorted(topology.graph) == ["R1", "R2", "R3", "segment R1 GigabitEthernet1"]
+
+    hosts = [get_host("R1", {}), get_host("R2", {})]
+    topology, delta = update_topology(hosts, cache)
+    assert sorted(topology.graph) == ["R1", "R2"]
+    assert len(delta.removed) == 1
+
+
+@pytest.mark.parametrize("cache_content", ["another version", "corrupted"])
+def test_topology_is_rebuilt_if_saved_topology_is_not_usable(tmp_path, monkeypatch, cache_content):
+    rng = random.Random(0)
+    devices = [f"R{device_num}" for device_num in range(10)]
+    views = generate_views(rng, devices, ["EXT1"])
+    hosts = [get_host(device_name, views) for device_name in devices]
+    cache = LldpCache(tmp_path)
+    update_topology(hosts, cache)
+    if cache_content == "corrupted":
+        cache.get_path().write_bytes(b"not a pickle")
+    else:
+        monkeypatch.setattr(topology_cache, "TOPOLOGY_VERSION", topology_cache.TOPOLOGY_VERSION + 1)
+    assert cache.load() is None
+
+    topology, delta = update_topology(hosts, cache)
+    assert_same_graph(topology, hosts)
+    # every link is new for the rebuilt topology
+    assert delta.added and not delta.removed
+    assert cache.load() is not None
+
+
+def test_saved_topology_is_not_rewritten_without_changes(tmp_path):
+    views = {
+        ("R1", "GigabitEthernet1"): [("R2", "GigabitEthernet1")],
+        ("R2", "GigabitEthernet1"): [("R1", "GigabitEthernet1")],
+    }
+    hosts = [get_host("R1", views), get_host("R2", views)]
+    cache = LldpCache(tmp_path)
+    update_topology(hosts, cache)
+    mtime = cache.get_path().stat().st_mtime_ns
+
+    topology, delta = update_topology(hosts, cache)
+    assert delta == ([], [])
+    assert cache.get_path().stat().st_mtime_ns == mtime
+    assert_same_graph(topology, hosts)
@@ -0,0 +1,96 @@
+import random
+
+import networkx as nx
+import pytest
+
+from topology_index import TopologyIndex
+
+
+def generate_graph(seed):
+    """Returns graph with cycles, trees hanging off them, parallel components and isolated nodes"""
+    rng = random.Random(seed)
+    graph = nx.Graph()
+    for component_num in range(3):
+        nodes = [f"C{component_num}-R{node_num}" for node_num in range(rng.randint(5, 40))]
+        graph.add_nodes_from(nodes)
+        for node_num in range(1, len(nodes)):
+            graph.add_edge(nodes[node_num], nodes[rng.randrange(node_num)])
+        for _ in range(rng.randint(0, len(nodes) // 3)):
+            graph.add_edge(*rng.sample(nodes, 2))
+    graph.add_node("isolated")
+    return graph
+
+
+def get_expected_blast_radius(graph, node):
+    """Devices outside of the biggest part left after the node fails, None if the biggest part is not unique"""
+    component = nx.node_connected_component(graph, node) - {node}
+    parts = sorted(nx.connected_components(graph.subgraph(component)), key=len, reverse=True)
+    if len(parts) < 2:
+        return []
+    if len(parts[0]) == len(parts[1]):
+        return None
+    return sorted(device for part in parts[1:] for device in part)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_articulation_points_and_bridges(seed):
+    graph = generate_graph(seed)
+    index = TopologyIndex.from_graph(graph)
+    assert sorted(index.articulation_points()) == sorted(nx.articulation_points(graph))
+    assert index.bridges() == sorted(tuple(sorted(bridge)) for bridge in nx.bridges(graph))
+    for node in graph:
+        assert index.is_articulation_point(node) == (node in set(nx.articulation_points(graph)))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_blast_radius(seed):
+    graph = generate_graph(seed)
+    index = TopologyIndex.from_graph(graph)
+    for node in graph:
+        expected = get_expected_blast_radius(graph, node)
+        if expected is not None:
+            assert index.blast_radius(node) == expected, node
+
+
+def test_bridge_blast_radius():
+    graph = nx.Graph([("A", "B"), ("B", "C"), ("C", "A"), ("C", "D"), ("D", "E")])
+    index = TopologyIndex.from_graph(graph)
+    assert index.bridge_blast_radius("C", "D") == ["D", "E"]
+    assert index.bridge_blast_radius("E", "D") == ["E"]
+    assert index.bridge_blast_radius("A", "B") == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_shortest_path(seed):
+    graph = generate_graph(seed)
+    index = TopologyIndex.from_graph(graph)
+    rng = random.Random(seed)
+    nodes = sorted(graph)
+    for _ in range(50):
+        source, target = rng.sample(nodes, 2)
+        path = index.shortest_path(source, target)
+        if not nx.has_path(graph, source, target):
+            assert path is None
+            continue
+        assert path[0] == source and path[-1] == target
+        assert len(path) == nx.shortest_path_length(graph, source, target) + 1
+        assert all(graph.has_edge(node1, node2) for node1, node2 in zip(path, path[1:]))
+
+
+def test_save_and_load(tmp_path):
+    graph = generate_graph(0)
+    index = TopologyIndex.from_graph(graph)
+    path = tmp_path / "topology.idx"
+    index.save(str(path))
+    loaded = TopologyIndex.load(str(path))
+    assert loaded.nodes == index.nodes
+    assert loaded.articulation_points() == index.articulation_points()
+    assert loaded.bridges() == index.bridges()
+    for node in graph:
+        assert sorted(loaded.neighbors(node)) == sorted(graph[node])
+
+
+def test_unknown_device():
+    index = TopologyIndex.from_graph(nx.Graph([("A", "B")]))
+    with pytest.raises(KeyError):
+        index.blast_radius("C")
@@ -0,0 +1,163 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Set, Tuple, TYPE_CHECKING
+
+import networkx as nx
+
+from link import LinkKey
+
+if TYPE_CHECKING:
+    from nornir.core.inventory import Host
+    from interface import Interface
+
+
+logger = logging.getLogger(__name__)
+
+HUB_NODE_PREFIX = "segment"
+InterfaceKey = Tuple[str, str]
+
+
+def get_aggregated_labels(members: Sequence[Tuple[str, str]]) -> Tuple[str, str]:
+    """Returns labels of both ends of the edge: short names of member interfaces separated by comma"""
+    return (
+        ", ".join(member[0] for member in members),
+        ", ".join(member[1] for member in members),
+    )
+
+
+def add_aggregated_edge(
+    graph: nx.Graph,
+    edge_labels: List[Dict[Tuple[str, str], str]],
+    edge: Tuple[str, str],
+    members: List[Tuple[str, str]],
+) -> None:
+    """Adds one edge for all parallel links between two nodes
+
+    The edge weight is the number of member links, members are pairs
+    of short interface names in the order of the edge ends. The graph does not
+    keep the order of the ends, so it is saved in the "ends" attribute.
+    """
+    members = sorted(members)
+    graph.add_edge(*edge, weight=len(members), members=members, ends=edge)
+    edge_labels[0][edge], edge_labels[1][edge] = get_aggregated_labels(members)
+
+
+def get_hub_name(interface_keys: Iterable[InterfaceKey]) -> str:
+    device_name, interface_name = min(interface_keys)
+    return f"{HUB_NODE_PREFIX} {device_name} {interface_name}"
+
+
+def group_segments(multi_access_links: Iterable[Sequence["Interface"]]) -> List[List["Interface"]]:
+    """Merges multi-access links which share interfaces into segments
+
+    Every device sees the segment from its own side and the views may differ
+    if LLDP is not converged, so links are merged with union-find on interfaces.
+    """
+    parent: Dict[InterfaceKey, InterfaceKey] = {}
+    interfaces: Dict[InterfaceKey, "Interface"] = {}
+
+    def find(key: InterfaceKey) -> InterfaceKey:
+        root = key
+        while parent[root] != root:
+            root = parent[root]
+        while parent[key] != root:
+            parent[key], key = root, parent[key]
+        return root
+
+    for link_interfaces in multi_access_links:
+        keys = [interface.key for interface in link_interfaces]
+        for key, interface in zip(keys, link_interfaces):
+            parent.setdefault(key, key)
+            interfaces.setdefault(key, interface)
+        root = find(keys[0])
+        for key in keys[1:]:
+            other_root = find(key)
+            if other_root != root:
+                parent[other_root] = root
+
+    segments: Dict[InterfaceKey, List["Interface"]] = defaultdict(list)
+    for key, interface in interfaces.items():
+        segments[find(key)].append(interface)
+    return [sorted(segment) for _, segment in sorted(segments.items())]
+
+
+def add_segment(
+    graph: nx.Graph,
+    edge_labels: List[Dict[Tuple[str, str], str]],
+    segment: Sequence["Interface"],
+) -> str:
+    """Adds hub node of the multi-access segment connected to every device on the segment
+
+    Returns:
+        str: name of the hub node
+    """
+    hub = get_hub_name(interface.key for interface in segment)
+    graph.add_node(hub, hub=True)
+    device_members: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    for interface in segment:
+        device_members[interface.device_name].append((interface.short_name, ""))
+    for device_name, members in device_members.items():
+        add_aggregated_edge(graph, edge_labels, (device_name, hub), members)
+    return hub
+
+
+def build_graph(hosts: Iterable["Host"]) -> Tuple[nx.Graph, List[Dict[Tuple[str, str], str]]]:
+    """Builds graph of devices
+
+    Parallel point-to-point links between two devices (for example LAG members)
+    are folded into one edge with weight equal to the number of links and
+    "members" attribute with pairs of interface names. Multi-access segments
+    become hub nodes with "hub" attribute, connected to every device on the segment.
+
+    Returns:
+        tuple: graph and edge labels - two dictionaries with interface names of the
+            first and the second end of every edge
+    """
+    hosts = list(hosts)
+    edge_labels: List[Dict[Tuple[str, str], str]] = [{}, {}]
+    graph = nx.Graph()
+    graph.add_nodes_from([host.name for host in hosts])
+
+    # both ends of a link have the same canonical link key, so every link is added once
+    # and Link objects are not built at all
+    seen_links: Set[LinkKey] = set()
+    edge_members: Dict[Tuple[str, str], List[Tuple[str, str]]] = defaultdict(list)
+    multi_access_links = []
+    for host in hosts:
+        for interface in host.data["interfaces"].values():
+            if len(interface.neighbors) > 1:
+                multi_access_links.append((interface, *interface.neighbors))
+                continue
+            if not interface.neighbors:
+                continue
+            neighbor = interface.neighbors[0]
+            if neighbor < interface:
+                interface1, interface2 = neighbor, interface
+            else:
+                interface1, interface2 = interface, neighbor
+            link_key = (interface1.key, interface2.key)
+            if link_key in seen_links:
+                continue
+            seen_links.add(link_key)
+
+            edge: Tuple[str, str] = (interface1.device_name, interface2.device_name)
+            edge_members[edge].append((interface1.short_name, interface2.short_name))
+
+    for edge, members in edge_members.items():
+        add_aggregated_edge(graph, edge_labels, edge, members)
+
+    for segment in group_segments(multi_access_links):
+        add_segment(graph, edge_labels, segment)
+    logger.info("The network graph was built")
+    return graph, edge_labels
+
+
+def get_hub_sites(graph: nx.Graph, sites: Dict[str, str]) -> Dict[str, str]:
+    """Returns sites of the devices with hub nodes added to the site of their first device"""
+    result = dict(sites)
+    for node, is_hub in graph.nodes(data="hub"):
+        if is_hub:
+            device_sites = sorted(sites[neighbor] for neighbor in graph[node] if neighbor in sites)
+            if device_sites:
+                result[node] = device_sites[0]
+    return result
@@ -0,0 +1,370 @@
+"""Incremental topology built from per-host LLDP state cached between runs
+
+The topology is saved to the cache directory with the hash of the LLDP state
+of every host. On the next run it is loaded as is and only hosts with
+a different hash are re-applied: their old links are invalidated and
+the new ones are added in place. Hub nodes are rebuilt once per run and only
+for the segments whose members changed.
+
+The saved topology keeps links as keys of interface names and the links
+of every host as one JSON string, which is parsed only when the host or its
+neighbor changes. So loading it does not build Interface and Link objects
+and is faster than build_graph.
+If the saved topology is missing or has another version, it is built
+from scratch from the hosts.
+
+A link stays in the topology while at least one of its ends reports it,
+the same as when build_graph is run on all hosts. The resulting graph
+is the same as the one built by build_graph, including hub nodes
+of multi-access segments.
+"""
+import gc
+import hashlib
+import json
+import logging
+import os
+import pickle
+from collections import defaultdict, namedtuple
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
+
+import networkx as nx
+
+from interface import Interface
+from link import Link, LinkKey
+from topology import add_aggregated_edge, add_segment, group_segments, InterfaceKey
+
+if TYPE_CHECKING:
+    from nornir.core.inventory import Host
+
+
+logger = logging.getLogger(__name__)
+
+TOPOLOGY_FILE_NAME = "topology.pickle"
+# saved topologies of other versions are ignored and the topology is built from scratch
+TOPOLOGY_VERSION = 1
+
+TopologyDelta = namedtuple("TopologyDelta", ["added", "removed"])
+# neighbors of every interface: interface name -> list of (remote device, remote interface)
+LldpState = Dict[str, List[Tuple[str, str]]]
+
+
+def get_lldp_state(interfaces: Dict[str, Interface]) -> LldpState:
+    return {
+        interface_name: sorted([neighbor.device_name, neighbor.name] for neighbor in interface.neighbors)
+        for interface_name, interface in sorted(interfaces.items())
+    }
+
+
+def get_lldp_state_hash(lldp_state: LldpState) -> str:
+    """Returns hash of the neighbors of the host
+
+    The hash is computed from the parsed neighbors and not from the RESTCONF response,
+    because the response has counters and timers which change on every request
+    """
+    return hashlib.sha256(json.dumps(lldp_state, sort_keys=True).encode()).hexdigest()
+
+
+def get_link(link_key: LinkKey) -> Link:
+    return Link(Interface(interface_name, device_name) for device_name, interface_name in link_key)
+
+
+def render_delta(delta: TopologyDelta) -> str:
+    lines = [f"{len(delta.added)} links added, {len(delta.removed)} links removed"]
+    lines.extend(f"+ {link}" for link in delta.added)
+    lines.extend(f"- {link}" for link in delta.removed)
+    return "\n".join(lines)
+
+
+class LldpCache:
+    """Directory with the topology saved by the previous run"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+
+    def get_path(self) -> Path:
+        return self.directory / TOPOLOGY_FILE_NAME
+
+    def load(self) -> Optional["IncrementalTopology"]:
+        """Returns the saved topology, None if it is missing, corrupted or of another version"""
+        path = self.get_path()
+        if not path.exists():
+            return None
+        # the topology is many small objects, the garbage collector would scan them
+        # again and again while they are created, so it is paused
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with path.open("rb") as f:
+                entry = pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ValueError) as e:
+            logger.warning("Ignoring corrupted topology cache %s: %s", path, e)
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if entry.get("version") != TOPOLOGY_VERSION:
+            return None
+        return entry["topology"]
+
+    def save(self, topology: "IncrementalTopology") -> None:
+        """Saves the topology atomically, so an interrupted run does not corrupt the cache"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.get_path()
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("wb") as f:
+            pickle.dump({"version": TOPOLOGY_VERSION, "topology": topology}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(str(tmp_path), str(path))
+
+
+class IncrementalTopology:
+    """Graph of devices which can be updated one host at a time
+
+    Parallel links are aggregated into one edge and multi-access segments
+    become hub nodes, as in build_graph. Point-to-point edges are updated
+    in place. Hub nodes of the segments whose multi-access links appeared
+    or disappeared are rebuilt by _update_segments, so a batch of hosts
+    can be replaced with _replace_host_links and the segments updated once.
+
+    Links are stored as their keys, so the topology is pickled as plain
+    strings and tuples. The links of every host are pickled as JSON
+    and parsed on the first use.
+
+    Attributes:
+        graph: devices, hub nodes and the links between them
+        edge_labels: short interface names of the both ends of every edge,
+            in the same format as returned by build_graph
+    """
+
+    def __init__(self) -> None:
+        self.graph = nx.Graph()
+        self.edge_labels: List[Dict[Tuple[str, str], str]] = [{}, {}]
+        self.host_hashes: Dict[str, str] = {}
+        # hosts stay in the graph without links, other devices only while they have links
+        self._hosts: Set[str] = set()
+        # links reported by every host, a link is removed when none of the hosts on it reports it
+        self._host_links_json: Dict[str, str] = {}
+        # parsed _host_links_json, it is not pickled
+        self._host_links: Dict[str, Set[LinkKey]] = {}
+        # multi-access links of every interface and the hub node of the segment of the interface
+        self._interface_links: Dict[InterfaceKey, Set[LinkKey]] = defaultdict(set)
+        self._interface_hubs: Dict[InterfaceKey, str] = {}
+        self._hub_interfaces: Dict[str, List[InterfaceKey]] = {}
+        # interfaces whose multi-access links changed since the last _update_segments
+        self._changed_interfaces: Set[InterfaceKey] = set()
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state["_host_links"] = {}
+        return state
+
+    @staticmethod
+    def get_edge(link_key: LinkKey) -> Tuple[str, str]:
+        (device_name1, _), (device_name2, _) = link_key
+        return device_name1, device_name2
+
+    def add_host(self, host_name: str) -> None:
+        """Adds the host without links, for example the host which failed and has no cached neighbors"""
+        self._hosts.add(host_name)
+        self.graph.add_node(host_name)
+
+    def _remove_node_if_unused(self, node: str) -> None:
+        if node not in self._hosts and not self.graph.degree(node):
+            self.graph.remove_node(node)
+
+    def _get_host_links(self, host_name: str) -> Set[LinkKey]:
+        links = self._host_links.get(host_name)
+        if links is None:
+            links_json = self._host_links_json.get(host_name)
+            if links_json is None:
+                return set()
+            links = {
+                tuple((device_name, interface_name) for device_name, interface_name in link_key)
+                for link_key in json.loads(links_json)
+            }
+            self._host_links[host_name] = links
+        return links
+
+    def _set_host_links(self, host_name: str, links: Set[LinkKey]) -> None:
+        self._host_links[host_name] = links
+        self._host_links_json[host_name] = json.dumps(list(links))
+
+    def _is_reported(self, link_key: LinkKey, except_host: str) -> bool:
+        return any(
+            link_key in self._get_host_links(device_name)
+            for device_name, _ in link_key
+            if device_name != except_host
+        )
+
+    def _get_edge_members(self, edge: Tuple[str, str]) -> List[Tuple[str, str]]:
+        if not self.graph.has_edge(*edge):
+            return []
+        return list(self.graph.edges[edge]["members"])
+
+    def _set_edge_members(self, edge: Tuple[str, str], members: List[Tuple[str, str]]) -> None:
+        if not members:
+            self.graph.remove_edge(*edge)
+            self.edge_labels[0].pop(edge, None)
+            self.edge_labels[1].pop(edge, None)
+            for node in edge:
+                self._remove_node_if_unused(node)
+            return
+        # parallel links share the edge, as in build_graph
+        add_aggregated_edge(self.graph, self.edge_labels, edge, members)
+
+    def _add_link(self, link: Link) -> None:
+        if link.is_point_to_point:
+            edge = self.get_edge(link.key)
+            interface1, interface2 = link.interfaces
+            members = self._get_edge_members(edge)
+            members.append((interface1.short_name, interface2.short_name))
+            self._set_edge_members(edge, members)
+        elif len(link.interfaces) > 2:
+            for interface_key in link.key:
+                self._interface_links[interface_key].add(link.key)
+                self._changed_interfaces.add(interface_key)
+
+    def _remove_link(self, link: Link) -> None:
+        if link.is_point_to_point:
+            edge = self.get_edge(link.key)
+            interface1, interface2 = link.interfaces
+            members = self._get_edge_members(edge)
+            members.remove((interface1.short_name, interface2.short_name))
+            self._set_edge_members(edge, members)
+        elif len(link.interfaces) > 2:
+            for interface_key in link.key:
+                links = self._interface_links[interface_key]
+                links.discard(link.key)
+                if not links:
+                    del self._interface_links[interface_key]
+                self._changed_interfaces.add(interface_key)
+
+    def _update_segments(self) -> None:
+        """Rebuilds hub nodes of the segments whose multi-access links changed
+
+        Multi-access links which share interfaces are merged into one segment,
+        so adding or removing one link can merge or split segments. The old segments
+        of the changed interfaces are removed and their interfaces are grouped again:
+        every link of these interfaces either is new or was on one of these segments,
+        so the new segments do not reach other hubs, which are kept as is.
+        """
+        if not self._changed_interfaces:
+            return
+        interface_keys = set(self._changed_interfaces)
+        hubs = {self._interface_hubs[key] for key in self._changed_interfaces if key in self._interface_hubs}
+        devices = set()
+        for hub in hubs:
+            interface_keys.update(self._hub_interfaces.pop(hub))
+            for device_name in self.graph[hub]:
+                devices.add(device_name)
+                self.edge_labels[0].pop((device_name, hub), None)
+                self.edge_labels[1].pop((device_name, hub), None)
+            self.graph.remove_node(hub)
+        link_keys = set()
+        for key in interface_keys:
+            self._interface_hubs.pop(key, None)
+            link_keys.update(self._interface_links.get(key, ()))
+        for segment in group_segments(get_link(link_key).interfaces for link_key in link_keys):
+            hub = add_segment(self.graph, self.edge_labels, segment)
+            segment_keys = [interface.key for interface in segment]
+            self._hub_interfaces[hub] = segment_keys
+            for key in segment_keys:
+                self._interface_hubs[key] = hub
+        for device_name in devices:
+            self._remove_node_if_unused(device_name)
+        self._changed_interfaces.clear()
+
+    def _replace_host_links(self, host_name: str, state_hash: Optional[str], links: Set[Link]) -> TopologyDelta:
+        self.add_host(host_name)
+        old_link_keys = self._get_host_links(host_name)
+        links_by_key = {link.key: link for link in links}
+        added = []
+        removed = []
+        for link_key in old_link_keys - links_by_key.keys():
+            if not self._is_reported(link_key, host_name):
+                link = get_link(link_key)
+                self._remove_link(link)
+                removed.append(link)
+        for link_key in links_by_key.keys() - old_link_keys:
+            if not self._is_reported(link_key, host_name):
+                self._add_link(links_by_key[link_key])
+                added.append(links_by_key[link_key])
+        self._set_host_links(host_name, set(links_by_key))
+        if state_hash is not None:
+            self.host_hashes[host_name] = state_hash
+        return TopologyDelta(sorted(added, key=lambda link: link.key), sorted(removed, key=lambda link: link.key))
+
+    def update_host(self, host_name: str, state_hash: Optional[str], links: Set[Link]) -> TopologyDelta:
+        """Replaces the links reported by the host
+
+        Returns:
+            TopologyDelta: links which appeared in or disappeared from the topology
+        """
+        delta = self._replace_host_links(host_name, state_hash, links)
+        self._update_segments()
+        return delta
+
+    def _remove_host_links(self, host_name: str) -> TopologyDelta:
+        delta = self._replace_host_links(host_name, None, set())
+        del self._host_links[host_name]
+        del self._host_links_json[host_name]
+        self.host_hashes.pop(host_name, None)
+        # links reported by the neighbors keep the device in the graph, as in build_graph
+        self._hosts.discard(host_name)
+        # the host on a hub is removed with the hub in _update_segments
+        self._remove_node_if_unused(host_name)
+        return delta
+
+    def remove_host(self, host_name: str) -> TopologyDelta:
+        delta = self._remove_host_links(host_name)
+        self._update_segments()
+        return delta
+
+
+def update_topology(
+    hosts: Iterable["Host"],
+    cache: LldpCache,
+    failed_hosts: Iterable[str] = (),
+) -> Tuple[IncrementalTopology, TopologyDelta]:
+    """Restores the topology from the cache and applies the hosts whose neighbors changed
+
+    Hosts which failed keep their cached neighbors. Hosts which are not
+    in the inventory anymore are removed from the topology. The changed hosts
+    are applied one by one and the segments are updated once at the end,
+    then the topology is saved for the next run.
+
+    Returns:
+        tuple: the topology and the delta since the previous run
+    """
+    topology = cache.load()
+    if topology is None:
+        topology = IncrementalTopology()
+    failed_hosts = set(failed_hosts)
+    added: List[Link] = []
+    removed: List[Link] = []
+    host_names = set()
+    changed = False
+    for host in hosts:
+        host_names.add(host.name)
+        if host.name in failed_hosts:
+            topology.add_host(host.name)
+            continue
+        state_hash = get_lldp_state_hash(get_lldp_state(host.data["interfaces"]))
+        if topology.host_hashes.get(host.name) == state_hash:
+            continue
+        logger.debug("%s: LLDP neighbors changed", host.name)
+        links = {interface.link_from_neighbors() for interface in host.data["interfaces"].values()}
+        delta = topology._replace_host_links(host.name, state_hash, links)
+        added.extend(delta.added)
+        removed.extend(delta.removed)
+        changed = True
+
+    for host_name in set(topology.host_hashes) - host_names:
+        delta = topology._remove_host_links(host_name)
+        added.extend(delta.added)
+        removed.extend(delta.removed)
+        changed = True
+    topology._update_segments()
+    if changed:
+        cache.save(topology)
+    return topology, TopologyDelta(added, removed)
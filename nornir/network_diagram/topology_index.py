@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""Precomputed index of the topology for fast queries
+
+The graph is stored as compressed sparse rows: neighbors of the node i are
+targets[offsets[i]:offsets[i + 1]]. Together with it the results of one
+depth-first search are stored: articulation points, bridges and the
+DFS tree, so the devices cut off by a failure are answered without
+walking the graph. Shortest paths use BFS trees, which are cached per source.
+
+File format: INDEX_MAGIC, the length of the JSON header (4 bytes, little-endian),
+the JSON header with node names and the description of the arrays and then
+the arrays themselves, little-endian.
+
+Usage:
+    python topology_index.py INDEX_FILE path DEVICE1 DEVICE2
+    python topology_index.py INDEX_FILE blast-radius DEVICE
+    python topology_index.py INDEX_FILE articulation-points
+    python topology_index.py INDEX_FILE bridges
+"""
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"NDTOPIDX"
+INDEX_VERSION = 1
+BFS_CACHE_SIZE = 256
+# name, typecode: 'I' for node indexes and sizes, 'i' where -1 means "no node"
+INDEX_ARRAYS = (
+    ("offsets", "I"),
+    ("targets", "I"),
+    # DFS preorder: order[position[node]] == node, the DFS subtree of the node
+    # is order[position[node]:position[node] + subtree_size[node]]
+    ("order", "I"),
+    ("position", "I"),
+    ("subtree_size", "I"),
+    ("dfs_parent", "i"),
+    ("component_start", "I"),
+    ("component_size", "I"),
+    # DFS children which are cut off from the rest of the component if the node fails,
+    # in the same format as the adjacency: separated[separated_offsets[i]:separated_offsets[i + 1]]
+    ("separated_offsets", "I"),
+    ("separated", "I"),
+    # the DFS child of every bridge, the bridge is (dfs_parent[child], child)
+    ("bridge_children", "I"),
+)
+
+
+class TopologyIndex:
+    """Graph in compressed sparse rows with precomputed failure analysis
+
+    Use TopologyIndex.from_graph to build the index and TopologyIndex.load
+    to read it from the file saved with save.
+    """
+
+    def __init__(self, nodes: List[str], arrays: Dict[str, array]) -> None:
+        self.nodes = nodes
+        self.node_indexes = {node: index for index, node in enumerate(nodes)}
+        for name, _ in INDEX_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.component_of = array("I", bytes(4 * len(nodes)))
+        for component, start in enumerate(self.component_start):
+            for position in range(start, start + self.component_size[component]):
+                self.component_of[self.order[position]] = component
+        self.bridge_child_set = set(self.bridge_children)
+        # source -> BFS parents, the least recently used tree is dropped first
+        self._bfs_trees: "OrderedDict[int, array]" = OrderedDict()
+
+    @classmethod
+    def from_graph(cls, graph: nx.Graph) -> "TopologyIndex":
+        nodes = sorted(graph)
+        node_indexes = {node: index for index, node in enumerate(nodes)}
+        offsets = array("I", [0])
+        targets = array("I")
+        for node in nodes:
+            targets.extend(sorted(node_indexes[neighbor] for neighbor in graph[node] if neighbor != node))
+            offsets.append(len(targets))
+        arrays = {"offsets": offsets, "targets": targets}
+        arrays.update(analyze_failures(offsets, targets))
+        return cls(nodes, arrays)
+
+    def save(self, path: str) -> None:
+        """Saves the index atomically"""
+        header = json.dumps({
+            "version": INDEX_VERSION,
+            "nodes": self.nodes,
+            "arrays": [[name, typecode, len(getattr(self, name))] for name, typecode in INDEX_ARRAYS],
+        }).encode()
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(INDEX_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for name, _ in INDEX_ARRAYS:
+                values = getattr(self, name)
+                if sys.byteorder == "big":
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                values.tofile(f)
+        os.replace(str(tmp_path), str(path))
+        logger.info("The topology index has been saved to %r", str(path))
+
+    @classmethod
+    def load(cls, path: str) -> "TopologyIndex":
+        with open(path, "rb") as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{path} is not a topology index")
+            header_length, = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length))
+            if header["version"] != INDEX_VERSION:
+                raise ValueError(f"Unsupported topology index version {header['version']} in {path}")
+            arrays = {}
+            for name, typecode, length in header["arrays"]:
+                values = array(typecode)
+                values.fromfile(f, length)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                arrays[name] = values
+        return cls(header["nodes"], arrays)
+
+    def get_node_index(self, node: str) -> int:
+        try:
+            return self.node_indexes[node]
+        except KeyError:
+            raise KeyError(f"Device {node!r} is not in the topology") from None
+
+    def neighbors(self, node: str) -> List[str]:
+        index = self.get_node_index(node)
+        return [self.nodes[target] for target in self.targets[self.offsets[index]:self.offsets[index + 1]]]
+
+    def get_bfs_tree(self, source: int) -> array:
+        """Returns BFS parents of all nodes, -1 for the source and unreachable nodes"""
+        if source in self._bfs_trees:
+            self._bfs_trees.move_to_end(source)
+            return self._bfs_trees[source]
+        parents = array("i", [-1]) * len(self.nodes)
+        visited = bytearray(len(self.nodes))
+        visited[source] = 1
+        queue = deque([source])
+        offsets, targets = self.offsets, self.targets
+        while queue:
+            node = queue.popleft()
+            for position in range(offsets[node], offsets[node + 1]):
+                target = targets[position]
+                if not visited[target]:
+                    visited[target] = 1
+                    parents[target] = node
+                    queue.append(target)
+        self._bfs_trees[source] = parents
+        if len(self._bfs_trees) > BFS_CACHE_SIZE:
+            self._bfs_trees.popitem(last=False)
+        return parents
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """Returns devices on the shortest path including both ends, None if there is no path
+
+        The BFS tree of either end is reused if it is cached.
+        """
+        source_index = self.get_node_index(source)
+        target_index = self.get_node_index(target)
+        if self.component_of[source_index] != self.component_of[target_index]:
+            return None
+        reverse = True
+        if target_index in self._bfs_trees and source_index not in self._bfs_trees:
+            source_index, target_index = target_index, source_index
+            reverse = False
+        parents = self.get_bfs_tree(source_index)
+        path = [target_index]
+        while path[-1] != source_index:
+            path.append(parents[path[-1]])
+        if reverse:
+            path.reverse()
+        return [self.nodes[index] for index in path]
+
+    def _get_subtree(self, node: int) -> List[int]:
+        start = self.position[node]
+        return list(self.order[start:start + self.subtree_size[node]])
+
+    def _get_component(self, node: int) -> List[int]:
+        component = self.component_of[node]
+        start = self.component_start[component]
+        return list(self.order[start:start + self.component_size[component]])
+
+    def _get_rest_of_component(self, node: int) -> List[int]:
+        """Returns nodes of the component which are not in the DFS subtree of the node"""
+        component = self.component_of[node]
+        start = self.component_start[component]
+        end = start + self.component_size[component]
+        subtree_start = self.position[node]
+        subtree_end = subtree_start + self.subtree_size[node]
+        return list(self.order[start:subtree_start]) + list(self.order[subtree_end:end])
+
+    def is_articulation_point(self, node: str) -> bool:
+        index = self.get_node_index(node)
+        return self.separated_offsets[index] != self.separated_offsets[index + 1]
+
+    def articulation_points(self) -> List[str]:
+        return [
+            node for index, node in enumerate(self.nodes)
+            if self.separated_offsets[index] != self.separated_offsets[index + 1]
+        ]
+
+    def bridges(self) -> List[Tuple[str, str]]:
+        return sorted(
+            tuple(sorted((self.nodes[self.dfs_parent[child]], self.nodes[child])))
+            for child in self.bridge_children
+        )
+
+    def blast_radius(self, node: str) -> List[str]:
+        """Returns devices which lose connectivity to the rest of the network if the device fails
+
+        The failed device splits its component into parts, the biggest part
+        is the rest of the network and the devices of all other parts are returned.
+        """
+        index = self.get_node_index(node)
+        children = self.separated[self.separated_offsets[index]:self.separated_offsets[index + 1]]
+        if not children:
+            return []
+        parts = [(self.subtree_size[child], child) for child in children]
+        # DFS children which are not separated are connected to the ancestors of the node,
+        # they are in the same part as the rest of the component
+        rest_size = self.component_size[self.component_of[index]] - 1 - sum(size for size, _ in parts)
+        # the rest of the component wins ties, so the side with the DFS root survives
+        survivor = max(parts + [(rest_size, -1)], key=lambda part: (part[0], part[1] == -1))
+        isolated = []
+        for size, child in parts:
+            if (size, child) != survivor:
+                isolated.extend(self._get_subtree(child))
+        if survivor[1] != -1:
+            separated = {index}
+            for _, child in parts:
+                separated.update(self._get_subtree(child))
+            isolated.extend(
+                rest_index for rest_index in self._get_component(index) if rest_index not in separated
+            )
+        return sorted(self.nodes[isolated_index] for isolated_index in isolated)
+
+    def bridge_blast_radius(self, node1: str, node2: str) -> List[str]:
+        """Returns devices on the smaller side of the link, empty if the link is not a bridge"""
+        index1 = self.get_node_index(node1)
+        index2 = self.get_node_index(node2)
+        if self.dfs_parent[index1] == index2:
+            index1, index2 = index2, index1
+        if self.dfs_parent[index2] != index1 or index2 not in self.bridge_child_set:
+            return []
+        component = self.component_of[index2]
+        if 2 * self.subtree_size[index2] <= self.component_size[component]:
+            isolated = self._get_subtree(index2)
+        else:
+            isolated = self._get_rest_of_component(index2)
+        return sorted(self.nodes[isolated_index] for isolated_index in isolated)
+
+
+def analyze_failures(offsets: array, targets: array) -> Dict[str, array]:
+    """Finds articulation points and bridges with one iterative DFS (Tarjan's algorithm)
+
+    Returns:
+        dict: arrays of INDEX_ARRAYS except the adjacency
+    """
+    num_nodes = len(offsets) - 1
+    position = array("I", bytes(4 * num_nodes))
+    low = [0] * num_nodes
+    subtree_size = array("I", [1]) * num_nodes
+    dfs_parent = array("i", [-1]) * num_nodes
+    visited = bytearray(num_nodes)
+    order = array("I")
+    component_start = array("I")
+    component_size = array("I")
+    separated_children: List[List[int]] = [[] for _ in range(num_nodes)]
+    bridge_children = array("I")
+
+    for root in range(num_nodes):
+        if visited[root]:
+            continue
+        component_start.append(len(order))
+        visited[root] = 1
+        position[root] = low[root] = len(order)
+        order.append(root)
+        # node and the position of the next neighbor to visit
+        stack = [(root, offsets[root])]
+        while stack:
+            node, edge = stack[-1]
+            if edge < offsets[node + 1]:
+                stack[-1] = node, edge + 1
+                target = targets[edge]
+                if not visited[target]:
+                    visited[target] = 1
+                    dfs_parent[target] = node
+                    position[target] = low[target] = len(order)
+                    order.append(target)
+                    stack.append((target, offsets[target]))
+                elif target != dfs_parent[node]:
+                    low[node] = min(low[node], position[target])
+                continue
+            stack.pop()
+            parent = dfs_parent[node]
+            if parent == -1:
+                continue
+            low[parent] = min(low[parent], low[node])
+            subtree_size[parent] += subtree_size[node]
+            if low[node] >= position[parent]:
+                separated_children[parent].append(node)
+            if low[node] > position[parent]:
+                bridge_children.append(node)
+        component_size.append(len(order) - component_start[-1])
+        # the root is an articulation point only if it has more than one DFS child
+        if len(separated_children[root]) < 2:
+            separated_children[root] = []
+
+    separated_offsets = array("I", [0])
+    separated = array("I")
+    for children in separated_children:
+        separated.extend(children)
+        separated_offsets.append(len(separated))
+    return {
+        "order": order,
+        "position": position,
+        "subtree_size": subtree_size,
+        "dfs_parent": dfs_parent,
+        "component_start": component_start,
+        "component_size": component_size,
+        "separated_offsets": separated_offsets,
+        "separated": separated,
+        "bridge_children": bridge_children,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Queries of the topology index saved by main.py")
+    parser.add_argument("index_file")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+    path_parser = subparsers.add_parser("path", help="shortest path between two devices")
+    path_parser.add_argument("source")
+    path_parser.add_argument("target")
+    blast_radius_parser = subparsers.add_parser("blast-radius", help="devices cut off if the device fails")
+    blast_radius_parser.add_argument("device")
+    subparsers.add_parser("articulation-points", help="devices which are single points of failure")
+    subparsers.add_parser("bridges", help="links which are single points of failure")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    index = TopologyIndex.load(args.index_file)
+    load_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    if args.command == "path":
+        path = index.shortest_path(args.source, args.target)
+        print(" -> ".join(path) if path is not None else f"There is no path from {args.source} to {args.target}")
+    elif args.command == "blast-radius":
+        devices = index.blast_radius(args.device)
+        print(f"{len(devices)} devices are cut off if {args.device} fails")
+        for device in devices:
+            print(device)
+    elif args.command == "articulation-points":
+        for device in index.articulation_points():
+            print(f"{device}: {len(index.blast_radius(device))} devices are cut off")
+    else:
+        for node1, node2 in index.bridges():
+            print(f"{node1} <-> {node2}: {len(index.bridge_blast_radius(node1, node2))} devices are cut off")
+    query_time = time.perf_counter() - start_time
+    print(f"Loaded in {load_time * 1000:.1f} ms, answered in {query_time * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()